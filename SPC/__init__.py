@@ -1,9 +1,17 @@
-import plotly.graph_objs as go
-import pandas as pd
+# plotly and pandas are imported where first needed, so `import SPC` stays cheap (see benchmarks/bench_import.py)
+from __future__ import annotations
+from functools import cached_property
+from typing import TYPE_CHECKING
 import numpy as np
-from copy import deepcopy
 from . import config as cfg
 from .anomaly_detector import AnomalyDetector
+from .monitor import SPCMonitor
+from .stats import SPCStats
+from . import bitmask, downsample, shapes
+from .profiling import Profiler, profiled, stage
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 presets = dict(
     FIGURE_LAYOUT=cfg.FIGURE_LAYOUT,
@@ -13,28 +21,52 @@ presets = dict(
     SHAPE_LAYOUT=cfg.SHAPE_LAYOUT,
     CUSTOMDATA=cfg.CUSTOMDATA,
     HOVERTEMPLATE=cfg.HOVERTEMPLATE,
-    COLOR_SCHEME=cfg.COLOR_SCHEME
+    COLOR_SCHEME=cfg.COLOR_SCHEME,
+    LARGE_DATA=cfg.LARGE_DATA
 )
 
 
-class SPCPlot:
+class SPCPlot(SPCStats):
     """This class holds shortcuts for creating 'plotly' figures annotated with SPC elements. Style presets can be
     created and modified via the `presets` dictionary.
 
+    Statistics, zones, violations and the figure itself are computed on first use and cached (see `SPCStats`, which
+    offers the same minus plotting). Reassigning an input such as `df` or `spec_limits` starts a fresh figure.
+
     - *df*: dataframe containing the series you will plot
     - *y*: the column name of the series you will plot
     - *control_sidedness*: options are 'two', 'one_upper', and 'one_lower'; specifies if your controls are one or two-sided; if one-sided, which half has controls
     - *spec_limits*: draws spec lines using the draw_lines method. USL and LSL must be the keys of the passed dictionary to be used in capability calculations.
+    - *limits*: how control limits are derived: 'global' (whole series), 'baseline' (a fixed index range, e.g. Phase I),
+    'trailing' (last N points) or 'expanding' (all points so far). The last two give per-point limits. See `limits.py`.
+    - *limits_window*: (start, stop) index range for 'baseline', number of points for 'trailing'
+    - *chart_type*: 'individuals' (default) plots each value with limits from its standard deviation; 'i_mr' plots
+    each value with limits from the mean moving range (MR-bar / 1.128); 'xbar_r' and 'xbar_s' plot subgroup means with
+    limits from the average range or standard deviation within subgroups (see `subgroups.py`); 'ewma' and 'cusum'
+    plot the exponentially weighted moving average or the tabular CUSUM of the values, which pick up small sustained
+    shifts sooner (see `timeweighted.py`). On these two only single-point rules, such as rule 1, are checked.
+    - *violations*: rules to check: numbers 1-8 (see `AnomalyDetector`), names registered in `rules.py` ('N1'-'N8',
+    'WE1'-'WE4', '2_2s', 'R_4s', ...), `rules.Rule` objects such as Beyond(3, 4, 1.5), or a rule set name ('nelson',
+    'western_electric', 'westgard'); at most 8 at once
+    - *subgroup*: column labelling the subgroups (consecutive rows with the same label form one), or
+    - *subgroup_size*: number of consecutive rows per subgroup
     - *fig_layout*: style options for the Plotly Figure object. Can either specify the name of a preset,
     or pass a dictionary with custom options. You can create your own presets by modifying the SPC.presets dictionary like rcParams in matplotlib.
     - *global_custom*: under construction
+    - *profiler*: a `profiling.Profiler` recording wall time, rows and peak allocation of each stage (statistics, each
+    rule, violations, hover data, each draw_* method); off by default
+    - *chart_options*: for 'ewma', {'lambda': 0.2, 'L': 3} (weight of the newest value, limits at L EWMA sigmas); for
+    'cusum', {'k': 0.5, 'h': 5} (allowance and decision interval H, in sigmas). Both take 'target' and 'sigma', by
+    default the mean and MR-bar / 1.128 of the values. EWMA limits widen towards their asymptote over the first
+    points; a CUSUM chart plots C+ or -C-, whichever is larger, against UCL = H and LCL = -H, and signals once it
+    exceeds them (a sum equal to H is not a signal).
 
     Class Attributes:
-    - *fig*: Plotly Figure object
+    - *fig*: Plotly Figure object, created on first access (plotly is imported then)
     - *df*: the passed Pandas dataframe
     - *x*: the index of the passed dataframe
     - *y*: series from passed dataframe using label specified as `y`
-    - *mean*: mean of y
+    - *mean*: mean of y (an array with per-point limits, as are std, UCL, LCL, L1s and U1s)
     - *std*: standard deviation of y
     - *min*: min of y
     - *max*: max of y
@@ -46,73 +78,67 @@ class SPCPlot:
     - *L1s*: one stdev below y's mean
     - *U1s*: one stdev above y's mean
     - *zones*: y-value ranges for SPC shading
+    - *subgroups*: for subgroup charts, one row per subgroup (mean, range, std dev, size); hover data is taken from it
+    - *dispersion*: for I-MR and subgroup charts, the MR, R or S series with its own centre line and limits
+    - *time_weighted*: for EWMA and CUSUM charts, the plotted statistic, its sigma, target and options (and C+, C-)
     - *violations*: series containing list of rule violations per df index
+    - *violation_mask*: the same as one uint8 per point, bit k - 1 set where rule k fired (see `bitmask.py`; other
+    rules' bits are in `detector.bits`)
     """
 
+    INPUTS = SPCStats.INPUTS + ('fig_layout',)
+    CACHED = SPCStats.CACHED + ('fig',)
+
     def __init__(self, df: pd.DataFrame, y: str,
                  control_sidedness: str = 'two',
                  spec_limits: dict = None,
+                 limits: str = 'global',
+                 limits_window: tuple | int = None,
                  fig_layout: dict | str = 'default',
                  violations: list = [1, 2, 3, 4, 5, 6, 7, 8],
-                 color_scheme: dict | str = 'Classic'
+                 color_scheme: dict | str = 'Classic',
+                 chart_type: str = 'individuals',
+                 subgroup: str = None,
+                 subgroup_size: int = None,
+                 profiler=None,
+                 chart_options: dict = None
                  ):
 
-        # to be modified by methods
-        self.hovertemplate = None
-        self.customdata = None
-
         # Exception handling
-        if control_sidedness not in ('two', 'one_upper', 'one_lower'):
-            raise ValueError('`control_sidedness` must be "two", "one_lower", or "one_upper"')
-
         if isinstance(fig_layout, str):
             fig_layout = presets['FIGURE_LAYOUT'][fig_layout]
         elif not isinstance(fig_layout, dict):
             raise ValueError('`fig_layout` must be either a key pointing to an existing preset, or a dictionary '
                              'conforming to the Plotly Figure Layout requirements.')
+        self.fig_layout = fig_layout
 
         if isinstance(color_scheme, str):
             self.color_scheme = presets['COLOR_SCHEME'][color_scheme]
         elif isinstance(color_scheme, dict):
             self.color_scheme = color_scheme
 
-        self.fig = go.Figure(layout=fig_layout)
-        self.df = df
-        self.x = df.reset_index().index  # force start at zero and increment by one. Expects ordered data.
-        self.y = df[y]       # used in lieu of self.df[self.y_label] later on
-        self.y_label = y     # for hover labels
-
-        self.mean = self.y.mean()
-        self.std = self.y.std()
-        self.min = self.y.min()
-        self.max = self.y.max()
-
-        self.sides = control_sidedness
-
-        self.UCL = self.mean + 3 * self.std
-        self.LCL = self.mean - 3 * self.std
-        self.L1s = self.mean - self.std  # one sigma lower
-        self.U1s = self.mean + self.std  # one sigma upper
-
-        # arbitrary constant used to set visual limits
-        spacer = self.UCL - self.mean
-
-        self.zones = {
-            '+2': (self.UCL, self.UCL+5*spacer),
-            '+1': (self.U1s, self.UCL),
-            '0' : (self.L1s, self.U1s),
-            '-1': (self.LCL, self.L1s),
-            '-2': (self.LCL-5*spacer, self.LCL)
-        }
-        if self.sides == 'one_lower':
-            del self.zones['+2']
-            del self.zones['+1']
-            self.zones['0'][1] = self.max + 4 * self.mean
+        super().__init__(df, y, control_sidedness=control_sidedness, spec_limits=spec_limits,
+                         limits=limits, limits_window=limits_window, violations=violations,
+                         chart_type=chart_type, subgroup=subgroup, subgroup_size=subgroup_size, profiler=profiler,
+                         chart_options=chart_options)
+
+    def invalidate(self):
+        """Drop everything computed from the inputs, the figure and anything drawn on it included."""
+        super().invalidate()
+        # to be modified by methods
+        self.hover = None
+        self.hovertemplate = None
+        self.customdata = None
+        self._scatter_trace = None
+        self._violation_trace = None
 
-        elif self.sides == 'one_upper':
-            del self.zones['-2']
-            del self.zones['-1']
-            self.zones['0'][0] = self.min - 4 * self.mean
+    @cached_property
+    @profiled()
+    def fig(self):
+        import plotly.graph_objs as go
+
+        fig = go.Figure(layout=self.fig_layout)
+        self.__dict__['fig'] = fig  # draw_lines below draws onto it
 
         # older min max based
         # view = (self.max - self.min) / 2
@@ -120,98 +146,121 @@ class SPCPlot:
         # yrange[0] = 0 if yrange[0] < 0 else yrange[0]
 
         # centers around mean, shows fraction of red zone
-        yrange = [self.LCL - spacer*0.25, self.UCL + spacer*0.25]
+        spacer = self.spacer
+        yrange = [np.nanmin(self.LCL - spacer*0.25), np.nanmax(self.UCL + spacer*0.25)]
 
         if self.sides == 'one_upper':
             yrange[0] = self.min
         elif self.sides == 'one_lower':
             yrange[1] = self.max
 
-        self.fig.update_yaxes(range=yrange)
-        self.fig.update_xaxes(range=[-self.x[-1]*0.01, self.x[-1]*1.15])
-
-        self.LSL = spec_limits.get('LSL') if spec_limits else None
-        self.USL = spec_limits.get('USL') if spec_limits else None
+        fig.update_yaxes(range=yrange)
+        fig.update_xaxes(range=self._x_range())
 
-        if spec_limits:
-            self.draw_lines(annotated_hline_y=spec_limits,
+        if self.spec_limits:
+            self.draw_lines(annotated_hline_y=self.spec_limits,
                             show_value=True, line_style='spec')
+        return fig
 
-        try:
-            self.detector = AnomalyDetector(self.y)
-            self.detector.apply_rules(violations)
-            self.violations = self.detector.violations()
-        except Exception as e:
-            self.violations = 'Issue encountered: ' + str(e)
-
+    @profiled()
     def draw_scatter(self,
                      scatter_style='default',
                      plot_layout='default',
-                     hovertemplate='default'):
+                     hovertemplate='default',
+                     large_data='default'):
         """Add scatter plot trace onto the figure. Uses data specified in the constructor as "y." Hoverlabels are assigned and created by referencing the settings defined in 'config.py.'
 
-        custom options: scatter_opts, plot_layout, hovertemplate
+        custom options: scatter_opts, plot_layout, hovertemplate, large_data
+
+        Series longer than the large_data 'threshold' are drawn with WebGL (Scattergl) and reduced to about 'n_out'
+        points with the 'algorithm' from `downsample.py` ('lttb' or 'minmax', None to keep every point). Violation
+        points are always kept.
         """
+        import plotly.graph_objs as go
+        from .hover import HoverData
 
         if isinstance(scatter_style, str):
             scatter_style = presets['SCATTER_STYLE'][scatter_style]
         if isinstance(plot_layout, str):
             plot_layout = presets['PLOT_LAYOUT'][plot_layout]
-
-        n = 6 if len(self.df.columns) > 6 else len(self.df.columns)
-        customdata = np.stack(
-            ([self.df[col] for col in list(self.df.columns)[:n]]),
-            axis=-1)
-
-        if hovertemplate == 'default':
-            hovertemplate = '<br>'.join([f"Index: %{{x}}"] +
-                                            # f"{self.y_label}: %{{y}}"] +
-                                        [
-                                            f"{col}: %{{customdata[{i}]}}"
-                                            for i, col in enumerate(
-                                            list(self.df.columns)[:n])
-                                        ]
-                                        )
-        else:
-            cols = cfg.CUSTOMDATA[hovertemplate]
-            hovertemplate = cfg.HOVERTEMPLATE[hovertemplate]
-            customdata = np.stack(([self.df[col] for col in cols]), axis=-1)
-
-        # copy template for violations drawing
-        self.customdata = customdata
-        self.hovertemplate = hovertemplate
-
-        self.fig.add_trace(go.Scatter(
-            x=self.x, y=self.y, **scatter_style,
-            customdata=customdata, hovertemplate=hovertemplate,
+        if isinstance(large_data, str):
+            large_data = presets['LARGE_DATA'][large_data]
+
+        with stage(self, 'hover', len(self.plot_df)):
+            if hovertemplate == 'default':
+                self.hover = HoverData(self.plot_df, list(self.plot_df.columns)[:6])
+            else:
+                self.hover = HoverData(self.plot_df, cfg.CUSTOMDATA[hovertemplate], cfg.HOVERTEMPLATE[hovertemplate])
+
+        # kept for violations drawing
+        self.customdata = self.hover.customdata
+        self.hovertemplate = self.hover.hovertemplate
+
+        trace = go.Scatter
+        x, y, keep = self.x, self.y, None
+        if len(self.y) > large_data['threshold']:
+            trace = go.Scattergl
+            if large_data.get('algorithm'):
+                select = downsample.ALGORITHMS[large_data['algorithm']]
+                keep = np.union1d(select(self.x, self.y, large_data['n_out']), self._violation_positions())
+                x, y = self.x[keep], self.y.iloc[keep]
+
+        self.fig.add_trace(trace(
+            x=x, y=y, **scatter_style,
+            **self.hover.take(keep), hovertemplate=self.hovertemplate,
         ))
+        self._scatter_trace = self.fig.data[-1]  # extended by append
 
         self.fig.update_layout(**plot_layout)
 
+    @profiled()
     def draw_spc_zones(self, shape_layout='default'):
-        """Draw shaded regions corresponding to standard deviations around the mean
+        """Draw shaded regions corresponding to standard deviations around the mean, added to the layout in one
+        batch (see `shapes.py`). With per-point limits the zones are drawn as filled bands beneath the existing
+        traces instead of rectangles.
         """
+        import plotly.graph_objs as go
         shape_layout = cfg.SHAPE_LAYOUT[shape_layout]
 
-        for zone, limits in self.zones.items():
-            fillcolor = self.color_scheme['zone' + zone[-1]]
-            y0, y1 = limits
-            self.fig.add_hrect(
-                fillcolor=fillcolor,
-                y0=y0, y1=y1,
-                **shape_layout
-            )
-
-    def draw_lines(self, show_value: bool = True, line_style: dict | str = 'default'):
+        if np.ndim(self.UCL):
+            bands = []
+            for zone, (y0, y1) in self.zones.items():
+                fillcolor = self.color_scheme['zone' + zone[-1]]
+                common = dict(x=self.x, mode='lines', line_width=0, hoverinfo='skip', showlegend=False)
+                y0, y1 = np.broadcast_to(y0, len(self.x)), np.broadcast_to(y1, len(self.x))
+                bands.append(go.Scatter(y=y0, **common))
+                bands.append(go.Scatter(y=y1, fill='tonexty', fillcolor=fillcolor,
+                                        opacity=shape_layout.get('opacity'), **common))
+            n = len(self.fig.data)
+            self.fig.add_traces(bands)
+            self.fig.data = self.fig.data[n:] + self.fig.data[:n]
+            return
+
+        shapes.add_to(self.fig, shapes.zone_shapes(self.zones, self.color_scheme, shape_layout))
+
+    @profiled()
+    def draw_lines(self, annotated_hline_y: dict = None, show_value: bool = True,
+                   line_style: dict | str = 'default'):
         """Annotate the figure with lines. Specifying no arguments will draw the standard lines associated with SPC charts.
+        Horizontal lines and their labels are added to the layout in one batch (see `shapes.py`).
 
+        - *annotated_hline_y*: {label: y} of custom lines to draw instead (e.g. spec limits), styled by
+          `line_style` alone
         - *show_value*: for annotated lines, add "(value)" to the end of the label; rounded to 2 decimal places
         - *line_style*: style arguments for line style (plotly line arguments or kw bound to config's ANNOTATED_LINE_STYLE)
         """
+        import plotly.graph_objs as go
 
         if isinstance(line_style, str):
             line_style = presets['ANNOTATED_LINE_STYLE'][line_style]
 
+        if annotated_hline_y:
+            style = shapes.split_style(line_style)
+            lines = [(y_value, f'{label} ({round(y_value, 2)})' if show_value else label, style)
+                     for label, y_value in annotated_hline_y.items() if y_value is not None]
+            shapes.add_to(self.fig, *shapes.hline_shapes(lines))
+            return
+
         stats = {
             'Mean': self.mean,
             '-1S': self.L1s,
@@ -233,33 +282,41 @@ class SPCPlot:
             del stats['+1S']
             del stats['UCL']
 
-        hlines = {v: k for k, v in stats.items()}
-        if hlines:
-            for y_value, label in hlines.items():
-                line_style['line_color'] = self.color_scheme[stat_2_line[label]]
-                line_style['line_dash'] = 'solid'
-                if show_value and label:
-                    label = f'{label} ({round(y_value, 2)})'
-                self.fig.add_hline(y=y_value, annotation_text=label, **line_style)
+        if np.ndim(self.UCL):
+            # per-point limits: one line trace per statistic, labelled at its last value
+            for label, y_values in stats.items():
+                y_values = np.broadcast_to(y_values, len(self.x))
+                color = self.color_scheme[stat_2_line[label]]
+                text = f'{label} ({round(y_values[-1], 2)})' if show_value else label
+                self.fig.add_trace(go.Scatter(
+                    x=self.x, y=y_values, mode='lines', name=label, hoverinfo='skip', showlegend=False,
+                    line=dict(color=color, dash='solid', width=line_style.get('line_width'))
+                ))
+                self.fig.add_annotation(x=self.x[-1], y=y_values[-1], text=text,
+                                        showarrow=False, xanchor='left')
+            return
 
+        hlines = {v: k for k, v in stats.items()}
+        styles = {line: shapes.split_style({**line_style, 'line_color': self.color_scheme[line], 'line_dash': 'solid'})
+                  for line in set(stat_2_line.values())}
+        lines = [(y_value, f'{label} ({round(y_value, 2)})' if show_value and label else label,
+                  styles[stat_2_line[label]])
+                 for y_value, label in hlines.items()]
+        shapes.add_to(self.fig, *shapes.hline_shapes(lines))
+
+    @profiled()
     def draw_violations(self):
-        if type(self.violations) != str and self.customdata is not None:
-            # adapted from Stack Overflow a while back, might be a cleaner way
-            cd = self.customdata[self.violations.index]
-            arr_v = np.array([self.violations])
-            a, b = arr_v.shape
-            arr_v.resize(b, a)
-            customdata = np.concatenate((cd, arr_v), axis=1)
-
-            n = str(customdata.shape[1] - 1)
-            prefix = f'Violated Rules: %{{customdata[{n}]}}<br>'
-            hovertemplate = prefix + self.hovertemplate
+        import plotly.graph_objs as go
+
+        if type(self.violations) != str and self.hover is not None:
+            positions = self._violation_positions()
+            rules = bitmask.labels(self.violation_mask[positions], self.detector.rules, self.detector.bits)
 
             self.fig.add_trace(
                 go.Scatter(
                     name='Control Violation',
-                    x=(x := self.violations.index),
-                    y=self.y.loc[x],
+                    x=self.x[positions],
+                    y=self.y.iloc[positions],
                     mode='markers',
                     marker=dict(
                         symbol='x-thin',
@@ -267,33 +324,114 @@ class SPCPlot:
                         line_color='red',
                         size=10
                     ),
-                    customdata=customdata,
-                    hovertemplate=hovertemplate
+                    **self.hover.annotate(positions, 'Violated Rules', rules)
                 )
             )
+            self._violation_trace = self.fig.data[-1]  # extended by append
+
+    def append(self, new_rows, delta: bool = False):
+        """Add measurements to the end of the chart without rebuilding it (see `SPCStats.append`: limits stay frozen
+        and rules are re-checked over the tail only). A drawn scatter and violation trace are extended in place, and
+        the x axis widened if the new points run past it.
+
+        - *new_rows*: rows with the same columns as `df`
+        - *delta*: return the matching browser-side update instead of None, as a list of Plotly.js calls
+        {'method': 'extendTraces' | 'restyle' | 'relayout', 'args': [...]} to apply in order with
+        `Plotly[call.method](graphDiv, ...call.args)`. Arrays are numpy; encode with plotly.utils.PlotlyJSONEncoder.
+        """
+        old_n = len(self.y)
+        first = super().append(new_rows)
+        calls = []
+        if 'fig' not in self.__dict__ or self._scatter_trace is None:
+            return calls if delta else None
+
+        trace = self._scatter_trace
+        update = dict(x=np.asarray(self.x[old_n:]), y=self.y.iloc[old_n:].to_numpy(),
+                      **self.hover.append(self.plot_df.iloc[old_n:]))
+        _extend(trace, update, len(trace.x))
+        calls.append(dict(method='extendTraces',
+                          args=[{k: [v] for k, v in update.items()}, [self._trace_index(trace)]]))
+
+        trace = self._violation_trace
+        if trace is not None:
+            positions = first + bitmask.positions(self.violation_mask[first:])
+            rules = bitmask.labels(self.violation_mask[positions], self.detector.rules, self.detector.bits)
+            # the last old point is judged again (rules 5-7 flag a point once the window after it is complete); if it
+            # was drawn and its rules changed it is dropped and redrawn, which needs the whole trace sent again
+            redraw = False
+            if len(trace.x) and trace.x[-1] == first:
+                redraw = not len(positions) or positions[0] != first or rules[0] != trace.customdata[-1][-1]
+                if not redraw:
+                    positions, rules = positions[1:], rules[1:]
+            update = self.hover.annotate(positions, 'Violated Rules', rules)
+            del update['hovertemplate']
+            update.update(x=np.asarray(self.x[positions]), y=self.y.iloc[positions].to_numpy())
+            _extend(trace, update, len(trace.x) - redraw)
+            if redraw:
+                calls.append(dict(method='restyle', args=[{k: [trace[k]] for k in update}, [self._trace_index(trace)]]))
+            elif len(positions):
+                calls.append(dict(method='extendTraces',
+                                  args=[{k: [v] for k, v in update.items()}, [self._trace_index(trace)]]))
+
+        x_range = self._x_range()
+        if x_range[1] > self.fig.layout.xaxis.range[1]:
+            self.fig.update_xaxes(range=x_range)
+            calls.append(dict(method='relayout', args=[{'xaxis.range': x_range}]))
+        return calls if delta else None
+
+    def _trace_index(self, trace):
+        return next(i for i, t in enumerate(self.fig.data) if t is trace)
+
+    def _x_range(self):
+        return [-self.x[-1]*0.01, self.x[-1]*1.15]
+
+    def _violation_positions(self):
+        if type(self.violations) == str:
+            return np.array([], dtype=np.int64)
+        return bitmask.positions(self.violation_mask)
+
+    def companion_figure(self, scatter_style='default', plot_layout='default', line_style='default'):
+        """Build the companion dispersion chart (MR, R or S) of an I-MR or subgroup chart as a separate figure, with its
+        centre line and control limits drawn in the chart's color scheme.
+        """
+        import plotly.graph_objs as go
+
+        dispersion = self.dispersion
+        if dispersion is None:
+            raise ValueError('only I-MR and subgroup charts have a companion chart')
+        if isinstance(scatter_style, str):
+            scatter_style = presets['SCATTER_STYLE'][scatter_style]
+        if isinstance(plot_layout, str):
+            plot_layout = presets['PLOT_LAYOUT'][plot_layout]
+        if isinstance(line_style, str):
+            line_style = presets['ANNOTATED_LINE_STYLE'][line_style]
 
-    def capability(self):
-        if any((self.LSL, self.USL)):
-            cp = {
-                'mean': self.mean,
-                'LCL': self.LCL,
-                'UCL': self.UCL,
-                'Process Width': self.UCL - self.LCL,
-                'LSL': self.LSL,
-                'USL': self.USL
-            }
-            # two-sided specs
-            if all((self.LSL, self.USL)):
-                cp['Spec Width'] = self.USL - self.LSL
-                cp['Cp Lower'] = (self.mean - self.LSL) / (self.mean - self.LCL)
-                cp['Cp Upper'] = (self.USL - self.mean) / (self.UCL - self.mean)
-
-            # one-sided, lower spec
-            elif self.LSL:
-                cp['Spec Width'] = self.mean - self.LSL
-
-            # one-sided, upper spec
-            elif self.USL:
-                cp['Spec Width'] = self.USL - self.mean
-            cp['Cp'] = cp['Spec Width'] / cp['Process Width']
-            return cp
+        fig = go.Figure(layout=self.fig_layout)
+        fig.add_trace(go.Scatter(
+            x=self.x, y=dispersion['values'], **scatter_style,
+            hovertemplate=f'Index: %{{x}}<br>{dispersion["label"]}: %{{y}}<extra></extra>'
+        ))
+        lines = {'Center': ('mean', dispersion['center']),
+                 'UCL': ('line1', dispersion['UCL']),
+                 'LCL': ('line1', dispersion['LCL'])}
+        hlines = []
+        for label, (color, y_values) in lines.items():
+            style = {**line_style, 'line_color': self.color_scheme[color], 'line_dash': 'solid'}
+            if np.ndim(y_values):
+                fig.add_trace(go.Scatter(x=self.x, y=y_values, mode='lines', name=label, hoverinfo='skip',
+                                         line=dict(color=style['line_color'], shape='hv')))
+            else:
+                hlines.append((y_values, f'{label} ({round(y_values, 2)})', shapes.split_style(style)))
+        shapes.add_to(fig, *shapes.hline_shapes(hlines))
+        fig.update_layout(**plot_layout)
+        return fig
+
+
+def _extend(trace, update, keep):
+    """Replace each attribute of `trace` named in `update` by its first `keep` entries followed by the new values."""
+    for attr, values in update.items():
+        old = trace[attr]
+        if old is None or len(old) == 0:
+            trace[attr] = values
+        else:
+            trace[attr] = np.concatenate((np.asarray(old)[:keep], values))
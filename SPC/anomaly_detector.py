@@ -1,12 +1,72 @@
 # ripped from https://github.com/omerfarukozturk/AnomalyDetection
 # minor modifications made
-import pandas as pd
+from functools import cached_property
+import numpy as np
+from . import bitmask, limits, rules as registry, vectorized
+from .profiling import profiled, stage
 
 class AnomalyDetector:
-    def __init__(self, series):
-        self.data = pd.DataFrame(series.rename('amount'))
-        self.mean = series.mean()
-        self.sigma = series.std()
+    """Flags Western Electric style rule violations in a series.
+
+    - *series*: the pandas Series (or 1-D array) to check. NumPy arrays, `np.memmap` included, are kept as they are
+    and only read, a chunk at a time (see `vectorized.detect_into`); nothing as long as the series is allocated
+    besides `mask`.
+    - *engine*: 'vectorized' (default) evaluates the requested rules with array operations (see `vectorized.py`);
+    'loop' runs the original point-by-point implementations below, kept as a reference
+    - *mean*, *sigma*: limits to judge the series against instead of its own mean and standard deviation. Either may
+    be an array with one value per point (vectorized engine only).
+    - *profiler*: a `profiling.Profiler` recording each rule and `violations()` as a stage
+
+    Class Attributes:
+    - *values*: the series as an array (a view of the input where possible)
+    - *index*: labels of the points; a RangeIndex for array input
+    - *data*: the series as a dataframe with an `amount` column, built on first use; the loop engine adds a `RuleN`
+    column per rule to it
+    - *mask*: uint8 array with one entry per point, bit k - 1 set where rule k fired (see `bitmask.py`)
+    - *rules*: the rules applied so far, in order: rule numbers, and for the vectorized engine any names registered
+    in `rules.py` (or `Rule` objects, kept under their name)
+    - *bits*: {rule: bit of `mask`}; rule k is bit k - 1, other rules take the highest bits left free
+    """
+
+    profiler = None
+
+    def __init__(self, series, engine='vectorized', mean=None, sigma=None, profiler=None):
+        if engine not in ('vectorized', 'loop'):
+            raise ValueError('`engine` must be "vectorized" or "loop"')
+        self.engine = engine
+        if isinstance(series, np.ndarray):
+            self.values, self._index = series, None
+        elif hasattr(series, 'index'):
+            self.values, self._index = series.to_numpy(), series.index
+        else:
+            self.values, self._index = np.asarray(series), None
+        if mean is None or sigma is None:
+            moments = limits.moments(self.values)
+            mean = moments.mean if mean is None else mean
+            sigma = moments.std if sigma is None else sigma
+        self.mean = mean
+        self.sigma = sigma
+        self.profiler = profiler
+        self.mask = np.zeros(len(self.values), dtype=np.uint8)
+        self.rules = []
+        self.bits = {}
+        self._compiled = {}
+        self._tail = None  # (tail_start, rule keys, rules.RuleSet.state there) left by the last append
+
+    @property
+    def index(self):
+        if self._index is None:
+            import pandas as pd
+            return pd.RangeIndex(len(self.values))
+        return self._index
+
+    @cached_property
+    def data(self):
+        import pandas as pd
+        return pd.DataFrame({'amount': pd.Series(self.values, index=self.index, copy=False)})
+
+    def _profile_rows(self):
+        return len(self.values)
 
     # Rule 1: One point is more than 3 standard deviations from the mean (outlier)
     def rule1(self):
@@ -212,11 +272,105 @@ class AnomalyDetector:
         self.data['Rule8'] = values
 
     def apply_rules(self, rules):
-        for i in rules:
-            eval(f'self.rule{i}()')
-
+        """Run `rules` and set their bits in `mask`. `rules` may be anything `rules.compile` takes (rule numbers,
+        registered names such as 'N3' or 'R_4s', `Rule` objects, or rule set names such as 'westgard'); the loop
+        engine knows rule numbers only. Only the loop engine writes `RuleN` columns to `data`.
+        """
+        ruleset = registry.compile(rules, self.bits)
+        if self.engine == 'loop':
+            if np.ndim(self.mean) or np.ndim(self.sigma):
+                raise ValueError('per-point limits require the vectorized engine')
+            named = [key for key in ruleset if key not in registry.RULE_SETS['numbered']]
+            if named:
+                raise ValueError(f'the loop engine only knows rules 1-8, not {", ".join(map(repr, named))}')
+        self.rules += [key for key in ruleset if key not in self.rules]
+        self.bits.update(ruleset.bits)
+        self._compiled.update(ruleset.rules)
+        if self.engine == 'loop':
+            for i in ruleset:
+                with stage(self, f'rule{i}', len(self.data)):
+                    getattr(self, f'rule{i}')()
+            results = {i: self.data[f'Rule{i}'].to_numpy() for i in ruleset if f'Rule{i}' in self.data}
+            self.mask |= bitmask.encode(results, len(self.data))
+        else:
+            vectorized.detect_into(self.values, self.mean, self.sigma, ruleset, self.mask, self.profiler)
+
+    def load(self, mask, ruleset):
+        """Take `mask` as the result of applying `ruleset` (a `rules.RuleSet`), computed elsewhere: read from a cache,
+        or by a detector over many series at once.
+        """
+        self.mask = mask
+        self.rules = list(ruleset.keys)
+        self.bits = dict(ruleset.bits)
+        self._compiled = dict(ruleset.rules)
+
+    @property
+    def ruleset(self):
+        """The rules applied so far, compiled together (see `rules.RuleSet`)."""
+        return registry.RuleSet(list(self.rules), dict(self._compiled), dict(self.bits))
+
+    def append(self, series):
+        """Add points to the end of the series and check them under the current (scalar) limits. Rules are only
+        re-run over the last few points, from the counters of the runs in progress there (`rules.RuleSet.state`), so
+        the cost of checking them follows the new points, not the history.
+
+        Returns the first position whose entry in `mask` may have changed: the last old point, since rules 5-7 judge
+        a point once the window after it is complete.
+        """
+        import pandas as pd
+        if self.engine == 'loop':
+            raise ValueError('append requires the vectorized engine')
+        if np.ndim(self.mean) or np.ndim(self.sigma):
+            raise ValueError('append requires fixed limits, not per-point ones')
+        n = len(self.values)
+        if isinstance(series, pd.Series):
+            new, index = series.to_numpy(dtype=np.float64), series.index
+        else:
+            new = np.asarray(series, dtype=np.float64)
+            index = None if self._index is None else pd.RangeIndex(n, n + len(new))
+
+        ruleset = self.ruleset
+        start = ruleset.tail_start(n)
+        if self._tail is not None and self._tail[:2] == (start, tuple(ruleset.keys)):
+            seed = self._tail[2]
+        else:
+            seed = ruleset.state(self.values, self.mean, start)
+        values = np.concatenate((np.asarray(self.values[start:], dtype=np.float64), new))
+        tail, at, state = vectorized.detect_chunked(values, self.mean, self.sigma, ruleset, profiler=self.profiler,
+                                                    seed=seed)
+        self._tail = (start + at, tuple(ruleset.keys), state)
+
+        first = max(n - 1, 0)
+        self.mask = np.concatenate((self.mask[:first], tail[first - start:]))
+        if index is not None:
+            self._index = self.index.append(index)
+        self.values = np.concatenate((self.values, new))
+        self.__dict__.pop('data', None)
+        return first
+
+    def positions(self, rule=None):
+        """Positions of the points where `rule` fired, or where any rule fired."""
+        return bitmask.positions(self.mask, rule, self.bits)
+
+    def counts(self):
+        """{rule: number of points where it fired} for the rules applied."""
+        return bitmask.counts(self.mask, self.rules, bits=self.bits)
+
+    def decoded(self):
+        """Object array with the list of rules fired at every point (empty where none did). The lists are shared
+        between points, so treat them as read-only.
+        """
+        return bitmask.decode(self.mask, self.rules, self.bits)
+
+    @profiled()
     def violations(self):
-        df = self.data[self.data.columns[1:]]
-        df = df.loc[df.sum(axis=1) > 0]
-        df['violations'] = [list(filter(lambda x: bool(x), i)) for i in df.values]
-        return df.violations
+        """Series of the rules fired, as a list, at each violating point, indexed like the input series. Built from
+        `mask`; kept for compatibility, `positions()`, `counts()` and `mask` itself are cheaper.
+        """
+        import pandas as pd
+        hits = self.positions()
+        if not len(hits):
+            return pd.Series(index=self.index[:0], dtype=np.float64, name='violations')
+        values = np.empty(len(hits), dtype=object)
+        values[:] = [list(rules) for rules in bitmask.decode(self.mask[hits], self.rules, self.bits)]
+        return pd.Series(values, index=self.index[hits], name='violations')
@@ -0,0 +1,150 @@
+"""Statistics, capability and violations for many grouped series at once.
+
+The measurement column is pulled out as one float64 array sorted by group, so each group is a contiguous slice.
+Groups are handed to worker processes in chunks, each chunk as a single array slice plus offsets, rather than as
+per-group DataFrames.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from . import vectorized
+from .rules import compile as compile_rules
+
+
+def group_slices(df: pd.DataFrame, by):
+    """Group keys (sorted), the row positions of `df` ordered by group (stable within each), and offsets such that
+    group i is order[offsets[i]:offsets[i + 1]]. Rows with a missing key belong to no group.
+    """
+    grouped = df.groupby(by, sort=True)
+    codes = grouped.ngroup().to_numpy()
+    keys = grouped.size().index
+    kept = np.flatnonzero(codes >= 0)
+    # numpy's stable sort is a radix sort for 16-bit integers and narrower, several times faster than the merge sort
+    narrow = np.min_scalar_type(max(len(keys) - 1, 0))
+    order = kept[np.argsort(codes[kept].astype(narrow), kind='stable')]
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(codes[kept], minlength=len(keys)))))
+    return keys, order, offsets
+
+
+def _summarize_chunk(values, offsets, rules):
+    """Worker: summarize each group in one chunk. `offsets` delimit the groups within `values`."""
+    rows, flagged = [], []
+    rules = compile_rules(rules)
+    for start, stop in zip(offsets[:-1], offsets[1:]):
+        y = pd.Series(values[start:stop])
+        mean, std = y.mean(), y.std()
+        results = vectorized.detect(y.to_numpy(), mean, std, rules) if len(y) else {}
+        hits = np.zeros(len(y), dtype=bool)
+        counts = {}
+        for i, col in results.items():
+            fired = col > 0
+            counts[f'Rule{i}'] = int(fired.sum())
+            hits |= fired
+        rows.append(dict(n=len(y), mean=mean, std=std, min=y.min(), max=y.max(), **counts))
+        flagged.append(np.flatnonzero(hits))
+    return rows, flagged
+
+
+def _capability(summary, LSL, USL):
+    """Add the Cp columns `SPCPlot.capability()` reports, for limits shared by every group."""
+    width = summary['UCL'] - summary['LCL']
+    if LSL is not None and USL is not None:
+        summary['Cp Lower'] = (summary['mean'] - LSL) / (summary['mean'] - summary['LCL'])
+        summary['Cp Upper'] = (USL - summary['mean']) / (summary['UCL'] - summary['mean'])
+        summary['Cp'] = (USL - LSL) / width
+    elif LSL is not None:
+        summary['Cp'] = (summary['mean'] - LSL) / width
+    elif USL is not None:
+        summary['Cp'] = (USL - summary['mean']) / width
+
+
+class GroupedSPC:
+    """Per-group SPC results for a long-format dataframe, built by `spc_groupby`.
+
+    Class Attributes:
+    - *summary*: dataframe indexed by group key with n, mean, std, min, max, LCL, UCL, violation counts per rule,
+    the number of violating points and, given spec limits, Cp columns
+    - *violations*: dict of group key to the df index labels of that group's violating points
+    """
+
+    def __init__(self, df, y, by, summary, violations, rows, spc_kwargs):
+        self.df = df
+        self.y = y
+        self.by = by
+        self.summary = summary
+        self.violations = violations
+        self._rows = rows
+        self._spc_kwargs = spc_kwargs
+
+    def chart(self, key, draw: bool = True, **kwargs):
+        """Build the `SPCPlot` for one group on demand. Keyword arguments override those given to `spc_groupby`;
+        with `draw` the scatter, zones, lines and violations are drawn as well.
+        """
+        from . import SPCPlot
+        from .cache import render
+
+        chart = SPCPlot(self.df.iloc[self._rows[key]], self.y, **{**self._spc_kwargs, **kwargs})
+        return render(chart, serialize=False) if draw else chart
+
+    def figures(self, keys=None, **kwargs):
+        """Lazily yield (key, figure) for the given groups, or all of them."""
+        for key in (self.summary.index if keys is None else keys):
+            yield key, self.chart(key, **kwargs).fig
+
+
+def spc_groupby(df: pd.DataFrame, y: str, by,
+                violations: list = [1, 2, 3, 4, 5, 6, 7, 8],
+                spec_limits: dict = None,
+                processes: int = None,
+                chunksize: int = 256,
+                **spc_kwargs):
+    """Compute statistics, capability and violations for every group of a long-format dataframe.
+
+    - *df*: dataframe holding all series, one row per measurement, ordered within each group
+    - *y*: the column name of the measurements
+    - *by*: column name(s) identifying a series, as for `DataFrame.groupby`
+    - *violations*: rules to check, as for `SPCPlot`
+    - *spec_limits*: {'LSL': .., 'USL': ..} shared by every group, used for the Cp columns
+    - *processes*: worker processes; None uses every CPU, 1 runs in this process
+    - *chunksize*: groups per task sent to a worker
+    - *spc_kwargs*: further `SPCPlot` arguments, only used when charts are built
+
+    Returns a `GroupedSPC`.
+    """
+    keys, order, offsets = group_slices(df, by)
+    values = df[y].to_numpy(dtype=np.float64)[order]
+
+    # compiled here, so workers get the rules themselves rather than names they may not have registered
+    rules = compile_rules(violations)
+    bounds = list(range(0, len(keys), chunksize)) + [len(keys)]
+    tasks = [(values[offsets[a]:offsets[b]], offsets[a:b + 1] - offsets[a], rules)
+             for a, b in zip(bounds[:-1], bounds[1:])]
+
+    processes = processes or os.cpu_count()
+    if processes == 1 or len(tasks) == 1:
+        results = [_summarize_chunk(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            results = list(pool.map(_summarize_chunk, *zip(*tasks)))
+
+    rows = [row for chunk_rows, _ in results for row in chunk_rows]
+    flagged = [hits for _, chunk_flagged in results for hits in chunk_flagged]
+
+    summary = pd.DataFrame(rows, index=keys)
+    summary['UCL'] = summary['mean'] + 3 * summary['std']
+    summary['LCL'] = summary['mean'] - 3 * summary['std']
+    summary['violations'] = [len(hits) for hits in flagged]
+    rule_cols = [c for c in summary.columns if c.startswith('Rule')]
+    summary[rule_cols] = summary[rule_cols].fillna(0).astype(np.int64)
+
+    if spec_limits:
+        _capability(summary, spec_limits.get('LSL'), spec_limits.get('USL'))
+
+    labels = df.index[order]
+    group_rows = {key: order[offsets[i]:offsets[i + 1]] for i, key in enumerate(keys)}
+    group_violations = {key: labels[offsets[i]:offsets[i + 1]][hits]
+                        for i, (key, hits) in enumerate(zip(keys, flagged))}
+
+    return GroupedSPC(df, y, by, summary, group_violations, group_rows,
+                      dict(violations=violations, spec_limits=spec_limits, **spc_kwargs))
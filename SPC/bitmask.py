@@ -0,0 +1,69 @@
+"""Rule violations as one uint8 per point: bit k - 1 is set where rule k fired.
+
+Rules other than the numbered ones (see `rules.py`) take the highest bits those leave free. The functions here
+default to bit k - 1 for rule k; pass the `bits` mapping the rules were compiled with (`AnomalyDetector.bits`,
+`rules.RuleSet.bits`) for any others.
+
+Decoding goes through 256-entry lookup tables, so turning a mask into lists or hover labels costs one indexing
+operation however many rules fired.
+"""
+from functools import lru_cache
+import numpy as np
+
+RULES = tuple(range(1, 9))
+
+
+def _slot(rule, bits=None):
+    return bits[rule] if bits and rule in bits else int(rule) - 1
+
+
+def bit(rule, bits: dict = None):
+    return np.uint8(1 << _slot(rule, bits))
+
+
+def encode(results, n: int, bits: dict = None):
+    """Mask of length `n` from a {rule: array} dict such as `vectorized.detect` returns (nonzero means fired)."""
+    mask = np.zeros(n, dtype=np.uint8)
+    for rule, fired in results.items():
+        mask |= np.where(np.asarray(fired) != 0, bit(rule, bits), np.uint8(0))
+    return mask
+
+
+def positions(mask, rule=None, bits: dict = None):
+    """Positions where `rule` fired, or where any rule fired."""
+    return np.flatnonzero(mask if rule is None else mask & bit(rule, bits))
+
+
+def counts(mask, rules=RULES, chunksize: int = 1 << 18, bits: dict = None):
+    """{rule: number of points where it fired}. The mask is unpacked `chunksize` points at a time."""
+    mask = np.asarray(mask, dtype=np.uint8)
+    per_bit = np.zeros(8, dtype=np.int64)
+    for start in range(0, len(mask), chunksize):
+        unpacked = np.unpackbits(mask[start:start + chunksize, None], axis=1, bitorder='little')
+        per_bit += unpacked.sum(axis=0, dtype=np.int64)
+    return {rule if bits else int(rule): int(per_bit[_slot(rule, bits)]) for rule in rules}
+
+
+@lru_cache(maxsize=None)
+def _tables(order: tuple, slots: tuple):
+    lists = np.empty(256, dtype=object)
+    lists[:] = [[rule for rule, slot in zip(order, slots) if m & (1 << slot)] for m in range(256)]
+    labels = np.array([','.join(map(str, rules)) for rules in lists], dtype=object)
+    return lists, labels
+
+
+def _key(order, bits):
+    order = tuple(order) if bits else tuple(int(r) for r in order)
+    return order, tuple(_slot(rule, bits) for rule in order)
+
+
+def decode(mask, order=RULES, bits: dict = None):
+    """Object array of the rules fired at each point, as lists in `order`. The lists are shared between points with
+    the same mask, so treat them as read-only.
+    """
+    return _tables(*_key(order, bits))[0][mask]
+
+
+def labels(mask, order=RULES, bits: dict = None):
+    """Object array of "1,5"-style strings of the rules fired at each point, in `order`."""
+    return _tables(*_key(order, bits))[1][mask]
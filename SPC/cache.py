@@ -0,0 +1,200 @@
+"""Memoizing cache for charts rebuilt over unchanged data, e.g. by a dashboard on every page load.
+
+Entries are keyed by a BLAKE2 digest of the measurements (plus subgroup labels) and the constructor arguments, so
+the same series under the same settings hits the cache whatever dataframe object it arrives in. Two kinds of entry
+are kept:
+
+- statistics and the violation mask, reused by `ChartCache.chart` to skip the statistics and every rule;
+- serialized figure JSON, returned by `ChartCache.figure_json`. Its key also covers every column of the dataframe
+(they feed the hover labels) and the figure styles.
+
+The in-memory store is a bounded LRU. With a `directory`, entries are also pickled there (one file per key) and
+survive restarts; only point it at a directory this process owns, since pickles are trusted on load.
+"""
+import hashlib
+import json
+import os
+import pickle
+import threading
+from collections import OrderedDict
+import numpy as np
+from . import rules as registry
+
+# the SPCStats inputs that decide statistics and violations
+STAT_ARGS = ('y_label', 'sides', 'spec_limits', 'limits', 'limits_window', 'rules',
+             'chart_type', 'chart_options', 'subgroup', 'subgroup_size')
+# the drawing methods figure_json calls, in order; `styles` may hold keyword arguments for each
+DRAW_METHODS = ('draw_scatter', 'draw_spc_zones', 'draw_lines', 'draw_violations')
+
+
+def _digest(*parts):
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            h.update(np.ascontiguousarray(part).view(np.uint8).data)
+        else:
+            h.update(json.dumps(part, sort_keys=True, default=repr).encode())
+        h.update(b'\x00')
+    return h.hexdigest()
+
+
+def _frame_hash(df):
+    import pandas as pd
+    return pd.util.hash_pandas_object(df, index=True).to_numpy()
+
+
+def data_key(chart):
+    """Cache key for the statistics and violations of an `SPCStats` / `SPCPlot`."""
+    parts = [chart.measurements.to_numpy(dtype=np.float64)]
+    if chart.subgroup is not None:
+        parts.append(_frame_hash(chart.df[chart.subgroup]))
+    # the rules as defined now, so a name registered again with other parameters is a different key
+    rules = [repr(rule) for rule in registry.compile(chart.rules).rules.values()]
+    return _digest('data', *parts, {name: getattr(chart, name) for name in STAT_ARGS}, rules)
+
+
+def render(chart, styles: dict = None, serialize: bool = True):
+    """Plotly JSON of `chart` fully drawn: each of `DRAW_METHODS` called with its `styles` entry, then serialized.
+    Without `serialize`, the drawn chart itself is returned.
+    """
+    for method in DRAW_METHODS:
+        getattr(chart, method)(**(styles or {}).get(method, {}))
+    return chart.fig.to_json() if serialize else chart
+
+
+def figure_key(chart, styles=None):
+    """Cache key for the drawn figure of an `SPCPlot`: its data key, all dataframe columns, layout and styles."""
+    df = chart.df if hasattr(chart.df, 'columns') else None
+    parts = [] if df is None else [_frame_hash(df), list(df.columns)]
+    return _digest('figure', data_key(chart), *parts, chart.fig_layout, chart.color_scheme, styles or {})
+
+
+class ChartCache:
+    """Bounded LRU of chart statistics, violation masks and figure JSON, optionally backed by a directory.
+
+    - *maxsize*: entries kept in memory; the least recently used is dropped beyond that
+    - *directory*: where to also keep entries on disk (created if missing); None for memory only. Disk entries are
+    not bounded and are only removed by `invalidate`.
+
+    Class Attributes:
+    - *hits*, *misses*: lookups served from memory or disk, and lookups that had to compute
+    - *disk_hits*: the hits that were read back from `directory`
+    - *evictions*: entries dropped from memory to respect `maxsize`
+    """
+
+    def __init__(self, maxsize: int = 128, directory: str = None):
+        self.maxsize = maxsize
+        self.directory = directory
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.disk_hits = self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries or (self.directory is not None and os.path.exists(self._path(key)))
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.pkl')
+
+    def get(self, key):
+        """The entry stored under `key`, or None. Counts as a hit or a miss."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+        if self.directory is not None:
+            try:
+                with open(self._path(key), 'rb') as f:
+                    value = pickle.load(f)
+            except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+                pass
+            else:
+                with self._lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+                self._remember(key, value)
+                return value
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, value):
+        """Store `value` under `key`, in memory and, with a directory, on disk."""
+        self._remember(key, value)
+        if self.directory is not None:
+            tmp = f'{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._path(key))  # readers never see a partial file
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: str = None):
+        """Drop the entry under `key`, or every entry (disk included) when no key is given."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+        if self.directory is None:
+            return
+        names = os.listdir(self.directory) if key is None else [key + '.pkl']
+        for name in names:
+            if name.endswith('.pkl'):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+
+    def metrics(self):
+        """Counters as a flat dict, with the hit rate over all lookups so far."""
+        lookups = self.hits + self.misses
+        return dict(hits=self.hits, misses=self.misses, disk_hits=self.disk_hits, evictions=self.evictions,
+                    size=len(self._entries), hit_rate=self.hits / lookups if lookups else None)
+
+    def chart(self, df, y: str = None, **kwargs):
+        """`SPCPlot(df, y, **kwargs)` with its statistics and violations taken from the cache when this series has
+        been seen under these arguments before, and stored otherwise.
+        """
+        from . import SPCPlot
+
+        chart = SPCPlot(df, y, **kwargs)
+        key = data_key(chart)
+        entry = self.get(key)
+        if entry is None:
+            detector = chart.detector
+            # copies: the detector ORs later rule passes into its mask in place
+            self.put(key, dict(statistics=dict(chart.statistics), mask=detector.mask.copy(),
+                               rules=list(detector.rules), ruleset=detector.ruleset))
+            return chart
+
+        ruleset = entry.get('ruleset') or registry.compile(entry['rules'])
+        return SPCPlot.from_results(df, y, dict(entry['statistics']), entry['mask'].copy(), ruleset,
+                                    **{**kwargs, 'violations': chart.rules})
+
+    def figure_json(self, df, y: str = None, styles: dict = None, key: str = None, **kwargs):
+        """Plotly JSON of the fully drawn chart (scatter, zones, lines, violations), from the cache if possible.
+
+        - *styles*: {draw method name: keyword arguments}, e.g. {'draw_scatter': {'scatter_style': 'default'}}
+        - *key*: its `figure_key`, if already known
+        - *kwargs*: `SPCPlot` constructor arguments
+        """
+        from . import SPCPlot
+
+        key = key or figure_key(SPCPlot(df, y, **kwargs), styles)
+        fig_json = self.get(key)
+        if fig_json is None:
+            fig_json = render(self.chart(df, y, **kwargs), styles)
+            self.put(key, fig_json)
+        return fig_json
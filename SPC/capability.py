@@ -0,0 +1,124 @@
+"""Process capability of many characteristics at once.
+
+`capability_groupby` takes a long-format dataframe with group keys and the spec limits of each group in their own
+columns, orders the rows by group once (see `batch.group_slices`) and computes every index for every group with
+`reduceat` over the one array:
+
+- Cp = (USL - LSL) / 6 sigma_within, Cpk = min(USL - mean, mean - LSL) / 3 sigma_within
+- Pp, Ppk: the same with the overall standard deviation
+- observed PPM: measurements outside the spec limits, per million
+- expected PPM: the normal tail area beyond the limits, from the mean and overall standard deviation
+
+sigma_within is MR-bar / d2 (moving ranges of consecutive measurements within a group, as for an I-MR chart), or
+the overall standard deviation with within='overall'. A missing (NaN) limit makes that side unbounded: Cp and Pp
+need both limits and are NaN otherwise, while Cpk and Ppk fall back to the one side given. Limits of 0 are limits
+like any other.
+"""
+import math
+import numpy as np
+import pandas as pd
+from .batch import group_slices
+from .subgroups import constants
+
+WITHIN = ('moving_range', 'overall')
+
+_erfc = np.frompyfunc(math.erfc, 1, 1)
+
+
+def normal_sf(z):
+    """P(Z > z) for a standard normal Z, elementwise (NaN stays NaN)."""
+    z = np.asarray(z, dtype=np.float64)
+    return (0.5 * _erfc(z / math.sqrt(2))).astype(np.float64)
+
+
+def _limit(df, limit, order, starts):
+    """One limit per group from a column name (its first non-missing value in the group), a number or None."""
+    if limit is None:
+        return np.full(len(starts), np.nan)
+    if not isinstance(limit, str):
+        return np.full(len(starts), float(limit))
+    column = df[limit].to_numpy(dtype=np.float64, na_value=np.nan)
+    out = column[order[starts]]
+    missing = np.flatnonzero(np.isnan(out))
+    if len(missing):
+        # the first non-missing position at or after the group's start, if it is still inside the group
+        values = column[order]
+        present = np.flatnonzero(~np.isnan(values))
+        first = np.searchsorted(present, starts[missing])
+        ends = np.append(starts[1:], len(values))[missing]
+        inside = first < len(present)
+        inside[inside] = present[first[inside]] < ends[inside]
+        out[missing[inside]] = values[present[first[inside]]]
+    return out
+
+
+def indices(mean, sigma, LSL, USL):
+    """(Cp, Cpk) for arrays of means, sigmas and spec limits (NaN where a limit is missing)."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        upper = (USL - mean) / (3 * sigma)
+        lower = (mean - LSL) / (3 * sigma)
+        cp = (USL - LSL) / (6 * sigma)
+    cpk = np.fmin(upper, lower)  # the side that is given, where only one is
+    return cp, cpk
+
+
+def capability_groupby(df: pd.DataFrame, y: str, by,
+                       LSL='LSL', USL='USL',
+                       within: str = 'moving_range'):
+    """Cp, Cpk, Pp, Ppk, observed and expected PPM for every group of a long-format dataframe.
+
+    - *df*: one row per measurement, ordered in time within each group
+    - *y*: the column name of the measurements
+    - *by*: column name(s) identifying a characteristic, as for `DataFrame.groupby`
+    - *LSL*, *USL*: column names holding each group's limits (the first non-missing value in the group is used), a
+    number shared by every group, or None for no limit on that side
+    - *within*: 'moving_range' (MR-bar / d2) or 'overall' for the sigma behind Cp and Cpk
+
+    Returns a dataframe indexed by group key with n, mean, sigma_within, sigma_overall, LSL, USL, Cp, Cpk, Pp, Ppk,
+    ppm_observed and ppm_expected. NaNs in `y` are skipped.
+    """
+    if within not in WITHIN:
+        raise ValueError(f'`within` must be one of {", ".join(WITHIN)}')
+    keys, order, offsets = group_slices(df, by)
+    values = df[y].to_numpy(dtype=np.float64, na_value=np.nan)[order]
+    if not len(keys):
+        return pd.DataFrame(columns=['n', 'mean', 'sigma_within', 'sigma_overall', 'LSL', 'USL', 'Cp', 'Cpk',
+                                     'Pp', 'Ppk', 'ppm_observed', 'ppm_expected'])
+    starts, sizes = offsets[:-1], np.diff(offsets)
+
+    finite = ~np.isnan(values)
+    n = np.add.reduceat(finite, starts)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.add.reduceat(np.where(finite, values, 0.0), starts) / n
+        dev = np.where(finite, values - np.repeat(mean, sizes), 0.0)
+        sigma_overall = np.sqrt(np.add.reduceat(dev * dev, starts) / (n - 1))
+    sigma_overall[n < 2] = np.nan
+
+    if within == 'overall':
+        sigma_within = sigma_overall
+    else:
+        # moving ranges, the first row of each group excluded; NaN next to a missing value, and left out
+        moving = np.abs(np.diff(values, prepend=np.nan))
+        moving[starts] = np.nan
+        counted = ~np.isnan(moving)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mr_bar = np.add.reduceat(np.where(counted, moving, 0.0), starts) / np.add.reduceat(counted, starts)
+        sigma_within = mr_bar / constants(2)['d2']
+
+    lsl = _limit(df, LSL, order, starts)
+    usl = _limit(df, USL, order, starts)
+    cp, cpk = indices(mean, sigma_within, lsl, usl)
+    pp, ppk = indices(mean, sigma_overall, lsl, usl)
+
+    out_of_spec = finite & ((values < np.repeat(lsl, sizes)) | (values > np.repeat(usl, sizes)))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ppm_observed = np.add.reduceat(out_of_spec, starts) / n * 1e6
+        below = np.where(np.isnan(lsl), 0.0, normal_sf((mean - lsl) / sigma_overall))
+        above = np.where(np.isnan(usl), 0.0, normal_sf((usl - mean) / sigma_overall))
+    ppm_expected = (below + above) * 1e6
+    ppm_expected[np.isnan(lsl) & np.isnan(usl)] = np.nan
+
+    return pd.DataFrame(dict(
+        n=n, mean=mean, sigma_within=sigma_within, sigma_overall=sigma_overall, LSL=lsl, USL=usl,
+        Cp=cp, Cpk=cpk, Pp=pp, Ppk=ppk, ppm_observed=ppm_observed, ppm_expected=ppm_expected,
+    ), index=keys)
@@ -52,7 +52,11 @@ ANNOTATED_LINE_STYLE = {
         # 'annotation_font': {
         #     'color': ''
         # },
-    }
+    },
+    'spec': {
+        'line_dash': 'dash',
+        'line_color': 'black',
+    },
 }
 
 SHAPE_LAYOUT = {
@@ -63,6 +67,26 @@ SHAPE_LAYOUT = {
     },
 }
 
+# named hover presets for draw_scatter(hovertemplate=...): CUSTOMDATA lists the columns fed to the template
+# under the same key in HOVERTEMPLATE, referenced there as %{customdata[i]}
+CUSTOMDATA = {}
+
+HOVERTEMPLATE = {}
+
+# draw_scatter switches to WebGL above `threshold` points and keeps about `n_out` of them,
+# chosen by `algorithm` ('lttb', 'minmax' or None to keep all; see downsample.py)
+LARGE_DATA = {
+    'default': {
+        'threshold': 100_000,
+        'algorithm': 'lttb',
+        'n_out': 10_000,
+    },
+    'webgl_only': {
+        'threshold': 100_000,
+        'algorithm': None,
+    },
+}
+
 COLOR_SCHEME = {
     'Classic': {
         'zone0': '#B8EEBE',
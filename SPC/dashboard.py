@@ -0,0 +1,262 @@
+"""Many SPC charts as the panels of one figure.
+
+Building one `SPCPlot` per series and stitching the figures together repeats the layout, template and styles in
+every figure and draws every zone and line through its own `add_hrect` / `add_hline`. `spc_dashboard` instead:
+
+- lays all series out end to end in one float64 array (each series a contiguous slice, as in `batch.py`) and
+computes every series' mean, standard deviation, min, max and limits with one set of `reduceat` calls;
+- runs the rules over every column of wide data at once (over each slice of long data), writing one violation
+mask (see `bitmask.py`);
+- resolves the style presets once: trace styles go into the figure template, so each panel's trace carries only
+its data and axes, and zones and lines of every panel are added in one layout update (see `shapes.py`);
+- draws long series with Scattergl and downsampling, as `SPCPlot.draw_scatter` does.
+"""
+from __future__ import annotations
+import math
+from functools import cached_property
+import numpy as np
+import pandas as pd
+from . import bitmask, downsample, rules as registry, shapes, vectorized
+from .batch import group_slices
+
+LINES = {'Mean': 'mean', '-1S': 'line0', '+1S': 'line0', 'UCL': 'line1', 'LCL': 'line1'}
+STATS = {'Mean': 'mean', '-1S': 'L1s', '+1S': 'U1s', 'UCL': 'UCL', 'LCL': 'LCL'}
+
+
+def series_statistics(values, offsets):
+    """n, mean, std (ddof=1), min, max and the control lines of every slice values[offsets[i]:offsets[i + 1]],
+    NaNs skipped as pandas does. Slices must not be empty.
+    """
+    starts = offsets[:-1]
+    finite = ~np.isnan(values)
+    n = np.add.reduceat(finite, starts)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.add.reduceat(np.where(finite, values, 0.0), starts) / n
+        dev = np.where(finite, values - np.repeat(mean, np.diff(offsets)), 0.0)
+        std = np.sqrt(np.add.reduceat(dev * dev, starts) / (n - 1))
+    std[n < 2] = np.nan
+    return pd.DataFrame(dict(
+        n=n, mean=mean, std=std,
+        min=np.fmin.reduceat(values, starts), max=np.fmax.reduceat(values, starts),
+        UCL=mean + 3 * std, LCL=mean - 3 * std, L1s=mean - std, U1s=mean + std,
+    ))
+
+
+class Dashboard:
+    """SPC statistics and violations of many series, and a figure with one panel per series. Built by
+    `spc_dashboard`; the figure is built on first access of `figure`, `fig`, `to_json` or `to_html`.
+
+    Class Attributes:
+    - *keys*: the series, in panel order (column names, or group keys)
+    - *summary*: dataframe indexed by key with n, mean, std, min, max, UCL, LCL, L1s, U1s, violation counts per
+    rule and the number of violating points
+    - *values*: every series end to end; series i is values[offsets[i]:offsets[i + 1]]
+    - *mask*: rule bits of every point of `values`
+    - *bits*: {rule: bit of `mask`}
+    """
+
+    def __init__(self, keys, values, offsets, labels, summary, mask, rules, cols, styles, shared_xaxes, bits=None):
+        self.keys = keys
+        self.values = values
+        self.offsets = offsets
+        self.labels = labels
+        self.summary = summary
+        self.mask = mask
+        self.rules = rules
+        self.bits = bits
+        self.cols = cols
+        self.styles = styles
+        self.shared_xaxes = shared_xaxes
+
+    def _slice(self, key):
+        i = self.keys.get_loc(key)
+        return slice(self.offsets[i], self.offsets[i + 1])
+
+    def positions(self, key, rule=None):
+        """Positions within series `key` where `rule`, or any rule, fired."""
+        return bitmask.positions(self.mask[self._slice(key)], rule, self.bits)
+
+    def violations(self, key):
+        """Series of the rules fired at each violating point of series `key`, as lists, indexed by its labels."""
+        part = self._slice(key)
+        hits = self.positions(key)
+        values = np.empty(len(hits), dtype=object)
+        values[:] = [list(rules) for rules in bitmask.decode(self.mask[part][hits], self.rules, self.bits)]
+        return pd.Series(values, index=self.labels[part][hits], name='violations')
+
+    @cached_property
+    def figure(self):
+        """The figure as a plain dict ({'data': [...], 'layout': {...}}). Only the subplot grid and the presets go
+        through plotly's validation; the per-panel traces, shapes and annotations are assembled as dicts.
+        """
+        from plotly.subplots import make_subplots
+
+        s = self.styles
+        rows = math.ceil(len(self.keys) / self.cols)
+        grid = make_subplots(rows=rows, cols=self.cols, shared_xaxes=self.shared_xaxes,
+                             subplot_titles=[str(key) for key in self.keys] if s['titles'] else None,
+                             vertical_spacing=min(0.3 / rows, 0.02), horizontal_spacing=min(0.3 / self.cols, 0.02))
+        grid.update_layout(**s['fig_layout'])
+        grid.update_layout(**{**s['plot_layout'], 'height': s['panel_height'] * rows})
+        layout = grid.layout.to_plotly_json()
+        # shared trace styles live in the template, once
+        style = shapes.nested(s['scatter_style'])
+        layout['template'].setdefault('data', {}).update(scatter=[dict(type='scatter', **style)],
+                                                         scattergl=[dict(type='scattergl', **style)])
+
+        large = s['large_data']
+        marker = shapes.nested(s['violation_marker'])
+        line_styles = {line: shapes.split_style({**s['line_style'], 'line_color': s['color_scheme'][line],
+                                                 'line_dash': 'solid'})
+                       for line in set(LINES.values())}
+        summary = self.summary[list(STATS.values())].to_numpy()
+        longest = max(np.diff(self.offsets))
+        data, all_shapes, annotations = [], [], list(layout.get('annotations', ()))
+        for i, key in enumerate(self.keys):
+            axis = '' if i == 0 else str(i + 1)
+            refs = dict(xaxis='x' + axis, yaxis='y' + axis)
+            stats = dict(zip(STATS.values(), summary[i]))
+            y = self.values[self.offsets[i]:self.offsets[i + 1]]
+            mask = self.mask[self.offsets[i]:self.offsets[i + 1]]
+            x = np.arange(len(y))
+            hits = bitmask.positions(mask)
+
+            # x defaults to 0, 1, 2, ... in plotly.js, so it is only sent for downsampled traces
+            trace = dict(type='scatter', y=y, name=str(key), hovertemplate=s['hovertemplate'], **refs)
+            if len(y) > large['threshold']:
+                trace['type'] = 'scattergl'
+                if large.get('algorithm'):
+                    keep = np.union1d(downsample.ALGORITHMS[large['algorithm']](x, y, large['n_out']), hits)
+                    trace.update(x=keep, y=y[keep])
+            data.append(trace)
+            if len(hits):
+                data.append(dict(type='scatter', x=hits, y=y[hits], mode='markers', marker=marker, name=str(key),
+                                 text=bitmask.labels(mask[hits], self.rules, self.bits),
+                                 hovertemplate='Violated Rules: %{text}<br>' + s['hovertemplate'], **refs))
+
+            spacer = stats['UCL'] - stats['mean']
+            zones = {'+2': [stats['UCL'], stats['UCL'] + 5 * spacer],
+                     '+1': [stats['U1s'], stats['UCL']],
+                     '0': [stats['L1s'], stats['U1s']],
+                     '-1': [stats['LCL'], stats['L1s']],
+                     '-2': [stats['LCL'] - 5 * spacer, stats['LCL']]}
+            all_shapes += shapes.zone_shapes(zones, s['color_scheme'], s['shape_layout'], refs['xaxis'], refs['yaxis'])
+            lines = [(stats[stat], f'{label} ({round(stats[stat], 2)})' if s['show_value'] else label,
+                      line_styles[LINES[label]]) for label, stat in STATS.items()]
+            line_shapes, line_labels = shapes.hline_shapes(lines, refs['xaxis'], refs['yaxis'])
+            all_shapes += line_shapes
+            annotations += line_labels
+
+            width = longest if self.shared_xaxes else len(y)
+            layout['xaxis' + axis]['range'] = [-width * 0.01, width * 1.15]
+            layout['yaxis' + axis]['range'] = [stats['LCL'] - spacer * 0.25, stats['UCL'] + spacer * 0.25]
+
+        layout['shapes'] = list(layout.get('shapes', ())) + all_shapes
+        layout['annotations'] = annotations
+        return dict(data=data, layout=layout)
+
+    @property
+    def fig(self):
+        """The figure as a plotly Figure. Validating hundreds of panels is slow; to serve the page, `to_json` and
+        `to_html` skip it.
+        """
+        import plotly.graph_objs as go
+        return go.Figure(self.figure)
+
+    def to_json(self, **kwargs):
+        """Plotly JSON of `figure`, unvalidated. Keyword arguments go to `plotly.io.to_json`."""
+        import plotly.io as pio
+        return pio.to_json(self.figure, validate=False, **kwargs)
+
+    def to_html(self, **kwargs):
+        """HTML page of `figure`, unvalidated. Keyword arguments go to `plotly.io.to_html`."""
+        import plotly.io as pio
+        return pio.to_html(self.figure, validate=False, **kwargs)
+
+
+def _preset(name, value):
+    from . import presets
+    return presets[name][value] if isinstance(value, str) else value
+
+
+def spc_dashboard(df: pd.DataFrame, y: str = None, by=None,
+                  columns: list = None,
+                  cols: int = 1,
+                  violations: list = [1, 2, 3, 4, 5, 6, 7, 8],
+                  shared_xaxes: bool = True,
+                  titles: bool = True,
+                  panel_height: int = 188,
+                  show_value: bool = True,
+                  fig_layout: dict | str = 'default',
+                  plot_layout: dict | str = 'default',
+                  scatter_style: dict | str = 'default',
+                  shape_layout: dict | str = 'default',
+                  line_style: dict | str = 'default',
+                  color_scheme: dict | str = 'Classic',
+                  large_data: dict | str = 'default'):
+    """Compute SPC statistics and violations for many series at once and lay them out as the panels of one figure.
+
+    - *df*: either wide, one column per series (rows ordered in time), or long, with `y` and `by`
+    - *y*, *by*: for long data, the measurement column and the column(s) identifying a series, as for
+    `spc_groupby`; rows are taken in order within each series
+    - *columns*: for wide data, the columns to chart (all numeric columns by default)
+    - *cols*: panels per row
+    - *violations*: rules to check, as for `SPCPlot`
+    - *shared_xaxes*: give every panel the same x range, that of the longest series
+    - *titles*: label each panel with its key
+    - *panel_height*: height in pixels of each row of panels
+    - the style arguments are names of presets (see `presets`) or dicts, as for `SPCPlot` and its draw methods,
+    resolved once for every panel. 'height' in the plot layout is replaced by panel_height times the rows.
+
+    Returns a `Dashboard`; its figure is built on first access. Limits are global and two-sided.
+    """
+    if by is None:
+        columns = list(df.select_dtypes('number').columns) if columns is None else list(columns)
+        block = df[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        values = np.ascontiguousarray(block.T).ravel()
+        offsets = np.arange(len(columns) + 1) * len(df)
+        keys = pd.Index(columns)
+        labels = np.tile(df.index.to_numpy(), len(columns))
+        if not len(df):
+            raise ValueError('no rows to chart')
+    else:
+        if y is None:
+            raise ValueError('long data needs the measurement column as `y`')
+        keys, order, offsets = group_slices(df, by)
+        values = df[y].to_numpy(dtype=np.float64, na_value=np.nan)[order]
+        labels = df.index.to_numpy()[order]
+    if not len(keys):
+        raise ValueError('no series to chart')
+
+    summary = series_statistics(values, offsets).set_index(keys)
+    mean, std = summary['mean'].to_numpy(), summary['std'].to_numpy()
+    ruleset = registry.compile(violations)
+    if by is None:
+        # equal lengths: every column at once, the limits broadcast along the rows
+        mask = np.zeros(block.shape, dtype=np.uint8)
+        vectorized.detect_into(block, mean, std, ruleset, mask)
+        mask = np.ascontiguousarray(mask.T).ravel()
+    else:
+        mask = np.zeros(len(values), dtype=np.uint8)
+        for i, (start, stop) in enumerate(zip(offsets[:-1], offsets[1:])):
+            vectorized.detect_into(values[start:stop], mean[i], std[i], ruleset, mask[start:stop])
+    bits = np.unpackbits(mask[:, None], axis=1, bitorder='little')
+    per_rule = np.add.reduceat(bits, offsets[:-1], axis=0, dtype=np.int64)
+    for rule in ruleset:
+        summary[f'Rule{rule}'] = per_rule[:, ruleset.bits[rule]]
+    summary['violations'] = np.add.reduceat(mask != 0, offsets[:-1])
+
+    styles = dict(
+        fig_layout=_preset('FIGURE_LAYOUT', fig_layout),
+        plot_layout=_preset('PLOT_LAYOUT', plot_layout),
+        scatter_style=_preset('SCATTER_STYLE', scatter_style),
+        shape_layout=_preset('SHAPE_LAYOUT', shape_layout),
+        line_style=_preset('ANNOTATED_LINE_STYLE', line_style),
+        color_scheme=_preset('COLOR_SCHEME', color_scheme),
+        large_data=_preset('LARGE_DATA', large_data),
+        hovertemplate='Index: %{x}<br>Value: %{y}<extra>%{fullData.name}</extra>',
+        violation_marker=dict(symbol='x-thin', line_width=3, line_color='red', size=10),
+        titles=titles, panel_height=panel_height, show_value=show_value,
+    )
+    return Dashboard(keys, values, offsets, labels, summary, mask, list(ruleset), cols, styles, shared_xaxes,
+                     ruleset.bits)
@@ -0,0 +1,54 @@
+"""Point selection for drawing long series. Each function returns the sorted positions of the points to keep,
+always including the first and last point; NaNs are never selected.
+"""
+import numpy as np
+
+
+def _finite(y):
+    y = np.asarray(y, dtype=np.float64)
+    return np.flatnonzero(~np.isnan(y)), y
+
+
+def minmax(x, y, n_out: int):
+    """Keep the lowest and highest point of each of n_out / 2 equal-width buckets."""
+    keep, y = _finite(y)
+    if len(keep) <= n_out:
+        return keep
+    buckets = max(n_out // 2, 1)
+    bucket = np.arange(len(keep)) * buckets // len(keep)
+    order = np.lexsort((y[keep], bucket))
+    bounds = np.flatnonzero(np.diff(bucket[order], prepend=-1, append=buckets))
+    picked = order[np.concatenate((bounds[:-1], bounds[1:] - 1))]
+    return np.unique(np.concatenate((keep[picked], keep[[0, -1]])))
+
+
+def lttb(x, y, n_out: int):
+    """Largest-Triangle-Three-Buckets: from each bucket keep the point forming the largest triangle with the point
+    kept from the previous bucket and the average of the next one.
+    """
+    keep, y = _finite(y)
+    if len(keep) <= n_out or n_out < 3:
+        return keep
+    xs = np.asarray(x, dtype=np.float64)[keep]
+    ys = y[keep]
+
+    # interior points split into n_out - 2 buckets, with the last point as a bucket of its own
+    edges = np.concatenate((np.linspace(1, len(keep) - 1, n_out - 1).astype(np.int64), [len(keep)]))
+    csum_x = np.concatenate(([0], np.cumsum(xs)))
+    csum_y = np.concatenate(([0], np.cumsum(ys)))
+    avg_x = (csum_x[edges[1:]] - csum_x[edges[:-1]]) / np.diff(edges)
+    avg_y = (csum_y[edges[1:]] - csum_y[edges[:-1]]) / np.diff(edges)
+
+    picked = np.empty(n_out, dtype=np.int64)
+    picked[0], picked[-1] = 0, len(keep) - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        area = np.abs((xs[a] - avg_x[i + 1]) * (ys[lo:hi] - ys[a])
+                      - (xs[a] - xs[lo:hi]) * (avg_y[i + 1] - ys[a]))
+        a = lo + int(np.argmax(area))
+        picked[i + 1] = a
+    return keep[picked]
+
+
+ALGORITHMS = {'lttb': lttb, 'minmax': minmax}
@@ -0,0 +1,103 @@
+"""Hover data for `SPCPlot` traces, built once per chart and shared between the data and violation traces.
+
+Stacking mixed columns into one customdata array boxes every number into a Python object. Instead, numeric columns
+go into a float64 customdata block (sent to the browser as a typed array) and up to two other columns are passed
+as they are through the per-point `text` and `hovertext` attributes. Anything else falls back to one object
+customdata array, filled column by column. Named templates from config.HOVERTEMPLATE index customdata directly,
+so for those every listed column stays in customdata.
+"""
+import numpy as np
+import pandas as pd
+
+TEXT_ATTRIBUTES = ('text', 'hovertext')  # per-point trace attributes usable for one column each
+
+
+def _is_numeric(col):
+    return pd.api.types.is_numeric_dtype(col) and not pd.api.types.is_bool_dtype(col)
+
+
+def _block(df, columns):
+    """Columns as one (n, k) array: float64 if they are all numeric, else object, filled column by column."""
+    if all(_is_numeric(df[col]) for col in columns):
+        out = np.empty((len(df), len(columns)), dtype=np.float64)
+        for j, col in enumerate(columns):
+            out[:, j] = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+    else:
+        out = np.empty((len(df), len(columns)), dtype=object)
+        for j, col in enumerate(columns):
+            out[:, j] = df[col].to_numpy()
+    return out
+
+
+class HoverData:
+    """Per-point hover values for the columns of `df`.
+
+    - *columns*: columns to show, in order
+    - *template*: a hovertemplate referencing the columns as %{customdata[i]}, or None to build the default
+    "column: value" template
+
+    Class Attributes:
+    - *customdata*: (n, k) array referenced as %{customdata[i]}, or None
+    - *text*: {trace attribute: values} for columns passed as text / hovertext
+    - *hovertemplate*: template for the data trace
+    """
+
+    def __init__(self, df: pd.DataFrame, columns: list, template: str = None):
+        self.columns = list(columns)
+        self.template = template
+        self.text = {}
+
+        if template is not None:
+            self.customdata = _block(df, self.columns)
+            self.hovertemplate = template
+            return
+
+        numeric = [col for col in self.columns if _is_numeric(df[col])]
+        other = [col for col in self.columns if col not in numeric]
+        if len(other) > len(TEXT_ATTRIBUTES):
+            numeric, other = self.columns, []
+
+        self.customdata = _block(df, numeric) if numeric else None
+        self.text = {attr: df[col].to_numpy() for attr, col in zip(TEXT_ATTRIBUTES, other)}
+
+        lines = ['Index: %{x}']
+        for col in self.columns:
+            if col in numeric:
+                lines.append(f'{col}: %{{customdata[{numeric.index(col)}]}}')
+            else:
+                lines.append(f'{col}: %{{{TEXT_ATTRIBUTES[other.index(col)]}}}')
+        self.hovertemplate = '<br>'.join(lines)
+
+    def append(self, df: pd.DataFrame):
+        """Add the hover values of more rows, laid out like the existing ones, and return the trace keyword arguments
+        (as from `take`) for just those rows.
+        """
+        tail = HoverData(df, self.columns, self.template)
+        if tail.hovertemplate != self.hovertemplate:
+            raise ValueError('appended rows must have the same column types as the existing ones')
+        if self.customdata is not None:
+            self.customdata = np.concatenate((self.customdata, tail.customdata))
+        self.text = {attr: np.concatenate((values, tail.text[attr])) for attr, values in self.text.items()}
+        return tail.take()
+
+    def take(self, positions=None):
+        """Trace keyword arguments (customdata, text, hovertext) for the points at `positions`, or all points."""
+        kwargs = {attr: values if positions is None else values[positions] for attr, values in self.text.items()}
+        if self.customdata is not None:
+            kwargs['customdata'] = self.customdata if positions is None else self.customdata[positions]
+        return kwargs
+
+    def annotate(self, positions, label: str, values: list):
+        """Trace keyword arguments, hovertemplate included, for the points at `positions` with an extra first hover
+        line "label: value". Meant for small subsets such as violations, since customdata becomes an object array
+        to hold `values`.
+        """
+        kwargs = self.take(positions)
+        k = 0 if self.customdata is None else self.customdata.shape[1]
+        customdata = np.empty((len(positions), k + 1), dtype=object)
+        if k:
+            customdata[:, :k] = kwargs['customdata']
+        customdata[:, k] = np.fromiter(values, dtype=object, count=len(positions))
+        kwargs['customdata'] = customdata
+        kwargs['hovertemplate'] = f'{label}: %{{customdata[{k}]}}<br>' + self.hovertemplate
+        return kwargs
@@ -0,0 +1,152 @@
+"""Control limit strategies for `SPCPlot`.
+
+- 'global': mean and standard deviation of the whole series (the default)
+- 'baseline': mean and standard deviation of a fixed (start, stop) index range, e.g. a Phase I window, applied to
+every point
+- 'trailing': per-point mean and standard deviation of the last `window` points, the point itself included
+- 'expanding': per-point mean and standard deviation of every point up to and including it
+
+Per-point strategies are computed with running sums and return arrays the length of the series, which the detector
+rules and drawing methods accept in place of scalars. NaNs are skipped, as pandas does. Where there are fewer than
+two points to go on (the first point of 'expanding', say) sigma is NaN, and the rules leave that point unjudged.
+Trailing windows take their running sums a block at a time, each re-centred on its own values, so the sum of squares
+does not grow with the distance a drifting series has travelled.
+
+`moments` gives the whole-series figures a chunk at a time, for arrays (memory-mapped ones included) too large to
+copy.
+"""
+import math
+import numpy as np
+
+STRATEGIES = ('global', 'baseline', 'trailing', 'expanding')
+# trailing windows up to this long are summed point by point (see `_trailing`)
+DIRECT_WINDOW = 16
+
+
+class Moments:
+    """Count, mean, sum of squared deviations, min and max of finite values, merged chunk by chunk (Chan et al.)."""
+
+    def __init__(self):
+        self.n, self.mean, self.m2 = 0, 0.0, 0.0
+        self.min, self.max = math.inf, -math.inf
+
+    def update(self, values):
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        n, mean = len(values), values.mean()
+        m2 = np.sum((values - mean) ** 2)
+        total = self.n + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.n * n / total
+        self.n = total
+        self.min, self.max = min(self.min, values.min()), max(self.max, values.max())
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else math.nan
+
+
+def moments(values, chunksize: int = 1 << 20):
+    """`Moments` of `values`, read `chunksize` points at a time as float64. For a series of one chunk the mean and
+    standard deviation are the ones pandas gives; mean, min and max are NaN when there are no finite values.
+    """
+    out = Moments()
+    for start in range(0, len(values), chunksize):
+        out.update(np.asarray(values[start:start + chunksize], dtype=np.float64))
+    if not out.n:
+        out.mean = out.min = out.max = math.nan
+    return out
+
+
+def _running_sums(values):
+    """Cumulative count, sum and sum of squares of the finite values, each with a leading zero. Values are shifted
+    by the first finite value beforehand to keep the sum of squares well conditioned.
+    """
+    finite = ~np.isnan(values)
+    shift = values[finite][0] if finite.any() else 0.0
+    centered = np.where(finite, values - shift, 0.0)
+
+    sums = np.zeros((3, len(values) + 1))
+    np.cumsum(finite, out=sums[0, 1:])
+    np.cumsum(centered, out=sums[1, 1:])
+    np.cumsum(centered * centered, out=sums[2, 1:])
+    return sums, shift
+
+
+def _trailing(values, window, block: int = 512):
+    """Per-point mean and sigma over the last `window` points. Each block of positions gets running sums of its own,
+    over the block and the `window` - 1 points before it, centred on the first of those; short windows, where even
+    that cancels badly, are summed directly instead.
+    """
+    if window <= DIRECT_WINDOW:
+        return _trailing_direct(values, window)
+    n = len(values)
+    mean, sigma = np.empty(n), np.empty(n)
+    block = max(block, 4 * window)
+    for lo in range(0, n, block):
+        hi = min(lo + block, n)
+        first = max(lo - window + 1, 0)
+        sums, shift = _running_sums(values[first:hi])
+        end = np.arange(lo, hi) - first + 1
+        mean[lo:hi], sigma[lo:hi] = _moments(*(sums[:, end] - sums[:, np.maximum(end - window, 0)]), shift)
+    return mean, sigma
+
+
+def _trailing_direct(values, window):
+    """Two-pass mean and sigma of every trailing window, adding up `window` shifted views of the series."""
+    n = len(values)
+    padded = np.concatenate((np.full(window - 1, np.nan), values))
+    finite = ~np.isnan(padded)
+    filled = np.where(finite, padded, 0.0)
+    count, total, squares = np.zeros(n), np.zeros(n), np.zeros(n)
+    for k in range(window):
+        count += finite[k:k + n]
+        total += filled[k:k + n]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+        for k in range(window):
+            squares += np.where(finite[k:k + n], (filled[k:k + n] - mean) ** 2, 0.0)
+        sigma = np.sqrt(squares / (count - 1))
+    mean[count < 1] = np.nan
+    sigma[count < 2] = np.nan
+    return mean, sigma
+
+
+def _moments(count, total, squares, shift):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+        var = (squares - total * mean) / (count - 1)
+    mean = np.where(count >= 1, mean + shift, np.nan)
+    sigma = np.where(count >= 2, np.sqrt(np.maximum(var, 0)), np.nan)
+    return mean, sigma
+
+
+def control_limits(values, strategy: str = 'global', window=None):
+    """Return (mean, sigma) for `values` under the given strategy; scalars for 'global' and 'baseline', arrays
+    for 'trailing' and 'expanding'.
+
+    - *window*: (start, stop) index range for 'baseline', number of points for 'trailing', unused otherwise
+    """
+    values = np.asarray(values, dtype=np.float64)
+
+    if strategy == 'global':
+        window = (0, len(values))
+    elif strategy not in STRATEGIES:
+        raise ValueError(f'`limits` must be one of {", ".join(STRATEGIES)}')
+
+    if strategy in ('global', 'baseline'):
+        if not (isinstance(window, (tuple, list)) and len(window) == 2):
+            raise ValueError('baseline limits need `limits_window` as a (start, stop) index range')
+        sums, shift = _running_sums(values[slice(*window)])
+        mean, sigma = _moments(*sums[:, -1], shift)
+        return float(mean), float(sigma)
+
+    if strategy == 'expanding':
+        sums, shift = _running_sums(values)
+        return _moments(*sums[:, 1:], shift)
+
+    if not isinstance(window, (int, np.integer)) or window < 2:
+        raise ValueError('trailing limits need `limits_window` as a number of points (2 or more)')
+    return _trailing(values, int(window))
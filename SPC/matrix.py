@@ -0,0 +1,187 @@
+"""SPC over a wide matrix of many characteristics at once: rows are time, one column per characteristic.
+
+`spc_matrix` takes the measurements as one 2-D float64 array (a wide dataframe's numeric columns, or an array as
+given) and never builds a Series, detector or dataframe per column. Columns are processed in blocks of about
+`chunksize` cells: each block's means, standard deviations and limits are column reductions, and its rules are one
+`vectorized.detect_into` call over the 2-D block, the limits broadcast along the rows (see `rules.py`). Only the
+violations are kept, as a sparse (row, column, rule bits) index sorted by column, next to a per-column summary; the
+dense mask of a block is dropped once it is indexed.
+
+`WideSPC.chart` then builds the `SPCPlot` of one column from those results, without checking its rules again, so
+charting the few columns that need attention costs only their drawing.
+"""
+import numpy as np
+import pandas as pd
+from . import bitmask, vectorized
+from .rules import compile as compile_rules
+
+# cells (rows times columns) evaluated at a time; bounds the rules' intermediate arrays
+CHUNKSIZE = 1 << 18
+
+STATISTICS = ('mean', 'std', 'min', 'max', 'UCL', 'LCL', 'L1s', 'U1s')
+
+
+def column_statistics(block):
+    """n, mean, std (ddof=1), min and max of every column of a 2-D array, NaNs skipped as pandas does."""
+    finite = ~np.isnan(block)
+    n = finite.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(finite, block, 0.0).sum(axis=0) / n
+        dev = np.where(finite, block - mean, 0.0)
+        std = np.sqrt(np.einsum('ij,ij->j', dev, dev) / (n - 1))
+    std[n < 2] = np.nan
+    return n, mean, std, np.fmin.reduce(block, axis=0), np.fmax.reduce(block, axis=0)
+
+
+def _per_column(value, width, name):
+    if value is None:
+        return None
+    value = np.asarray(value, dtype=np.float64)
+    if value.ndim > 1 or (value.ndim == 1 and len(value) != width):
+        raise ValueError(f'`{name}` must be a scalar or one value per column')
+    return np.broadcast_to(value, (width,))
+
+
+def spc_matrix(data, columns=None, violations: list = [1, 2, 3, 4, 5, 6, 7, 8], mean=None, sigma=None,
+               chunksize: int = CHUNKSIZE):
+    """Statistics, limits and rule violations of every column of `data` in one call.
+
+    - *data*: a wide dataframe (rows in time order, one column per characteristic) or a 2-D array of the same shape.
+    Arrays already float64 are not copied whole, so an `np.memmap` works too; row-major ones are copied a block at a
+    time.
+    - *columns*: for a dataframe, the columns to check (all numeric columns by default); for an array, labels for
+    its columns (0, 1, ... by default)
+    - *violations*: rules to check, as for `SPCPlot`
+    - *mean*, *sigma*: fixed limits instead of each column's own mean and standard deviation (e.g. from a Phase I
+    run), each a scalar or one value per column
+    - *chunksize*: about how many cells to evaluate at a time
+
+    Returns a `WideSPC`. Limits are global and two-sided.
+    """
+    if hasattr(data, 'columns'):
+        columns = list(data.select_dtypes('number').columns) if columns is None else list(columns)
+        values = data[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        index = data.index
+    else:
+        values = np.asarray(data, dtype=np.float64)
+        if values.ndim != 2:
+            raise ValueError('`data` must be 2-D: rows in time order, one column per characteristic')
+        columns = range(values.shape[1]) if columns is None else list(columns)
+        index = pd.RangeIndex(len(values))
+    columns = pd.Index(columns)
+    n_rows, n_cols = values.shape
+    if len(columns) != n_cols:
+        raise ValueError(f'{len(columns)} column labels for {n_cols} columns')
+    if not n_rows or not n_cols:
+        raise ValueError('no rows or no columns to check')
+    mean, sigma = _per_column(mean, n_cols, 'mean'), _per_column(sigma, n_cols, 'sigma')
+
+    ruleset = compile_rules(violations)
+    width = max(1, chunksize // n_rows)
+    stats = np.empty((5, n_cols))
+    rows, cols, masks = [], [], []
+    for lo in range(0, n_cols, width):
+        hi = min(lo + width, n_cols)
+        # column by column in memory, so the rules' scans along time are contiguous (a copy only for row-major input)
+        block = np.asfortranarray(values[:, lo:hi])
+        stats[:, lo:hi] = column_statistics(block)
+        if mean is not None:
+            stats[1, lo:hi] = mean[lo:hi]
+        if sigma is not None:
+            stats[2, lo:hi] = sigma[lo:hi]
+        mask = vectorized.detect_into(block, stats[1, lo:hi], stats[2, lo:hi], ruleset)
+        # column-major, so each column's violations are contiguous and in row order
+        col, row = np.nonzero(mask.T)
+        rows.append(row)
+        cols.append(col + lo)
+        masks.append(mask[row, col])
+    rows, cols, mask = np.concatenate(rows), np.concatenate(cols), np.concatenate(masks)
+
+    n, center, std, low, high = stats
+    summary = pd.DataFrame(dict(
+        n=n.astype(np.int64), mean=center, std=std, min=low, max=high,
+        UCL=center + 3 * std, LCL=center - 3 * std, L1s=center - std, U1s=center + std,
+    ), index=columns)
+    for rule in ruleset:
+        fired = (mask >> ruleset.bits[rule]) & 1
+        summary[f'Rule{rule}'] = np.bincount(cols, weights=fired, minlength=n_cols).astype(np.int64)
+    summary['violations'] = np.bincount(cols, minlength=n_cols)
+    return WideSPC(values, index, columns, summary, rows, cols, mask, ruleset)
+
+
+class WideSPC:
+    """Per-column SPC results for a wide matrix, built by `spc_matrix`.
+
+    Class Attributes:
+    - *values*: the measurements, rows by columns
+    - *index*, *columns*: labels of the rows and columns
+    - *summary*: dataframe indexed by column with n, mean, std, min, max, UCL, LCL, L1s, U1s, violation counts per
+    rule and the number of violating points
+    - *rows*, *cols*, *mask*: the violations as a sparse index: row and column positions of every violating cell,
+    sorted by column then row, and its rule bits (see `bitmask.py`)
+    - *rules*: the rules checked
+    - *bits*: {rule: bit of `mask`}
+    """
+
+    def __init__(self, values, index, columns, summary, rows, cols, mask, ruleset):
+        self.values = values
+        self.index = index
+        self.columns = columns
+        self.summary = summary
+        self.rows = rows
+        self.cols = cols
+        self.mask = mask
+        self.ruleset = ruleset
+        self.rules = list(ruleset.keys)
+        self.bits = ruleset.bits
+
+    def _span(self, column):
+        j = self.columns.get_loc(column)
+        return j, slice(*np.searchsorted(self.cols, [j, j + 1]))
+
+    def flagged(self, min_violations: int = 1, rule=None):
+        """Columns with at least `min_violations` violating points (of `rule`, or of any rule), most first."""
+        counts = self.summary['violations' if rule is None else f'Rule{rule}']
+        return counts[counts >= min_violations].sort_values(ascending=False, kind='stable').index
+
+    def pairs(self):
+        """Dataframe of every violating cell: its row and column labels and the rules fired there, as lists."""
+        rules = np.empty(len(self.mask), dtype=object)
+        rules[:] = [list(fired) for fired in bitmask.decode(self.mask, self.rules, self.bits)]
+        return pd.DataFrame({'row': self.index[self.rows], 'column': self.columns[self.cols], 'rules': rules})
+
+    def violations(self, column):
+        """Series of the rules fired at each violating point of `column`, as lists, like
+        `AnomalyDetector.violations()`.
+        """
+        _, span = self._span(column)
+        values = np.empty(span.stop - span.start, dtype=object)
+        values[:] = [list(fired) for fired in bitmask.decode(self.mask[span], self.rules, self.bits)]
+        return pd.Series(values, index=self.index[self.rows[span]], name='violations')
+
+    def column_mask(self, column):
+        """Rule bits of every point of `column`, as `AnomalyDetector.mask`."""
+        _, span = self._span(column)
+        mask = np.zeros(len(self.index), dtype=np.uint8)
+        mask[self.rows[span]] = self.mask[span]
+        return mask
+
+    def chart(self, column, draw: bool = True, **kwargs):
+        """`SPCPlot` of one column with the statistics and violations found here, so its rules are not checked
+        again. Keyword arguments are passed on (styling ones; the limits are those of `spc_matrix`). With `draw` the
+        scatter, zones, lines and violations are drawn.
+        """
+        from . import SPCPlot
+        from .cache import render
+
+        j, _ = self._span(column)
+        label = str(column)
+        chart = SPCPlot.from_results(pd.DataFrame({label: self.values[:, j]}, index=self.index), label,
+                                     {name: float(self.summary[name].iloc[j]) for name in STATISTICS},
+                                     self.column_mask(column), self.ruleset, **kwargs)
+        return render(chart, serialize=False) if draw else chart
+
+    def charts(self, columns=None, **kwargs):
+        """Lazily yield (column, chart) for the given columns, by default those `flagged()`."""
+        for column in (self.flagged() if columns is None else columns):
+            yield column, self.chart(column, **kwargs)
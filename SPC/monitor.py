@@ -0,0 +1,183 @@
+import math
+from collections import deque
+import numpy as np
+
+WINDOWS = {5: 3, 6: 5, 7: 15, 8: 8}  # trailing points each windowed rule looks at
+BEYOND = {5: (2, 2), 6: (1, 4)}      # rules 5 and 6: (z, k) for "k of the window beyond z sigma"
+
+
+class SPCMonitor:
+    """Checks readings against the `AnomalyDetector` rules as they arrive, one at a time or in micro-batches, keeping
+    constant state per rule (run counters for rules 2-4, trailing windows for rules 5-8).
+
+    - *mean*, *sigma*: frozen control limits. With frozen limits the monitor flags exactly what a batch
+    `AnomalyDetector` run over the same points would, given the same mean and sigma.
+    - *baseline*: values to freeze the limits from (their mean and sample standard deviation) if mean/sigma aren't given
+    - *rules*: rules to check, same numbering as `AnomalyDetector`
+    - *max_events*: keep only the most recent this many violations in `events` (and so in `violations()`); None keeps
+    them all, which grows without bound on an endless stream. `push` returns each one either way.
+
+    With neither limits nor a baseline the limits are running: each reading is judged against the mean and standard
+    deviation of everything pushed so far, itself included. `freeze()` fixes them at their current values.
+
+    Like the batch detector, rules 5-8 never judge the most recent window, so their violations are reported one
+    reading late (rules 5-7 flag the previous reading, rule 8 the current one).
+
+    Class Attributes:
+    - *n*: number of readings pushed
+    - *mean*, *sigma*: limits in use for the next reading
+    - *frozen*: whether the limits are fixed
+    - *events*: the (index, rule) violations found so far, oldest first; at most *max_events* of them
+    """
+
+    def __init__(self, mean: float = None, sigma: float = None, baseline=None,
+                 rules: list = [1, 2, 3, 4, 5, 6, 7, 8], max_events: int = None):
+
+        if (mean is None) != (sigma is None):
+            raise ValueError('`mean` and `sigma` must be given together')
+        self.rules = list(dict.fromkeys(int(i) for i in rules))
+        if any(i not in range(1, 9) for i in self.rules):
+            raise ValueError('`rules` must be numbered 1 through 8')
+        if max_events is not None and max_events < 0:
+            raise ValueError('`max_events` must be non-negative')
+
+        # running moments (Welford), always kept so limits can be frozen later
+        self._count = 0
+        self._m = 0.0
+        self._s = 0.0
+
+        if mean is not None:
+            self.mean, self.sigma, self.frozen = float(mean), float(sigma), True
+        elif baseline is not None:
+            import pandas as pd
+            baseline = pd.Series(np.asarray(baseline, dtype=np.float64))
+            self.mean, self.sigma, self.frozen = float(baseline.mean()), float(baseline.std()), True
+        else:
+            self.mean, self.sigma, self.frozen = math.nan, math.nan, False
+
+        self.n = 0
+        self.events = deque(maxlen=max_events)
+
+        # rules 2-4 state, named as in the loop versions
+        self.side = 0
+        self.side_count = 0
+        self.previous = None
+        self.direction = 0
+        self.trend_count = 0
+        self.bimodal = 0
+        self.bimodal_count = 1
+
+        # rules 5-8: per-point flags for the trailing window plus running totals of each flag
+        self.windows = {i: deque(maxlen=w) for i, w in WINDOWS.items()}
+        self.totals = {i: [0, 0, 0, 0] for i in WINDOWS}
+
+    def freeze(self):
+        """Stop updating the limits; subsequent readings are judged against the current mean and sigma."""
+        self.frozen = True
+        return self
+
+    @property
+    def limits(self):
+        return {
+            'mean': self.mean,
+            'sigma': self.sigma,
+            'UCL': self.mean + 3 * self.sigma,
+            'LCL': self.mean - 3 * self.sigma,
+        }
+
+    def push(self, values):
+        """Add one reading or a sequence of readings. Returns the (index, rule) pairs newly flagged."""
+        found = []
+        for value in np.atleast_1d(np.asarray(values, dtype=np.float64)).tolist():
+            self._push_one(value, found)
+        self.events.extend(found)
+        return found
+
+    def _update_moments(self, value):
+        if math.isnan(value):
+            return
+        self._count += 1
+        delta = value - self._m
+        self._m += delta / self._count
+        self._s += delta * (value - self._m)
+        self.mean = self._m
+        self.sigma = math.sqrt(self._s / (self._count - 1)) if self._count > 1 else math.nan
+
+    def _push_one(self, x, found):
+        i = self.n
+        if not self.frozen:
+            self._update_moments(x)
+        mean, sigma = self.mean, self.sigma
+        rules = self.rules
+
+        # windowed rules judge the trailing window before x joins it
+        for r in (5, 6, 7, 8):
+            window = self.windows[r]
+            if r in rules and len(window) == window.maxlen and self._window_fires(r, window.maxlen):
+                found.append((i if r == 8 else i - 1, r))
+
+        if 1 in rules and not (mean - 3 * sigma < x < mean + 3 * sigma):
+            found.append((i, 1))
+
+        side = (x > mean) - (x < mean)
+        if side:
+            if side == self.side:
+                self.side_count += 1
+            else:
+                self.side, self.side_count = side, 1
+        if 2 in rules and self.side_count >= 9:
+            found.append((i, 2))
+
+        if self.previous is not None:
+            step = (x > self.previous) - (x < self.previous)
+            if step:
+                if step == self.direction:
+                    self.trend_count += 1
+                else:
+                    self.direction, self.trend_count = step, 1
+
+                self.bimodal += step
+                if abs(self.bimodal) != 1:
+                    self.bimodal, self.bimodal_count = 0, 0
+                else:
+                    self.bimodal_count += 1
+
+            if 3 in rules and self.trend_count >= 6:
+                found.append((i, 3))
+            if 4 in rules and self.bimodal_count >= 14:
+                found.append((i, 4))
+        self.previous = x
+
+        for r, (z, _) in BEYOND.items():
+            self._slide(r, (side > 0, side < 0, x > mean + z * sigma, x < mean - z * sigma))
+        self._slide(7, (not (x >= mean + sigma or x <= mean - sigma), False, False, False))
+        self._slide(8, (not abs(mean - x) < sigma, False, False, False))
+
+        self.n += 1
+
+    def _slide(self, r, flags):
+        window, totals = self.windows[r], self.totals[r]
+        if len(window) == window.maxlen:
+            for k, f in enumerate(window[0]):
+                totals[k] -= f
+        window.append(flags)
+        for k, f in enumerate(flags):
+            totals[k] += f
+
+    def _window_fires(self, r, w):
+        up, down, high, low = self.totals[r]
+        if r in BEYOND:
+            k = BEYOND[r][1]
+            return (up == w and high >= k) or (down == w and low >= k)
+        return up == w
+
+    def violations(self):
+        """Violations kept in `events`, in the same form as `AnomalyDetector.violations()`."""
+        import pandas as pd
+        per_point = {}
+        for i, r in self.events:
+            per_point.setdefault(i, set()).add(r)
+        index = sorted(per_point)
+        return pd.Series([[r for r in self.rules if r in per_point[i]] for i in index],
+                         index=pd.Index(index, dtype='int64'), name='violations',
+                         dtype=object if index else np.float64)
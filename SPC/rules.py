@@ -0,0 +1,652 @@
+"""Control chart rules declared by their parameters, a registry of them by name, and their fused evaluation.
+
+Every rule is one of a few shapes, each described by a handful of numbers:
+
+- `Beyond(k, n, z, side)`: at least k of n points in a row more than z sigma from the mean, all on the same side
+(side='same'), on either side ('either', optionally with some on each side), or above / below only ('upper' /
+'lower')
+- `Within(n, z)`: n points in a row within z sigma of the mean
+- `Run(n)`: n points in a row on the same side of the mean
+- `Trend(n)`: n points in a row steadily increasing or decreasing
+- `Alternating(n)`: n points in a row alternating up and down
+- `Spread(z)`: two points in a row beyond z sigma on opposite sides
+
+`REGISTRY` names them. 1-8 are the numbered rules `AnomalyDetector` has always checked, declared so that they match
+its reference loop implementation, quirks included; 'N1'-'N8' are the textbook Nelson rules, 'WE1'-'WE4' Western
+Electric's, and '1_2s', '1_3s', '2_2s', 'R_4s', '4_1s', '10_x' and their common variants Westgard's. `RULE_SETS`
+groups them, and `register` adds your own, e.g. register('3_1.5s', Beyond(3, 3, 1.5)).
+
+`compile` turns a selection into a `RuleSet`, which evaluates all its rules over one `Intermediates`: the limits at
+each sigma multiple, the points beyond or within them, the side of the mean, the direction of each step, run lengths
+and window sums are each computed once, when the first rule needs them, and reused by every other rule that does.
+A further rule over the same intermediates costs a comparison or two rather than another pass over the data.
+
+Each rule sets one bit of the uint8 violation mask (see `bitmask.py`): the numbered rules bit k - 1, named ones the
+highest bits left free, out of the way of the low numbered rules. So at most 8 rules are checked at once.
+"""
+from functools import cached_property
+import numpy as np
+
+SIDES = ('same', 'either', 'upper', 'lower')
+MASK_BITS = 8
+
+
+def _lanes(a):
+    """`a` with the time axis last: 1-D as it is, 2-D (time, series) transposed. A view either way; for series stored
+    column by column (Fortran order, as wide dataframes are) the scans below then run along contiguous memory.
+    """
+    return a.T if a.ndim == 2 else a
+
+
+def window_sum(mask, w):
+    """Sum of `mask` over the `w` points starting at each index; only full windows are returned."""
+    m = _lanes(mask)
+    c = np.zeros(m.shape[:-1] + (m.shape[-1] + 1,), dtype=np.int64)
+    np.cumsum(m, axis=-1, out=c[..., 1:])
+    return _lanes(c[..., w:] - c[..., :-w])
+
+
+def run_length(sign, seed=None):
+    """Length of the current run of same-signed entries at each index. Zeros neither extend nor break a run,
+    they just carry the previous count forward (the counters in rules 2 and 3 behave the same way). `seed` is the
+    (sign, length) of a run in progress before the first entry, for 1-D input (see `Intermediates.state`).
+    """
+    sign = _lanes(sign)
+    idx = np.arange(sign.shape[-1])
+    up, down = sign > 0, sign < 0
+    n_up, n_down = np.cumsum(up, axis=-1), np.cumsum(down, axis=-1)
+    last_up = np.maximum.accumulate(np.where(up, idx, -1), axis=-1)
+    last_down = np.maximum.accumulate(np.where(down, idx, -1), axis=-1)
+
+    def since(counts, last):
+        # entries counted after index `last` (everything when `last` is -1)
+        before = np.take_along_axis(counts, np.maximum(last, 0), axis=-1)
+        return counts - np.where(last >= 0, before, 0)
+
+    out = np.where(last_up > last_down, since(n_up, last_down),
+                   np.where(last_down > last_up, since(n_down, last_up), 0))
+    if seed is not None and seed[1]:
+        # the run goes on until the first entry of the opposite sign
+        current, count = seed
+        broken = np.flatnonzero(sign == -current)
+        out[:broken[0] if len(broken) else len(out)] += count
+    return _lanes(out)
+
+
+def true_run(flags, seed: int = 0):
+    """Number of consecutive True entries ending at each index, `seed` of them before the first (1-D input)."""
+    flags = _lanes(flags)
+    idx = np.arange(flags.shape[-1])
+    out = idx - np.maximum.accumulate(np.where(flags, -1, idx), axis=-1)
+    if seed:
+        broken = np.flatnonzero(~flags)
+        out[:broken[0] if len(broken) else len(out)] += seed
+    return _lanes(out)
+
+
+def _run_state(sign, run, at, seed):
+    """(sign, length) of the run in progress after the first `at` entries of `sign`, `run` being its run lengths."""
+    if not at:
+        return seed
+    nonzero = np.flatnonzero(sign[:at])
+    return int(sign[nonzero[-1]]) if len(nonzero) else seed[0], int(run[at - 1])
+
+
+def _step(x, lo, hi):
+    return (x[lo + 1:hi + 1] > x[lo:hi]).astype(np.int8) - (x[lo + 1:hi + 1] < x[lo:hi])
+
+
+def _backwards(get, n, chunk=256, max_chunk=1 << 16):
+    """`get(lo, hi)` over lo..hi-1 for consecutive ranges from `n` back to 0, in chunks doubling up to `max_chunk`."""
+    hi, size = n, chunk
+    while hi > 0:
+        lo = max(0, hi - size)
+        yield get(lo, hi)
+        hi, size = lo, min(size * 2, max_chunk)
+
+
+def last_run(sign_of, n):
+    """(sign, length) of the final run of a sign sequence of length `n`, as `run_length` counts it. `sign_of(lo, hi)`
+    returns entries lo..hi-1; they are requested backwards in chunks, so this costs about the length of the run.
+    """
+    current, count = 0, 0
+    for sign in _backwards(sign_of, n):
+        if not current:
+            nonzero = np.flatnonzero(sign)
+            if not len(nonzero):
+                continue
+            current = int(sign[nonzero[-1]])
+        opposite = np.flatnonzero(sign == -current)
+        count += int(np.count_nonzero(sign[opposite[-1] + 1 if len(opposite) else 0:] == current))
+        if len(opposite):
+            break
+    return current, count
+
+
+def last_true_run(flags_of, n):
+    """Number of consecutive True entries at the end of a boolean sequence of length `n`, read as `last_run` does."""
+    count = 0
+    for flags in _backwards(flags_of, n):
+        broken = np.flatnonzero(~flags)
+        if len(broken):
+            return count + len(flags) - int(broken[-1]) - 1
+        count += len(flags)
+    return count
+
+
+class Intermediates:
+    """Arrays shared between rules, each computed on first use and kept for the rules after it.
+
+    - *seed*: for a 1-D series continuing one evaluated before, the counters of the runs in progress before its first
+    point, as `state` returns them
+    """
+
+    def __init__(self, values, mean, sigma, seed: dict = None):
+        self.x = values
+        self.mean = mean
+        self.sigma = sigma
+        self.seed = seed or {}
+        self._cache = {}
+
+    def _cached(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    @cached_property
+    def side(self):
+        # +1 above the mean, -1 below, 0 on it (or NaN)
+        return (self.x > self.mean).astype(np.int8) - (self.x < self.mean)
+
+    @cached_property
+    def step(self):
+        # direction of each point relative to the previous one; one shorter than x
+        return (self.x[1:] > self.x[:-1]).astype(np.int8) - (self.x[1:] < self.x[:-1])
+
+    @cached_property
+    def side_run(self):
+        return run_length(self.side, self.seed.get('side'))
+
+    @cached_property
+    def step_run(self):
+        return run_length(self.step, self.seed.get('step'))
+
+    @cached_property
+    def alternation_run(self):
+        # points i, i + 1, i + 2 go up then down or down then up; one shorter than step
+        return true_run(self.step[1:] * self.step[:-1] < 0, self.seed.get('alternation', 0))
+
+    @cached_property
+    def moves(self):
+        # steps that are not ties, counted from the start of the series
+        return np.cumsum(self.step != 0, axis=0) + self.seed.get('moves', 0)
+
+    def state(self, at, names):
+        """Counters of the runs in progress after the first `at` points (1-D), for the `seed` of the intermediates of
+        the points from `at` on. `names` are those the rules need (`Rule.carries`):
+
+        - 'side': (sign, length) of the run on one side of the mean
+        - 'step': (direction, length) of the run of steps up or down, the step from point `at` on excluded
+        - 'alternation': length of the alternation up to the step from point `at`
+        - 'moves': steps that were not ties
+        """
+        seed = {}
+        for name in names:
+            if name in ('side', 'step'):
+                seed[name] = _run_state(getattr(self, name), getattr(self, f'{name}_run'), at,
+                                        self.seed.get(name, (0, 0)))
+            else:
+                counts = self.alternation_run if name == 'alternation' else self.moves
+                seed[name] = int(counts[at - 1]) if at else self.seed.get(name, 0)
+        return seed
+
+    def limits(self, z):
+        """(mean + z sigma, mean - z sigma)."""
+        return self._cached(('limits', z), lambda: (self.mean + z * self.sigma, self.mean - z * self.sigma))
+
+    def beyond(self, z):
+        """Points above / below the mean by more than z sigma."""
+        def compute():
+            upper, lower = self.limits(z)
+            return self.x > upper, self.x < lower
+        return self._cached(('beyond', z), compute)
+
+    def inside(self, z):
+        """Points strictly within z sigma of the mean; NaN is not."""
+        def compute():
+            upper, lower = self.limits(z)
+            return (self.x < upper) & (self.x > lower)
+        return self._cached(('inside', z), compute)
+
+    def outside(self, z, inclusive=False):
+        """Points beyond z sigma on either side; `inclusive` adds those on the limits, and NaN."""
+        def compute():
+            if inclusive:
+                return ~self.inside(z)
+            high, low = self.beyond(z)
+            return high | low
+        return self._cached(('outside', z, inclusive), compute)
+
+    def distant(self, z):
+        """Points not strictly closer than z sigma to the mean, |mean - x| >= z sigma; NaN is."""
+        return self._cached(('distant', z), lambda: ~(np.abs(self.mean - self.x) < z * self.sigma))
+
+    def within(self, z):
+        """Points not at or beyond z sigma from the mean; NaN is."""
+        def compute():
+            upper, lower = self.limits(z)
+            return ~((self.x >= upper) | (self.x <= lower))
+        return self._cached(('within', z), compute)
+
+    def window(self, name, flags, n):
+        """`window_sum` of a boolean intermediate, kept under (name, n)."""
+        return self._cached(('window', name, n), lambda: window_sum(flags(), n))
+
+
+class Rule:
+    """Base of the rule shapes. Each returns `(start, hits)` from `evaluate`, hits being whether the rule fired at
+    positions start, start + 1, ... (or None when the series is too short for it). To carry on over points appended
+    to a series, a rule needs the last `offset` + 1 points and the counters of the runs it follows (`carries`, see
+    `Intermediates.state`), whatever the length of those runs.
+
+    - *name*: label for violations and hover text; by default the registry name it is looked up by, or the rule's repr
+    """
+
+    name = None
+    # points before the flagged one the rule looks at
+    offset = 0
+    # runs whose counters it takes over from before a chunk
+    carries = ()
+
+    @property
+    def pointwise(self):
+        """Whether the rule judges each point on its own."""
+        return False
+
+    def params(self):
+        return {}
+
+    def evaluate(self, s: Intermediates):
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f'{type(self).__name__}({", ".join(f"{k}={v!r}" for k, v in self.params().items())})'
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.params() == other.params()
+
+    def __hash__(self):
+        return hash(repr(self))
+
+
+class Beyond(Rule):
+    """At least `k` of `n` points in a row more than `z` sigma from the mean, flagged on the last of them.
+
+    - *side*: 'same' (the k on one side), 'either' (on any side), 'upper' or 'lower'
+    - *both_sides*: with side='either', also require points beyond z sigma on both sides of the mean among the n
+    (Nelson's rule 8)
+    - *name*: see `Rule`
+
+    The remaining keywords reproduce the numbered rules' reference implementation:
+
+    - *inclusive*: with side='either', count every point not strictly inside the limits, on them and NaN included
+    - *distance*: with side='either', count every point whose distance from the mean is not below z sigma, NaN
+    included; the same as `inclusive` but for rounding exactly at the limits
+    - *all_on_side*: also require all n points on the side of the mean the k are on
+    - *skip_last*: never judge the final window of the series
+    - *flag_after*: flag the point after the window instead of its last
+    """
+
+    def __init__(self, k: int, n: int, z: float, side: str = 'same', name: str = None, both_sides: bool = False,
+                 inclusive: bool = False, distance: bool = False, all_on_side: bool = False, skip_last: bool = False,
+                 flag_after: bool = False):
+        if not 1 <= k <= n:
+            raise ValueError('need 1 <= k <= n')
+        if side not in SIDES:
+            raise ValueError(f'`side` must be one of {", ".join(SIDES)}')
+        if (both_sides or inclusive or distance) and side != 'either':
+            raise ValueError('`both_sides`, `inclusive` and `distance` apply to side="either" only')
+        self.k, self.n, self.z, self.side = int(k), int(n), float(z), side
+        self.both_sides = both_sides
+        self.inclusive, self.distance, self.all_on_side = inclusive, distance, all_on_side
+        self.skip_last, self.flag_after = skip_last, flag_after
+        self.offset = self.n - 1 + flag_after
+        self.name = name
+
+    @property
+    def pointwise(self):
+        return self.n == 1 and not self.flag_after
+
+    def params(self):
+        out = dict(k=self.k, n=self.n, z=self.z, side=self.side)
+        flags = ('both_sides', 'inclusive', 'distance', 'all_on_side', 'skip_last', 'flag_after')
+        out.update({key: True for key in flags if getattr(self, key)})
+        return out
+
+    def evaluate(self, s):
+        if len(s.x) < self.n:
+            return
+        k, n, z = self.k, self.n, self.z
+        if self.side == 'either':
+            name = ('distant', z) if self.distance else ('outside', z, self.inclusive)
+            outside = s.distant(z) if self.distance else s.outside(z, self.inclusive)
+            hits = outside if n == 1 else s.window(name, lambda: outside, n) >= k
+            if self.both_sides:
+                hits = (hits & (s.window(('above', z), lambda: s.beyond(z)[0], n) > 0)
+                        & (s.window(('below', z), lambda: s.beyond(z)[1], n) > 0))
+        else:
+            hits = None
+            if self.side in ('same', 'upper'):
+                hits = s.window(('above', z), lambda: s.beyond(z)[0], n) >= k
+                if self.all_on_side:
+                    hits &= s.window('positive', lambda: s.side > 0, n) == n
+            if self.side in ('same', 'lower'):
+                low = s.window(('below', z), lambda: s.beyond(z)[1], n) >= k
+                if self.all_on_side:
+                    low &= s.window('negative', lambda: s.side < 0, n) == n
+                hits = low if hits is None else hits | low
+        if self.skip_last or self.flag_after:
+            hits = hits[:len(s.x) - n]
+        return self.offset, hits
+
+
+class Within(Rule):
+    """`n` points in a row within `z` sigma of the mean, flagged on the last of them. NaN counts as within, as in the
+    reference implementation.
+
+    - *skip_last*: never judge the final window of the series (the numbered rule 7)
+    """
+
+    def __init__(self, n: int, z: float, name: str = None, skip_last: bool = False):
+        self.n, self.z, self.skip_last = int(n), float(z), skip_last
+        self.offset = self.n - 1
+        self.name = name
+
+    def params(self):
+        return dict(n=self.n, z=self.z, **({'skip_last': True} if self.skip_last else {}))
+
+    def evaluate(self, s):
+        if len(s.x) < self.n:
+            return
+        hits = s.window(('within', self.z), lambda: s.within(self.z), self.n) == self.n
+        if self.skip_last:
+            hits = hits[:len(s.x) - self.n]
+        return self.offset, hits
+
+
+class Run(Rule):
+    """`n` points in a row on the same side of the mean. Points exactly on the mean carry the run on."""
+
+    carries = ('side',)
+
+    def __init__(self, n: int, name: str = None):
+        self.n = int(n)
+        self.name = name
+
+    def params(self):
+        return dict(n=self.n)
+
+    def evaluate(self, s):
+        return 0, s.side_run >= self.n
+
+
+class Trend(Rule):
+    """`n` points in a row each above (or each below) the one before. Ties carry the trend on."""
+
+    offset = 1
+    carries = ('step',)
+
+    def __init__(self, n: int, name: str = None):
+        self.n = int(n)
+        self.name = name
+
+    def params(self):
+        return dict(n=self.n)
+
+    def evaluate(self, s):
+        return 1, s.step_run >= self.n - 1
+
+
+class Alternating(Rule):
+    """`n` points in a row alternating up and down.
+
+    - *reference*: count as the numbered rule 4's reference implementation does. Its counter resets on every second
+    move and so never passes 2; the rule cannot fire, but both engines agree.
+    """
+
+    def __init__(self, n: int, name: str = None, reference: bool = False):
+        self.n, self.reference = int(n), reference
+        self.offset = 1 if reference else 2
+        self.carries = ('moves',) if reference else ('alternation',)
+        self.name = name
+
+    def params(self):
+        return dict(n=self.n, **({'reference': True} if self.reference else {}))
+
+    def evaluate(self, s):
+        if self.reference:
+            moves = s.moves
+            count = np.where(moves == 0, 1, np.where(moves == 1, 2, moves % 2))
+            return 1, count >= self.n
+        return 2, s.alternation_run >= self.n - 2
+
+
+class Spread(Rule):
+    """Two points in a row beyond `z` sigma on opposite sides of the mean (Westgard's R_4s with z=2)."""
+
+    def __init__(self, z: float = 2, name: str = None):
+        self.z = float(z)
+        self.offset = 1
+        self.name = name
+
+    def params(self):
+        return dict(z=self.z)
+
+    def evaluate(self, s):
+        high, low = s.beyond(self.z)
+        return 1, (high[1:] & low[:-1]) | (low[1:] & high[:-1])
+
+
+REGISTRY = {
+    # the numbered rules, as the reference loop implementation in `anomaly_detector.py` checks them
+    1: Beyond(1, 1, 3, side='either', inclusive=True),
+    2: Run(9),
+    3: Trend(7),
+    4: Alternating(14, reference=True),
+    5: Beyond(2, 3, 2, all_on_side=True, skip_last=True),
+    6: Beyond(4, 5, 1, all_on_side=True, skip_last=True),
+    7: Within(15, 1, skip_last=True),
+    8: Beyond(8, 8, 1, side='either', distance=True, skip_last=True, flag_after=True),
+    # Nelson
+    'N1': Beyond(1, 1, 3, side='either'),
+    'N2': Run(9),
+    'N3': Trend(6),
+    'N4': Alternating(14),
+    'N5': Beyond(2, 3, 2),
+    'N6': Beyond(4, 5, 1),
+    'N7': Within(15, 1),
+    'N8': Beyond(8, 8, 1, side='either', both_sides=True),
+    # Western Electric
+    'WE1': Beyond(1, 1, 3, side='either'),
+    'WE2': Beyond(2, 3, 2),
+    'WE3': Beyond(4, 5, 1),
+    'WE4': Run(8),
+    # Westgard, 1_2s being the usual warning rule
+    '1_2s': Beyond(1, 1, 2, side='either'),
+    '1_3s': Beyond(1, 1, 3, side='either'),
+    '2_2s': Beyond(2, 2, 2),
+    'R_4s': Spread(2),
+    '4_1s': Beyond(4, 4, 1),
+    '10_x': Run(10),
+    '2of3_2s': Beyond(2, 3, 2),
+    '3_1s': Beyond(3, 3, 1),
+    '6_x': Run(6),
+    '8_x': Run(8),
+    '9_x': Run(9),
+    '12_x': Run(12),
+    '7_T': Trend(7),
+}
+
+RULE_SETS = {
+    'numbered': [1, 2, 3, 4, 5, 6, 7, 8],
+    'nelson': ['N1', 'N2', 'N3', 'N4', 'N5', 'N6', 'N7', 'N8'],
+    'western_electric': ['WE1', 'WE2', 'WE3', 'WE4'],
+    'westgard': ['1_3s', '2_2s', 'R_4s', '4_1s', '10_x'],
+}
+
+
+def register(name: str, rule: Rule):
+    """Make `rule` available under `name` to everything that takes rules (`SPCPlot(violations=...)` and so on)."""
+    if not isinstance(rule, Rule):
+        raise ValueError('`rule` must be a Rule, e.g. Beyond(k, n, z)')
+    if name in RULE_SETS or isinstance(name, (int, np.integer)):
+        raise ValueError(f'{name!r} is reserved')
+    REGISTRY[name] = rule
+
+
+def _key(rule):
+    if isinstance(rule, Rule):
+        return rule.name or repr(rule)
+    if isinstance(rule, (int, np.integer)) or (isinstance(rule, str) and rule.isdigit()):
+        return int(rule)
+    return rule
+
+
+def expand(rules):
+    """Rule keys, in order and without repeats, from rule numbers, registered names, `Rule` objects and rule set
+    names, or a single one of these.
+    """
+    if isinstance(rules, (str, int, np.integer, Rule)):
+        rules = [rules]
+    keys = []
+    for rule in rules:
+        if isinstance(rule, str) and rule in RULE_SETS:
+            keys += RULE_SETS[rule]
+        else:
+            keys.append(_key(rule))
+    return list(dict.fromkeys(keys))
+
+
+def resolve(rule):
+    """The `Rule` behind a rule number, registered name or `Rule`."""
+    if isinstance(rule, Rule):
+        return rule
+    key = _key(rule)
+    if key not in REGISTRY:
+        raise ValueError(f'unknown rule {rule!r}; see SPC.rules.REGISTRY and RULE_SETS')
+    return REGISTRY[key]
+
+
+def assign_bits(keys, bits: dict = None):
+    """Mask bit of every rule key: k - 1 for rule number k, the highest bits left free for the others. `bits` holds
+    assignments made earlier, which are kept. Raises ValueError past 8 rules or on a clash.
+    """
+    bits = dict(bits or {})
+    taken = {b: key for key, b in bits.items()}
+    for key in keys:
+        if key in bits or not isinstance(key, int):
+            continue
+        if not 1 <= key <= MASK_BITS or taken.get(key - 1, key) != key:
+            raise ValueError(f'rule {key} needs bit {key - 1}, which is '
+                             f'{"taken by " + repr(taken[key - 1]) if key - 1 in taken else "out of range"}')
+        bits[key] = taken[key - 1] = key - 1
+    for key in keys:
+        if key in bits:
+            continue
+        free = [b for b in reversed(range(MASK_BITS)) if b not in taken]
+        if not free:
+            raise ValueError(f'at most {MASK_BITS} rules can be checked at once (one bit each of the violation mask)')
+        bits[key] = free[0]
+        taken[free[0]] = key
+    return bits
+
+
+class RuleSet:
+    """Rules compiled for evaluation together; see `compile`.
+
+    Class Attributes:
+    - *keys*: the rule keys, in order
+    - *rules*: {key: Rule}
+    - *bits*: {key: bit of the violation mask}
+    """
+
+    def __init__(self, keys, rules, bits):
+        self.keys = keys
+        self.rules = rules
+        self.bits = bits
+
+    def __iter__(self):
+        return iter(self.keys)
+
+    def __len__(self):
+        return len(self.keys)
+
+    @property
+    def lookback(self):
+        """Points at the end of a series to re-run the rules over when points are appended: the most any rule looks
+        back, plus the last point, which rules 5-7 only judge once the next points are in.
+        """
+        return max((rule.offset for rule in self.rules.values()), default=0) + 1
+
+    @property
+    def carries(self):
+        """Runs whose counters the rules take over from before a chunk (see `Intermediates.state`)."""
+        return list(dict.fromkeys(name for rule in self.rules.values() for name in rule.carries))
+
+    def tail_start(self, n: int):
+        """First position to re-run from, of a series of length `n` with points to be appended under the same scalar
+        limits, given the `state` there, for the results from position n - 1 on to match a run over the whole series.
+        """
+        return max(n - self.lookback, 0)
+
+    def intermediates(self, values, mean, sigma, seed: dict = None):
+        return Intermediates(np.asarray(values, dtype=np.float64), np.asarray(mean, dtype=np.float64),
+                             np.asarray(sigma, dtype=np.float64), seed)
+
+    def evaluate(self, values, mean=None, sigma=None, profiler=None):
+        """Yield (key, start, hits) for each rule that produced something, all over one `Intermediates` (`values`
+        may be one already, from `intermediates`). With a `profiling.Profiler`, each rule is a stage 'rule<key>'; an
+        intermediate shared by several rules is charged to the first that needs it.
+        """
+        s = values if isinstance(values, Intermediates) else self.intermediates(values, mean, sigma)
+        for key in self.keys:
+            if profiler is None:
+                out = self.rules[key].evaluate(s)
+            else:
+                with profiler.stage(f'rule{key}', len(s.x)):
+                    out = self.rules[key].evaluate(s)
+            if out is not None:
+                yield (key,) + out
+
+    def state(self, values, mean, at: int):
+        """`Intermediates.state` after the first `at` of `values` under the scalar `mean`, without evaluating the
+        series: each run is read backwards from `at` in chunks, which costs about its length.
+        """
+        x, seed = values, {}
+        steps = min(at, max(len(x) - 1, 0))
+        for name in self.carries:
+            if name == 'side':
+                seed[name] = last_run(lambda lo, hi: (x[lo:hi] > mean).astype(np.int8) - (x[lo:hi] < mean), at)
+            elif name == 'step':
+                seed[name] = last_run(lambda lo, hi: _step(x, lo, hi), steps)
+            elif name == 'alternation':
+                def alternates(lo, hi):
+                    step = _step(x, lo, hi + 1)
+                    return step[1:] * step[:-1] < 0
+                seed[name] = last_true_run(alternates, min(at, max(len(x) - 2, 0)))
+            else:
+                seed[name] = sum(int(np.count_nonzero(step)) for step in _backwards(lambda lo, hi: _step(x, lo, hi),
+                                                                                   steps))
+        return seed
+
+
+def compile(rules, bits: dict = None):
+    """A `RuleSet` of `rules` (anything `expand` takes, or a RuleSet, returned as it is). `bits` are mask bits
+    assigned before, as `AnomalyDetector` keeps them across calls.
+    """
+    if isinstance(rules, RuleSet):
+        return rules
+    rules = [rules] if isinstance(rules, (str, int, np.integer, Rule)) else list(rules)
+    keys = expand(rules)
+    found = {_key(rule): rule for rule in rules if isinstance(rule, Rule)}
+    return RuleSet(keys, {key: found.get(key) or resolve(key) for key in keys}, assign_bits(keys, bits))
@@ -0,0 +1,260 @@
+"""Serving charts to asyncio code (a web backend, say) without blocking its event loop.
+
+Building an `SPCPlot`, running its rules and serializing the figure are synchronous and CPU-bound. `ChartService`
+runs them in an executor, at most `max_workers` at a time; further requests wait their turn in a queue of at most
+`max_queue` (beyond that they are turned away with `Busy`), so a burst cannot pile up unbounded work.
+
+Concurrent requests for the same chart are coalesced: requests are keyed by the same digests as `cache.py` (the
+measurements, the constructor arguments and, for figures, every column and style), and while one computation for a
+key is under way every further request for that key waits for its result instead of starting another. Add a
+`ChartCache` to also reuse results after the computation is done.
+
+`metrics()` reports the queue depth, work in progress and latency percentiles. `serve_http` puts a minimal HTTP
+front on a service, in process and standard library only, as a stand-in for the real backend in tests and
+benchmarks; `call` is its client.
+"""
+import asyncio
+import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from . import cache as chart_cache
+
+
+class Busy(RuntimeError):
+    """The service's queue is full."""
+
+
+def _figure(df, y, styles, key, kwargs, cache):
+    from . import SPCPlot
+    if cache is not None:
+        return cache.figure_json(df, y, styles, key=key, **kwargs)
+    return chart_cache.render(SPCPlot(df, y, **kwargs), styles)
+
+
+def _chart(df, y, kwargs, cache):
+    from . import SPCPlot
+    chart = SPCPlot(df, y, **kwargs) if cache is None else cache.chart(df, y, **kwargs)
+    chart.detector  # the rules run here, in the worker
+    return chart
+
+
+def _figure_key(df, y, styles, kwargs):
+    from . import SPCPlot
+    return chart_cache.figure_key(SPCPlot(df, y, **kwargs), styles)
+
+
+def _data_key(df, y, kwargs):
+    from . import SPCPlot
+    return chart_cache.data_key(SPCPlot(df, y, **kwargs))
+
+
+class ChartService:
+    """Builds charts and figure JSON in an executor, coalescing concurrent requests for the same one.
+
+    - *max_workers*: charts computed at once
+    - *max_queue*: requests allowed to wait for a worker; further ones raise `Busy`. None for no limit.
+    - *executor*: a `concurrent.futures` executor to run in, sized for `max_workers`; by default a thread pool is
+    made, and shut down by `close()`. A process pool works too, at the price of sending each dataframe to it.
+    - *cache*: a `ChartCache` to serve repeated charts from
+    - *window*: requests the latency percentiles are taken over (the most recent ones)
+
+    Use it as `async with ChartService() as service:`, or call `close()` when done.
+
+    Class Attributes:
+    - *requests*: requests received
+    - *coalesced*: requests answered by a computation another request started
+    - *computed*: computations run (key digests not counted)
+    - *errors*: computations that raised; every request waiting on one gets its exception
+    - *rejected*: requests turned away with `Busy`
+    - *queued*, *running*: work waiting for a worker and being computed, now
+    """
+
+    def __init__(self, max_workers: int = 4, max_queue: int = None, executor=None, cache=None, window: int = 1024):
+        if max_workers < 1:
+            raise ValueError('`max_workers` must be at least 1')
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._own_executor = executor is None
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix='spc') if executor is None else executor
+        self.cache = cache
+        self._slots = None  # the semaphore is made inside the running loop
+        self._inflight = {}
+        self.requests = self.coalesced = self.computed = self.errors = self.rejected = 0
+        self.queued = self.running = self.max_queued = 0
+        self._latency = deque(maxlen=window)  # seconds from request to answer
+        self._wait = deque(maxlen=window)     # seconds queued before a worker was free
+        self._compute = deque(maxlen=window)  # seconds in the executor
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Shut down the executor, if the service made it."""
+        if self._own_executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self, fn, *args, record=True):
+        """`fn(*args)` in the executor once a worker slot is free."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+        if self.max_queue is not None and self._slots.locked() and self.queued >= self.max_queue:
+            self.rejected += 1
+            raise Busy(f'{self.queued} requests already queued')
+        queued_at = time.perf_counter()
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queued -= 1
+        started = time.perf_counter()
+        self.running += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self.running -= 1
+            self._slots.release()
+            if record:
+                self._wait.append(started - queued_at)
+                self._compute.append(time.perf_counter() - started)
+
+    async def run(self, key, fn, *args):
+        """Result of `fn(*args)`, computed in the executor, or the result of the computation already under way for
+        `key`. Results are shared between the requests coalesced, so treat them as read-only.
+        """
+        start = time.perf_counter()
+        self.requests += 1
+        try:
+            task = self._inflight.get(key)
+            if task is None:
+                task = asyncio.ensure_future(self._run(fn, *args))
+                self._inflight[key] = task
+                task.add_done_callback(lambda done: self._finish(key, done))
+            else:
+                self.coalesced += 1
+            # shielded, so a request that is cancelled (its client went away) leaves the computation to the others
+            return await asyncio.shield(task)
+        finally:
+            self._latency.append(time.perf_counter() - start)
+
+    def _finish(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if task.cancelled():
+            return
+        if isinstance(task.exception(), Busy):
+            return
+        self.computed += 1
+        if task.exception() is not None:
+            self.errors += 1
+
+    async def figure_json(self, df, y: str = None, styles: dict = None, key: str = None, **kwargs):
+        """Plotly JSON of the fully drawn chart, as `ChartCache.figure_json` builds it.
+
+        - *styles*: {draw method name: keyword arguments}
+        - *key*: identifies the request for coalescing; by default its `cache.figure_key`, computed in the executor
+        - *kwargs*: `SPCPlot` constructor arguments
+        """
+        if key is None:
+            key = await self._run(_figure_key, df, y, styles, kwargs, record=False)
+        return await self.run(('figure', key), _figure, df, y, styles, key, kwargs, self.cache)
+
+    async def chart(self, df, y: str = None, key: str = None, **kwargs):
+        """`SPCPlot(df, y, **kwargs)` with its statistics and violations computed, keyed by `cache.data_key` unless
+        `key` is given. Charts are shared between the requests coalesced; draw on a copy, or use `figure_json`.
+        """
+        if key is None:
+            key = await self._run(_data_key, df, y, kwargs, record=False)
+        return await self.run(('chart', key), _chart, df, y, kwargs, self.cache)
+
+    def metrics(self):
+        """Counters and gauges as a flat dict, with latency percentiles in seconds over the last `window` requests
+        ('latency.p50', 'queue_wait.p95', 'compute.max', ...).
+        """
+        out = dict(requests=self.requests, coalesced=self.coalesced, computed=self.computed, errors=self.errors,
+                   rejected=self.rejected, queued=self.queued, running=self.running, max_queued=self.max_queued,
+                   inflight=len(self._inflight), workers=self.max_workers)
+        for name, samples in (('latency', self._latency), ('queue_wait', self._wait), ('compute', self._compute)):
+            values = np.fromiter(samples, dtype=np.float64)
+            for label, q in (('p50', 50), ('p95', 95), ('p99', 99), ('max', 100)):
+                out[f'{name}.{label}'] = float(np.percentile(values, q)) if len(values) else None
+        if self.cache is not None:
+            out.update({f'cache.{k}': v for k, v in self.cache.metrics().items()})
+        return out
+
+
+def _frame(payload):
+    import pandas as pd
+    return pd.DataFrame(payload['data'])
+
+
+async def _respond(writer, status, body, content_type='application/json'):
+    reason = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 500: 'Internal Server Error',
+              503: 'Service Unavailable'}[status]
+    if isinstance(body, str):
+        body = body.encode()
+    writer.write(f'HTTP/1.1 {status} {reason}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n'
+                 f'Connection: close\r\n\r\n'.encode() + body)
+    await writer.drain()
+    writer.close()
+
+
+async def serve_http(service: ChartService, host: str = '127.0.0.1', port: int = 0):
+    """Start a minimal HTTP server in front of `service` on the running loop and return the `asyncio.Server`; its
+    port is `server.sockets[0].getsockname()[1]` (port 0 picks a free one). One request per connection:
+
+    - POST /figure with a JSON body {"data": {column: [values, ...]}, "y": column, "styles": {...},
+    "options": {SPCPlot arguments}} answers with the figure JSON
+    - GET /metrics answers with `service.metrics()`
+
+    Bad requests (including invalid chart arguments) get 400 with {"error": message}, `Busy` gets 503.
+    """
+    async def handle(reader, writer):
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+            lines = head.decode('latin-1').split('\r\n')
+            method, path = lines[0].split(' ')[:2]
+            headers = dict(line.split(':', 1) for line in lines[1:] if ':' in line)
+            length = int({k.strip().lower(): v for k, v in headers.items()}.get('content-length', 0))
+            body = await reader.readexactly(length) if length else b''
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            writer.close()
+            return
+        try:
+            if method == 'GET' and path == '/metrics':
+                return await _respond(writer, 200, json.dumps(service.metrics()))
+            if method == 'POST' and path == '/figure':
+                payload = json.loads(body)
+                df = await service._run(_frame, payload, record=False)
+                fig_json = await service.figure_json(df, payload.get('y'), payload.get('styles'),
+                                                     **payload.get('options', {}))
+                return await _respond(writer, 200, fig_json)
+            return await _respond(writer, 404, json.dumps({'error': f'no route {method} {path}'}))
+        except Busy as e:
+            await _respond(writer, 503, json.dumps({'error': str(e)}))
+        except (ValueError, KeyError, TypeError) as e:
+            await _respond(writer, 400, json.dumps({'error': str(e)}))
+        except Exception as e:
+            await _respond(writer, 500, json.dumps({'error': repr(e)}))
+
+    return await asyncio.start_server(handle, host, port)
+
+
+async def call(server, method: str, path: str, payload: dict = None):
+    """Send one request to a `serve_http` server (or any (host, port)) and return (status, body bytes)."""
+    host, port = server if isinstance(server, tuple) else server.sockets[0].getsockname()[:2]
+    reader, writer = await asyncio.open_connection(host, port)
+    body = b'' if payload is None else json.dumps(payload).encode()
+    writer.write(f'{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n'
+                 f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode() + body)
+    await writer.drain()
+    head = await reader.readuntil(b'\r\n\r\n')
+    status = int(head.split(b' ', 2)[1])
+    response = await reader.read()
+    writer.close()
+    return status, response
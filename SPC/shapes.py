@@ -0,0 +1,71 @@
+"""Zone rectangles and annotated horizontal lines as plain layout dicts, added to a figure in one assignment.
+
+`fig.add_hrect` and `fig.add_hline` validate and re-assign the whole `layout.shapes` (and `layout.annotations`)
+tuple on every call, so drawing k of them costs O(k^2) validation; on a `make_subplots` page with hundreds of
+panels this dominates build time. The functions here return the same dicts plotly would build, with style presets
+resolved once, and `add_to` appends a whole batch in a single `update_layout`.
+
+Plotly keyword styles such as `line_dash` or `annotation_bgcolor` are accepted as in the presets and nested the way
+plotly's magic underscores nest them.
+"""
+ANNOTATION_PREFIX = 'annotation_'
+
+
+def nested(style: dict):
+    """{'line_dash': 'dash'} -> {'line': {'dash': 'dash'}}. Plotly property names contain no underscores."""
+    out = {}
+    for key, value in style.items():
+        *parents, leaf = key.split('_')
+        node = out
+        for parent in parents:
+            node = node.setdefault(parent, {})
+        node[leaf] = value
+    return out
+
+
+def split_style(style: dict):
+    """Split an `add_hline` style into (shape style, annotation style), both nested."""
+    shape = {k: v for k, v in style.items() if not k.startswith(ANNOTATION_PREFIX)}
+    annotation = {k[len(ANNOTATION_PREFIX):]: v for k, v in style.items() if k.startswith(ANNOTATION_PREFIX)}
+    return nested(shape), nested(annotation)
+
+
+def _refs(xref, yref):
+    return dict(xref=f'{xref} domain', yref=yref)
+
+
+def zone_shapes(zones: dict, color_scheme: dict, shape_layout: dict, xref: str = 'x', yref: str = 'y'):
+    """One full-width rectangle per entry of `SPCStats.zones`, filled with the scheme's color for the zone."""
+    style = nested(shape_layout)
+    refs = _refs(xref, yref)
+    return [dict(type='rect', x0=0, x1=1, y0=y0, y1=y1, fillcolor=color_scheme['zone' + zone[-1]], **refs, **style)
+            for zone, (y0, y1) in zones.items()]
+
+
+def hline_shapes(lines, xref: str = 'x', yref: str = 'y'):
+    """Full-width horizontal lines labelled at their right end, as `add_hline(annotation_text=...)` draws them.
+
+    - *lines*: iterable of (y, label, style) with `style` nested as from `split_style`; a label of None draws no
+    annotation
+
+    Returns (shapes, annotations).
+    """
+    refs = _refs(xref, yref)
+    shapes, annotations = [], []
+    for y, label, (shape_style, annotation_style) in lines:
+        shapes.append(dict(type='line', x0=0, x1=1, y0=y, y1=y, **refs, **shape_style))
+        if label is not None:
+            annotations.append(dict(text=label, showarrow=False, x=1, xanchor='right', y=y, yanchor='bottom',
+                                    **refs, **annotation_style))
+    return shapes, annotations
+
+
+def add_to(fig, shapes=(), annotations=()):
+    """Append shapes and annotations to `fig` in one layout update."""
+    update = {}
+    if shapes:
+        update['shapes'] = fig.layout.shapes + tuple(shapes)
+    if annotations:
+        update['annotations'] = fig.layout.annotations + tuple(annotations)
+    if update:
+        fig.update_layout(**update)
@@ -0,0 +1,419 @@
+from __future__ import annotations
+from functools import cached_property
+from typing import TYPE_CHECKING
+import numpy as np
+from .anomaly_detector import AnomalyDetector
+from .limits import control_limits, moments
+from .profiling import profiled
+from . import rules as registry, subgroups, timeweighted
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def _limit_lines(mean, std):
+    return dict(
+        UCL=mean + 3 * std,
+        LCL=mean - 3 * std,
+        L1s=mean - std,  # one sigma lower
+        U1s=mean + std,  # one sigma upper
+    )
+
+
+class _Statistic:
+    """Read-only view of one entry of `SPCStats.statistics`."""
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, objtype=None):
+        return self if obj is None else obj.statistics[self.name]
+
+
+class SPCStats:
+    """SPC statistics, zones, violations and capability for one series, without any plotting (plotly is never
+    imported). Everything is computed on first access and cached; reassigning an input (`df`, `y_label`, `sides`,
+    `spec_limits`, `limits`, `limits_window`, `rules`, `chart_type`, `chart_options`, `subgroup`, `subgroup_size`) or
+    calling `invalidate()` clears the cache.
+
+    Takes the same arguments as `SPCPlot`, minus the styling ones, and exposes the same attributes apart from `fig`.
+    `df` may also be a plain 1-D array of measurements, with `y` left out. It is not copied: an `np.memmap` of a
+    `.npy` file is read in chunks for the statistics and rules, and only the one-byte-per-point violation mask is
+    held in memory (see `AnomalyDetector`).
+
+    With a `profiling.Profiler` as `profiler`, computing the statistics, running the detector (and each rule in it)
+    and collecting violations are recorded as stages.
+    """
+
+    INPUTS = ('df', 'y_label', 'sides', 'spec_limits', 'limits', 'limits_window', 'rules',
+              'chart_type', 'chart_options', 'subgroup', 'subgroup_size')
+    CACHED = ('x', 'y', 'subgroup_stats', 'subgroups', 'time_weighted', 'statistics', 'zones', 'detector',
+              'violations')
+    CHART_TYPES = ('individuals', 'i_mr', 'xbar_r', 'xbar_s', 'ewma', 'cusum')
+    SUBGROUP_CHARTS = ('xbar_r', 'xbar_s')
+    TIME_WEIGHTED_CHARTS = ('ewma', 'cusum')
+
+    mean = _Statistic()
+    std = _Statistic()
+    min = _Statistic()
+    max = _Statistic()
+    UCL = _Statistic()
+    LCL = _Statistic()
+    L1s = _Statistic()
+    U1s = _Statistic()
+
+    profiler = None
+
+    def __init__(self, df: pd.DataFrame | np.ndarray, y: str = None,
+                 control_sidedness: str = 'two',
+                 spec_limits: dict = None,
+                 limits: str = 'global',
+                 limits_window: tuple | int = None,
+                 violations: list = [1, 2, 3, 4, 5, 6, 7, 8],
+                 chart_type: str = 'individuals',
+                 subgroup: str = None,
+                 subgroup_size: int = None,
+                 profiler=None,
+                 chart_options: dict = None):
+
+        if control_sidedness not in ('two', 'one_upper', 'one_lower'):
+            raise ValueError('`control_sidedness` must be "two", "one_lower", or "one_upper"')
+        if chart_type not in self.CHART_TYPES:
+            raise ValueError(f'`chart_type` must be one of {", ".join(self.CHART_TYPES)}')
+        if chart_type in self.SUBGROUP_CHARTS and subgroup is None and not subgroup_size:
+            raise ValueError('subgroup charts need a `subgroup` column or a `subgroup_size`')
+        if chart_type != 'individuals' and limits != 'global':
+            raise ValueError(f'{chart_type} charts derive their limits from short-term variation; '
+                             '`limits` must be "global"')
+        if chart_type in self.TIME_WEIGHTED_CHARTS:
+            timeweighted.options(chart_type, chart_options)
+        registry.compile(violations)  # unknown rules, or too many, raise here rather than on first use
+
+        self.df = df
+        self.y_label = y     # for hover labels
+        self.sides = control_sidedness
+        self.spec_limits = spec_limits
+        self.limits = limits
+        self.limits_window = limits_window
+        self.rules = violations
+        self.chart_type = chart_type
+        self.chart_options = chart_options
+        self.subgroup = subgroup
+        self.subgroup_size = subgroup_size
+        self.profiler = profiler
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name in self.INPUTS:
+            self.invalidate()
+
+    def invalidate(self):
+        """Drop everything computed from the inputs."""
+        for name in self.CACHED:
+            self.__dict__.pop(name, None)
+
+    def append(self, new_rows):
+        """Add measurements to the end of the series, keeping the statistics and control limits computed so far
+        (computing them first if needed) and checking the rules only over the tail each needs. Only individuals and
+        I-MR charts with fixed limits can grow this way.
+
+        - *new_rows*: rows with the same columns as `df` (or values, if `df` is an array). With a default RangeIndex
+        on `df`, the new rows are numbered on from it; otherwise their own index is kept.
+
+        Returns the first position whose violations may have changed.
+        """
+        import pandas as pd
+        if self.chart_type in self.SUBGROUP_CHARTS:
+            raise ValueError('subgroup charts cannot be appended to')
+        if self.chart_type in self.TIME_WEIGHTED_CHARTS:
+            raise ValueError('EWMA and CUSUM charts cannot be appended to')
+        if np.ndim(self.UCL):
+            raise ValueError('append requires fixed limits; use limits="global" or "baseline"')
+        statistics, detector = self.statistics, self.detector
+
+        if self.y_label is None:
+            new = np.asarray(new_rows, dtype=np.float64)
+            df = np.concatenate((np.asarray(self.df, dtype=np.float64), new))
+            new = pd.Series(new, index=pd.RangeIndex(len(self.df), len(df)))
+        else:
+            new_rows = new_rows if isinstance(new_rows, pd.DataFrame) else pd.DataFrame(new_rows)
+            index = self.df.index
+            if isinstance(index, pd.RangeIndex) and index.step == 1:
+                new_rows = new_rows.set_axis(pd.RangeIndex(index.stop, index.stop + len(new_rows)))
+            df = pd.concat([self.df, new_rows])
+            new = new_rows[self.y_label]
+
+        first = detector.append(new)
+        statistics = dict(statistics, min=np.nanmin([statistics['min'], new.min()]),
+                          max=np.nanmax([statistics['max'], new.max()]))
+        if 'moving_range' in statistics:
+            last = self.y.iloc[-1:].to_numpy(dtype=np.float64)
+            tail = np.abs(np.diff(np.concatenate((last, new.to_numpy(dtype=np.float64)))))
+            statistics['moving_range'] = np.concatenate((statistics['moving_range'], tail))
+
+        # written past __setattr__, which would drop everything: only what depends on the length goes
+        self.__dict__['df'] = df
+        self.__dict__['statistics'] = statistics
+        for name in ('x', 'y', 'zones', 'violations'):
+            self.__dict__.pop(name, None)
+        return first
+
+    @classmethod
+    def from_results(cls, df, y: str = None, statistics: dict = None, mask=None, ruleset=None, x=None, **kwargs):
+        """An instance whose statistics and violations were computed elsewhere (read from a cache, or found by a
+        detector over many series at once), so neither is computed again.
+
+        - *statistics*: what `statistics` would hold
+        - *mask*: the rule bits of every point of `y` (see `bitmask.py`), as found by `ruleset`, a `rules.RuleSet`;
+        unless `violations` is given, the chart's rules are those of `ruleset`
+        - *x*: the x positions of the points, if not 0, 1, ... (e.g. the row numbers of a sample)
+
+        Other arguments are those of the constructor.
+        """
+        kwargs.setdefault('violations', ruleset)
+        chart = cls(df, y, **kwargs)
+        # written past __setattr__, as computing them would
+        chart.__dict__['statistics'] = statistics
+        if x is not None:
+            chart.__dict__['x'] = x
+        detector = AnomalyDetector(chart.y, mean=chart.mean, sigma=chart.std, profiler=chart.profiler)
+        detector.load(mask, ruleset)
+        chart.__dict__['detector'] = detector
+        return chart
+
+    def _profile_rows(self):
+        return len(self.df)
+
+    @property
+    def LSL(self):
+        return self.spec_limits.get('LSL') if self.spec_limits else None
+
+    @property
+    def USL(self):
+        return self.spec_limits.get('USL') if self.spec_limits else None
+
+    @cached_property
+    def x(self):
+        import pandas as pd
+        return pd.RangeIndex(len(self.y))  # force start at zero and increment by one. Expects ordered data.
+
+    @property
+    def measurements(self):
+        """The individual measurements, before any subgrouping."""
+        import pandas as pd
+        if self.y_label is None:
+            return pd.Series(np.asarray(self.df), copy=False)
+        return self.df[self.y_label]
+
+    @cached_property
+    def y(self):
+        if self.chart_type in self.TIME_WEIGHTED_CHARTS:
+            import pandas as pd
+            measurements = self.measurements
+            return pd.Series(self.time_weighted['values'], index=measurements.index, name=measurements.name,
+                             copy=False)
+        if self.chart_type not in self.SUBGROUP_CHARTS:
+            return self.measurements
+        return self.subgroups[self.y_label or 'Mean']
+
+    @property
+    def plot_df(self):
+        """The rows behind each plotted point: `df` itself, or `subgroups` for subgroup charts."""
+        return self.subgroups if self.chart_type in self.SUBGROUP_CHARTS else self.df
+
+    @cached_property
+    def subgroup_stats(self):
+        """Arrays from `subgroups.subgroup_stats`, None for individuals charts."""
+        if self.chart_type not in self.SUBGROUP_CHARTS:
+            return None
+        labels = None if self.subgroup is None else self.df[self.subgroup].to_numpy()
+        return subgroups.subgroup_stats(self.measurements.to_numpy(), labels, self.subgroup_size)
+
+    @cached_property
+    def subgroups(self):
+        """One row per subgroup: mean (under the y column name), range, standard deviation, size, the subgroup label
+        and the df index of its first row. None for individuals charts.
+        """
+        if self.chart_type not in self.SUBGROUP_CHARTS:
+            return None
+        import pandas as pd
+
+        stats = self.subgroup_stats
+        table = pd.DataFrame({
+            self.y_label or 'Mean': stats['mean'],
+            'Range': stats['range'],
+            'Std Dev': stats['std'],
+            'n': stats['n'],
+        })
+        if self.subgroup is not None:
+            table[self.subgroup] = self.df[self.subgroup].to_numpy()[stats['start']]
+        table['First Row'] = self.measurements.index[stats['start']]
+        return table
+
+    @cached_property
+    def time_weighted(self):
+        """For EWMA and CUSUM charts, the plotted statistic of every measurement ('values') with its centre line
+        and sigma (per point for EWMA), the target and process sigma it was computed from, and the chart's options
+        (see `timeweighted.py`); CUSUM charts add the two one-sided sums 'C_plus' and 'C_minus'. None otherwise.
+
+        The target and sigma default to the mean and MR-bar / d2 of the measurements, as for an I-MR chart.
+        """
+        if self.chart_type not in self.TIME_WEIGHTED_CHARTS:
+            return None
+        values = self.measurements.to_numpy(dtype=np.float64)
+        options = timeweighted.options(self.chart_type, self.chart_options)
+        target, sigma = options.pop('target', None), options.pop('sigma', None)
+        if target is None or sigma is None:
+            estimate = subgroups.moving_range_limits(values)
+            target = estimate['mean'] if target is None else target
+            sigma = estimate['sigma'] if sigma is None else sigma
+
+        if self.chart_type == 'ewma':
+            lam = options['lambda']
+            # limits at L EWMA sigmas, drawn (and checked by rule 1) as 3 sigmas of L / 3 of one
+            return dict(values=timeweighted.ewma(values, lam, target), center=target,
+                        std=timeweighted.ewma_sigma(values, lam, sigma) * options['L'] / 3,
+                        target=target, sigma=sigma, **options)
+
+        upper, lower = timeweighted.cusum(values, target, options['k'] * sigma)
+        # one series to plot and check: C+ where it is the larger sum, -C- where C- is; |value| > H is a signal
+        return dict(values=np.where(upper >= lower, upper, -lower), center=0.0, std=options['h'] * sigma / 3,
+                    target=target, sigma=sigma, C_plus=upper, C_minus=lower, **options)
+
+    @property
+    def dispersion(self):
+        """The moving range series of an I-MR chart, or the R or S series of a subgroup chart, with its centre line
+        and limits, for the companion chart.
+        """
+        if self.chart_type == 'individuals' or self.chart_type in self.TIME_WEIGHTED_CHARTS:
+            return None
+        if self.chart_type == 'i_mr':
+            label, values = 'Moving Range', self.statistics['moving_range']
+        else:
+            label = 'Range' if self.chart_type == 'xbar_r' else 'Std Dev'
+            values = self.subgroups[label]
+        return dict(label=label, values=values,
+                    center=self.statistics['dispersion_center'],
+                    LCL=self.statistics['dispersion_LCL'],
+                    UCL=self.statistics['dispersion_UCL'])
+
+    @cached_property
+    @profiled()
+    def statistics(self):
+        extra = {}
+        if self.chart_type == 'i_mr':
+            # one pass over the same float64 values the detector compares against the limits
+            extra = subgroups.moving_range_limits(self.y.to_numpy(dtype=np.float64))
+            mean, std = extra.pop('mean'), extra.pop('std')
+        elif self.chart_type in self.SUBGROUP_CHARTS:
+            extra = subgroups.subgroup_limits(self.subgroup_stats, self.chart_type)
+            mean, std = extra.pop('mean'), extra.pop('std')
+        elif self.chart_type in self.TIME_WEIGHTED_CHARTS:
+            extra = {k: v for k, v in self.time_weighted.items() if k not in ('values', 'center', 'std')}
+            mean, std = self.time_weighted['center'], self.time_weighted['std']
+        elif self.limits == 'global' and self.y_label is None:
+            # arrays (memory-mapped ones included) are read in chunks, not copied for NaN handling
+            m = moments(np.asarray(self.df))
+            return dict(mean=m.mean, std=m.std, min=m.min, max=m.max, **_limit_lines(m.mean, m.std))
+        elif self.limits == 'global':
+            mean, std = self.y.mean(), self.y.std()
+        else:
+            mean, std = control_limits(self.y, self.limits, self.limits_window)
+        return dict(
+            **extra,
+            mean=mean,
+            std=std,
+            min=self.y.min(),
+            max=self.y.max(),
+            **_limit_lines(mean, std),
+        )
+
+    @property
+    def spacer(self):
+        # arbitrary constant used to set visual limits
+        return self.UCL - self.mean
+
+    @cached_property
+    def zones(self):
+        spacer = self.spacer
+        zones = {
+            '+2': [self.UCL, self.UCL+5*spacer],
+            '+1': [self.U1s, self.UCL],
+            '0' : [self.L1s, self.U1s],
+            '-1': [self.LCL, self.L1s],
+            '-2': [self.LCL-5*spacer, self.LCL]
+        }
+        if self.sides == 'one_lower':
+            del zones['+2']
+            del zones['+1']
+            zones['0'][1] = self.max + 4 * self.mean
+
+        elif self.sides == 'one_upper':
+            del zones['-2']
+            del zones['-1']
+            zones['0'][0] = self.min - 4 * self.mean
+        return zones
+
+    @property
+    def detector_rules(self):
+        """The rules checked: those asked for, except on EWMA and CUSUM charts, whose successive points are
+        correlated by construction, where only single-point rules (such as rule 1, a point beyond the control limits)
+        apply. A tabular CUSUM signals once a sum exceeds H and the statistics are not computed at missing
+        measurements, so on these charts rule 1 leaves out points exactly on the limits and NaN.
+        """
+        if self.chart_type in self.TIME_WEIGHTED_CHARTS:
+            ruleset = registry.compile(self.rules)
+            rules = [key if key in registry.REGISTRY else rule for key, rule in ruleset.rules.items() if rule.pointwise]
+            return [timeweighted.SIGNAL if key == 1 else key for key in rules]
+        return self.rules
+
+    @cached_property
+    @profiled()
+    def detector(self):
+        detector = AnomalyDetector(self.y, mean=self.mean, sigma=self.std, profiler=self.profiler)
+        detector.apply_rules(self.detector_rules)
+        return detector
+
+    @property
+    def violation_mask(self):
+        """One uint8 per point of `y`, bit k - 1 set where rule k fired."""
+        return self.detector.mask
+
+    def violation_counts(self):
+        """{rule: number of points where it fired}."""
+        return self.detector.counts()
+
+    @cached_property
+    def violations(self):
+        try:
+            return self.detector.violations()
+        except Exception as e:
+            return 'Issue encountered: ' + str(e)
+
+    def capability(self):
+        # a limit of 0 is a limit; only None means there is none on that side
+        lower, upper = self.LSL is not None, self.USL is not None
+        if lower or upper:
+            cp = {
+                'mean': self.mean,
+                'LCL': self.LCL,
+                'UCL': self.UCL,
+                'Process Width': self.UCL - self.LCL,
+                'LSL': self.LSL,
+                'USL': self.USL
+            }
+            # two-sided specs
+            if lower and upper:
+                cp['Spec Width'] = self.USL - self.LSL
+                cp['Cp Lower'] = (self.mean - self.LSL) / (self.mean - self.LCL)
+                cp['Cp Upper'] = (self.USL - self.mean) / (self.UCL - self.mean)
+
+            # one-sided, lower spec
+            elif lower:
+                cp['Spec Width'] = self.mean - self.LSL
+
+            # one-sided, upper spec
+            else:
+                cp['Spec Width'] = self.USL - self.mean
+            cp['Cp'] = cp['Spec Width'] / cp['Process Width']
+            return cp
@@ -0,0 +1,196 @@
+"""Out-of-core SPC over one column of a Parquet or CSV file too large to load.
+
+`stream_spc` reads the column in chunks twice: once for the mean and standard deviation (combined chunk by chunk),
+once for the rules. Between chunks the rules carry only the last few points and the counters of the runs in progress
+(see `vectorized.detect_chunked`), so the result matches `AnomalyDetector` over the whole column. What is kept is
+the statistics, the row numbers and rule bits of the violating points, and a downsampled sample for drawing; memory
+follows the chunk size, not the file size.
+
+Parquet is read through pyarrow, which has to be installed for it.
+"""
+import math
+import numpy as np
+import pandas as pd
+from . import bitmask, downsample, rules as registry, vectorized
+from .limits import Moments
+
+PARQUET_SUFFIXES = ('.parquet', '.pq', '.parq')
+
+
+def iter_column(path: str, column: str, chunksize: int = 1_000_000, format: str = None):
+    """Yield the values of `column` as float64 arrays of up to `chunksize` rows. `format` is 'parquet' or 'csv'; by
+    default it is taken from the file name.
+    """
+    format = format or ('parquet' if str(path).lower().endswith(PARQUET_SUFFIXES) else 'csv')
+    if format == 'parquet':
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError('reading Parquet files requires pyarrow') from None
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=[column]):
+            yield batch.column(0).to_numpy(zero_copy_only=False).astype(np.float64, copy=False)
+    elif format == 'csv':
+        for chunk in pd.read_csv(path, usecols=[column], chunksize=chunksize):
+            yield chunk[column].to_numpy(dtype=np.float64, na_value=np.nan)
+    else:
+        raise ValueError('`format` must be "parquet" or "csv"')
+
+
+class ChunkedDetector:
+    """Runs the rules over consecutive chunks of one series under fixed limits, carrying the last `ruleset.lookback`
+    points and the counters of the runs in progress from one chunk to the next.
+
+    `feed` returns the positions (within the whole series) and rule bits of the violations that are final so far.
+    The last point fed stays pending, since rules 5-7 may still flag it, until the next chunk or `finish`.
+    """
+
+    def __init__(self, mean: float, sigma: float, rules=(1, 2, 3, 4, 5, 6, 7, 8)):
+        self.mean, self.sigma = mean, sigma
+        self.ruleset = registry.compile(rules)
+        self.rules = list(self.ruleset.keys)
+        self.bits = self.ruleset.bits
+        self.n = 0
+        self._carry = np.empty(0)   # values[-len(_carry):] of everything fed so far, at most `lookback` of them
+        self._seed = {}             # run counters before the first of them (see `rules.Intermediates.state`)
+        self._pending = np.uint8(0)  # rule bits of the last point, not final yet
+
+    def feed(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if not len(values):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.uint8)
+        x = np.concatenate((self._carry, values))
+        offset = self.n - len(self._carry)  # series position of x[0]
+        mask, start, seed = vectorized.detect_chunked(x, self.mean, self.sigma, self.ruleset, seed=self._seed)
+
+        first = max(self.n - 1, 0) - offset  # the previous pending point, judged again
+        final = mask[first:-1]
+        hits = np.flatnonzero(final)
+        self.n += len(values)
+        self._pending = mask[-1]
+        self._carry, self._seed = x[start:].copy(), seed
+        return offset + first + hits, final[hits]
+
+    def finish(self):
+        """The last point's violation, if any, once no more chunks will come."""
+        if self.n and self._pending:
+            return np.array([self.n - 1]), np.array([self._pending], dtype=np.uint8)
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.uint8)
+
+
+class StreamedSPC:
+    """Result of `stream_spc`.
+
+    Class Attributes:
+    - *n*: rows read
+    - *statistics*: mean, std, min, max, UCL, LCL, L1s, U1s of the whole column, as `SPCStats.statistics`
+    - *positions*: row numbers (0-based, in file order) of every violating point
+    - *mask*: rule bits of those points (see `bitmask.py`)
+    - *rules*: the rules checked
+    - *bits*: {rule: bit of `mask`}
+    - *sample*: the downsampled points to draw, violations included, indexed by row number
+    """
+
+    def __init__(self, column, n, statistics, positions, mask, ruleset, sample):
+        self.column = column
+        self.n = n
+        self.statistics = statistics
+        self.positions = positions
+        self.mask = mask
+        self.ruleset = ruleset
+        self.rules = list(ruleset.keys)
+        self.bits = ruleset.bits
+        self.sample = sample
+
+    def violations(self):
+        """Series of the rules fired at each violating row, as lists, like `AnomalyDetector.violations()`."""
+        if not len(self.positions):
+            return pd.Series(index=pd.Index([], dtype='int64'), dtype=np.float64, name='violations')
+        values = np.empty(len(self.positions), dtype=object)
+        values[:] = [list(rules) for rules in bitmask.decode(self.mask, self.rules, self.bits)]
+        return pd.Series(values, index=pd.Index(self.positions), name='violations')
+
+    def counts(self):
+        return bitmask.counts(self.mask, self.rules, bits=self.bits)
+
+    def chart(self, draw: bool = True, **kwargs):
+        """`SPCPlot` of the sample, with the whole column's statistics and violations and x as row numbers. With
+        `draw` the scatter, zones, lines and violations are drawn.
+        """
+        from . import SPCPlot
+        from .cache import render
+
+        mask = np.zeros(len(self.sample), dtype=np.uint8)
+        mask[np.searchsorted(self.sample.index, self.positions)] = self.mask
+        chart = SPCPlot.from_results(self.sample, self.column, dict(self.statistics), mask, self.ruleset,
+                                     x=pd.Index(self.sample.index), **kwargs)
+        return render(chart, serialize=False) if draw else chart
+
+    @property
+    def fig(self):
+        return self.chart().fig
+
+
+def stream_spc(path: str, column: str,
+               chunksize: int = 1_000_000,
+               format: str = None,
+               violations: list = [1, 2, 3, 4, 5, 6, 7, 8],
+               mean: float = None,
+               sigma: float = None,
+               n_out: int = 10_000,
+               algorithm: str = 'lttb'):
+    """Statistics, complete violations and a downsampled sample of one column of a Parquet or CSV file, reading
+    `chunksize` rows at a time.
+
+    - *violations*: rules to check, as for `SPCPlot`
+    - *mean*, *sigma*: fixed limits; given both, the first pass over the file is skipped (min and max then come from
+    the second)
+    - *n_out*: about how many points to keep for drawing, spread over the chunks in proportion to their length. With
+    `mean` and `sigma` given the length is not known ahead, so what is kept is thinned back to about `n_out` points
+    whenever it grows past twice that.
+    - *algorithm*: 'lttb' or 'minmax' (see `downsample.py`), applied per chunk
+    """
+    if (mean is None) != (sigma is None):
+        raise ValueError('`mean` and `sigma` must be given together')
+    moments = Moments()
+    if mean is None:
+        for values in iter_column(path, column, chunksize, format):
+            moments.update(values)
+        mean, sigma, total = moments.mean if moments.n else math.nan, moments.std, moments.n
+    else:
+        total = None
+
+    detector = ChunkedDetector(mean, sigma, violations)
+    select = downsample.ALGORITHMS[algorithm]
+    positions, masks, sample_x, sample_y = [], [], [], []
+    second = Moments()
+    for values in iter_column(path, column, chunksize, format):
+        offset = detector.n
+        found, bits = detector.feed(values)
+        positions.append(found)
+        masks.append(bits)
+        second.update(values)
+
+        budget = max(3, math.ceil(n_out * len(values) / total)) if total else n_out
+        keep = select(np.arange(len(values)), values, budget)
+        # violations are always drawn. A chunk's last point may only be flagged once the next chunk is read, so it
+        # is kept regardless.
+        keep = np.union1d(keep, np.append(found[found >= offset] - offset, len(values) - 1))
+        sample_x.append(offset + keep)
+        sample_y.append(values[keep])
+        if not total and sum(map(len, sample_x)) > 2 * n_out:
+            x, y = np.concatenate(sample_x), np.concatenate(sample_y)
+            keep = np.union1d(select(x, y, n_out),
+                              np.append(np.flatnonzero(np.isin(x, np.concatenate(positions))), len(x) - 1))
+            sample_x, sample_y = [x[keep]], [y[keep]]
+    found, bits = detector.finish()
+    positions.append(found)
+    masks.append(bits)
+
+    positions = np.concatenate(positions)
+    mask = np.concatenate(masks)
+    x = np.concatenate(sample_x) if sample_x else np.empty(0, dtype=np.int64)
+    y = np.concatenate(sample_y) if sample_y else np.empty(0)
+    statistics = dict(mean=mean, std=sigma, min=second.min, max=second.max,
+                      UCL=mean + 3 * sigma, LCL=mean - 3 * sigma, L1s=mean - sigma, U1s=mean + sigma)
+    sample = pd.DataFrame({column: y}, index=pd.Index(x, name='row'))
+    return StreamedSPC(column, detector.n, statistics, positions, mask, detector.ruleset, sample)
@@ -0,0 +1,131 @@
+"""Rational subgroup statistics for X-bar/R and X-bar/S charts.
+
+Subgroups are either consecutive runs of equal labels (ordered data) or fixed-size consecutive blocks; the last
+block may be short. Means, ranges and standard deviations of all subgroups come out of one reshape (equal sizes) or
+one set of `reduceat` calls (unequal sizes). NaNs are not skipped; a subgroup containing one gets NaN statistics.
+
+Individuals charts can estimate sigma the same way from moving ranges, i.e. overlapping subgroups of two (I-MR).
+"""
+import math
+import numpy as np
+
+# d2 and d3 (mean and standard deviation of the relative range) for subgroup sizes 2-25
+d2_TABLE = dict(zip(range(2, 26), (
+    1.128, 1.693, 2.059, 2.326, 2.534, 2.704, 2.847, 2.970, 3.078, 3.173, 3.258, 3.336,
+    3.407, 3.472, 3.532, 3.588, 3.640, 3.689, 3.735, 3.778, 3.819, 3.858, 3.895, 3.931)))
+d3_TABLE = dict(zip(range(2, 26), (
+    0.853, 0.888, 0.880, 0.864, 0.848, 0.833, 0.820, 0.808, 0.797, 0.787, 0.778, 0.770,
+    0.763, 0.756, 0.750, 0.744, 0.739, 0.733, 0.729, 0.724, 0.720, 0.716, 0.712, 0.708)))
+
+
+def c4(n):
+    """Bias of the sample standard deviation of n normal points: E[s] = c4 * sigma."""
+    return math.sqrt(2 / (n - 1)) * math.exp(math.lgamma(n / 2) - math.lgamma((n - 1) / 2))
+
+
+def constants(n):
+    """Control chart constants for subgroup size n: A2, A3, d2, d3, D3, D4, c4, B3, B4."""
+    if n < 2:
+        raise ValueError('subgroups need at least 2 points')
+    out = dict(c4=c4(n))
+    k = 3 * math.sqrt(1 - out['c4'] ** 2) / out['c4']
+    out.update(A3=3 / (out['c4'] * math.sqrt(n)), B3=max(0.0, 1 - k), B4=1 + k)
+    if n in d2_TABLE:
+        d2, d3 = d2_TABLE[n], d3_TABLE[n]
+        out.update(d2=d2, d3=d3, A2=3 / (d2 * math.sqrt(n)), D3=max(0.0, 1 - 3 * d3 / d2), D4=1 + 3 * d3 / d2)
+    return out
+
+
+def _constant(sizes, name):
+    """Constant `name` for each subgroup size, NaN for subgroups of one point."""
+    unique, inverse = np.unique(sizes, return_inverse=True)
+    try:
+        table = np.array([constants(n)[name] if n >= 2 else np.nan for n in unique])
+    except KeyError:
+        raise ValueError(f'{name} is only tabulated for subgroups of 2 to 25 points') from None
+    return table[inverse]
+
+
+def subgroup_stats(values, labels=None, size: int = None):
+    """Per-subgroup start position, size, mean, range and standard deviation (ddof=1) of `values`, grouped by
+    consecutive equal `labels` or in blocks of `size`.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if labels is not None:
+        labels = np.asarray(labels)
+        starts = np.flatnonzero(np.concatenate(([True], labels[1:] != labels[:-1])))
+    elif size:
+        starts = np.arange(0, len(values), size)
+    else:
+        raise ValueError('subgroups need either labels or a size')
+    n = np.diff(np.append(starts, len(values)))
+
+    if size and labels is None and len(values) % size == 0:
+        block = values.reshape(-1, size)
+        mean = block.mean(axis=1)
+        spread = block.max(axis=1) - block.min(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = block.std(axis=1, ddof=1)
+    else:
+        mean = np.add.reduceat(values, starts) / n
+        spread = np.maximum.reduceat(values, starts) - np.minimum.reduceat(values, starts)
+        dev = values - np.repeat(mean, n)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.sqrt(np.add.reduceat(dev * dev, starts) / (n - 1))
+    return dict(start=starts, n=n, mean=mean, range=spread, std=std)
+
+
+def subgroup_limits(stats, chart_type: str):
+    """Centre line and sigma of the subgroup means, and centre line and limits of the dispersion chart, for
+    'xbar_r' (sigma from R-bar / d2) or 'xbar_s' (sigma from S-bar / c4).
+
+    With equal subgroup sizes, mean +- 3 sigma here is X-double-bar +- A2 R-bar (or A3 S-bar). With unequal sizes
+    the sigma of each mean, and the dispersion limits, are per subgroup. Subgroups of one point (a short last block,
+    say) have no range or standard deviation: they are left out of R-bar and S-bar, and their dispersion centre
+    line and limits are NaN.
+    """
+    n = stats['n']
+    if n.max() < 2:
+        raise ValueError('subgroups need at least 2 points')
+
+    if chart_type == 'xbar_r':
+        d2 = _constant(n, 'd2')
+        sigma = np.nanmean(stats['range'] / d2)
+        center = d2 * sigma
+        lower, upper = _constant(n, 'D3') * center, _constant(n, 'D4') * center
+    elif chart_type == 'xbar_s':
+        c = _constant(n, 'c4')
+        sigma = np.nanmean(stats['std'] / c)
+        center = c * sigma
+        lower, upper = _constant(n, 'B3') * center, _constant(n, 'B4') * center
+    else:
+        raise ValueError('`chart_type` must be "xbar_r" or "xbar_s"')
+
+    finite = ~np.isnan(stats['mean'])
+    grand_mean = np.sum(stats['mean'][finite] * n[finite]) / np.sum(n[finite])
+    sigma_mean = sigma / np.sqrt(n)
+    if (n == n[0]).all():
+        sigma_mean, center, lower, upper = sigma_mean[0], center[0], lower[0], upper[0]
+    return dict(mean=grand_mean, sigma=sigma, std=sigma_mean,
+                dispersion_center=center, dispersion_LCL=lower, dispersion_UCL=upper)
+
+
+def moving_range_limits(values):
+    """Centre line and sigma of an individuals chart from the mean moving range (MR-bar / d2), and the moving range
+    series (NaN first, aligned with `values`) with its centre line and limits (D3 MR-bar, D4 MR-bar).
+
+    Unlike the overall standard deviation, moving ranges are barely affected by shifts in the process mean. Moving
+    ranges next to a NaN are NaN and left out of MR-bar.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) < 2:
+        raise ValueError('moving ranges need at least 2 points')
+    moving_range = np.empty_like(values)
+    moving_range[0] = np.nan
+    np.abs(np.subtract(values[1:], values[:-1], out=moving_range[1:]), out=moving_range[1:])
+
+    c = constants(2)
+    center = np.nanmean(moving_range)
+    sigma = center / c['d2']
+    return dict(mean=np.nanmean(values), sigma=sigma, std=sigma, moving_range=moving_range,
+                dispersion_center=center, dispersion_LCL=c['D3'] * center, dispersion_UCL=c['D4'] * center)
@@ -0,0 +1,131 @@
+"""EWMA and tabular CUSUM statistics, computed with array operations rather than a Python loop per point.
+
+Both charts accumulate information over time and so react to small sustained shifts that the Shewhart rules in
+`vectorized.py` are slow to see.
+
+EWMA, z_t = lam x_t + (1 - lam) z_{t-1} with z_0 = target, is a first-order linear filter. Writing a = 1 - lam,
+within a block z_t = a^t (z_0 + lam sum_{i<=t} a^-i x_i), which is one cumulative sum. a^-i grows without bound, so
+the series is cut into blocks short enough for it to stay well within float64 range (as a 2-D array, every block at
+once), and the value at the end of each block is carried into the next: one multiply-add per block. Its limits are
+the exact time-varying ones, target +/- L sigma sqrt(lam / (2 - lam) (1 - a^2t)).
+
+The tabular CUSUM C+_t = max(0, C+_{t-1} + x_t - target - K) is a reflected random walk: with S the running sum of
+x - target - K, C+_t = S_t - min(-C+_0, min_{j<=t} S_j), one cumulative sum and one running minimum. C- is the same
+for target - K - x. Chunks of `CHUNKSIZE` points each start from the previous chunk's last value, which keeps the
+running sums small and their rounding error with them.
+
+A CUSUM signals when C+ or C- exceeds the decision interval H; a sum equal to H does not.
+
+Missing (NaN) measurements are skipped: the statistic is NaN there, the recursion continues from the last value and
+no signal is raised at them.
+"""
+import numpy as np
+from .rules import Beyond
+
+CHUNKSIZE = 1 << 18
+
+# the largest a^-i used within an EWMA block; leaves about 200 orders of magnitude for the measurements themselves
+_MAX_GROWTH = 1e100
+
+DEFAULTS = dict(
+    ewma={'lambda': 0.2, 'L': 3.0},
+    cusum={'k': 0.5, 'h': 5.0},
+)
+
+# rule 1 as checked on EWMA and CUSUM charts (whose CUSUM limits are +/-H at 3 sigmas): strictly beyond the limits,
+# NaN not included, as the statistic is not computed at a missing measurement
+SIGNAL = Beyond(1, 1, 3, side='either', name=1)
+
+
+def _finite(values):
+    values = np.asarray(values, dtype=np.float64)
+    finite = ~np.isnan(values)
+    return values, finite, finite.all()
+
+
+def _scatter(result, finite, all_finite):
+    if all_finite:
+        return result
+    out = np.full(len(finite), np.nan)
+    out[finite] = result
+    return out
+
+
+def ewma(values, lam: float = 0.2, start: float = 0.0):
+    """z_t = lam x_t + (1 - lam) z_{t-1}, z_0 = `start`, for every point of `values`; NaN where `values` is NaN."""
+    if not 0 < lam <= 1:
+        raise ValueError('`lam` must be in (0, 1]')
+    values, finite, all_finite = _finite(values)
+    x = values if all_finite else values[finite]
+    if lam == 1 or not len(x):
+        return _scatter(x.copy(), finite, all_finite)
+
+    a = 1.0 - lam
+    block = max(1, min(len(x), int(np.log(_MAX_GROWTH) / -np.log(a))))
+    blocks = -(-len(x) // block)
+    z = np.zeros(blocks * block)
+    z[:len(x)] = x
+    z = z.reshape(blocks, block)
+
+    j = np.arange(1, block + 1)
+    # within each block z_j = a^j (z_0 + lam sum_{i<=j} a^-i x_i), evaluated in place
+    z *= a ** -j
+    np.cumsum(z, axis=1, out=z)
+    z *= lam
+
+    # z_0 of each block: the last value of the one before, carried forward
+    a_block = a ** block
+    ends = z[:, -1] * a_block  # what each block adds to its last value, starting from 0
+    carried = np.empty(blocks)
+    previous = start
+    for b in range(blocks):
+        carried[b] = previous
+        previous = ends[b] + a_block * previous
+    z += carried[:, None]
+    z *= a ** j
+    return _scatter(z.ravel()[:len(x)], finite, all_finite)
+
+
+def ewma_sigma(values, lam: float = 0.2, sigma: float = 1.0):
+    """Exact standard deviation of the EWMA at every point, sigma sqrt(lam / (2 - lam) (1 - (1 - lam)^2t)), t
+    counting the non-missing measurements so far.
+    """
+    t = np.cumsum(~np.isnan(np.asarray(values, dtype=np.float64)))
+    if lam == 1:
+        return np.where(t > 0, sigma, 0.0)
+    # 1 - a^2t as -expm1(2t log a), which keeps its precision for small lam and t
+    return sigma * np.sqrt(lam / (2 - lam) * -np.expm1(2 * t * np.log1p(-lam)))
+
+
+def _reflected(x, offset, sign, carry, chunksize):
+    """C_t = max(0, C_{t-1} + sign x_t - offset) with C_0 = carry, a chunk at a time."""
+    out = np.empty_like(x)
+    for start in range(0, len(x), chunksize):
+        chunk = out[start:start + chunksize]
+        np.multiply(x[start:start + chunksize], sign, out=chunk)
+        chunk -= offset
+        np.cumsum(chunk, out=chunk)
+        floor = np.minimum.accumulate(np.minimum(chunk, -carry))
+        chunk -= floor
+        carry = chunk[-1]
+    return out
+
+
+def cusum(values, target: float, K: float, start: float = 0.0, chunksize: int = CHUNKSIZE):
+    """Tabular CUSUM (C+, C-) of `values` about `target` with allowance `K` (both sides starting from `start`); NaN
+    where `values` is NaN.
+    """
+    values, finite, all_finite = _finite(values)
+    x = values if all_finite else values[finite]
+    upper = _reflected(x, target + K, 1.0, start, chunksize)
+    lower = _reflected(x, K - target, -1.0, start, chunksize)
+    return _scatter(upper, finite, all_finite), _scatter(lower, finite, all_finite)
+
+
+def options(chart_type: str, chart_options: dict = None):
+    """The chart's defaults updated with `chart_options`, checked."""
+    out = dict(DEFAULTS[chart_type], **(chart_options or {}))
+    unknown = set(out) - set(DEFAULTS[chart_type]) - {'target', 'sigma'}
+    if unknown:
+        raise ValueError(f'unknown {chart_type} options: {", ".join(sorted(unknown))}')
+    return out
@@ -0,0 +1,103 @@
+"""Array evaluation of the `AnomalyDetector` rules.
+
+The rules themselves are declared in `rules.py`, where the numbered ones mirror the loop versions of the same number
+in `anomaly_detector.py`, quirks included. Each returns `(start, hits)`: a boolean array of whether it fired at
+positions start, start + 1, ... (or None where the loop version returns without writing a column). `detect` expands
+these into int64 arrays; `detect_into` sets the rule's bit in a preallocated mask instead, so no full-length array
+is made per rule. The helpers work along axis 0 so they also accept 2-D input.
+"""
+import numpy as np
+from . import bitmask
+from .rules import compile as compile_rules
+
+# points evaluated at a time by `detect_into` when the limits are scalars; bounds the intermediate arrays
+CHUNKSIZE = 1 << 18
+
+DEFAULT_RULES = (1, 2, 3, 4, 5, 6, 7, 8)
+
+
+def _fire(n, rule, start, hits):
+    values = np.zeros(n, dtype=np.int64)
+    values[start:start + len(hits)] = np.where(hits, rule if isinstance(rule, int) else 1, 0)
+    return values
+
+
+def detect(values, mean, sigma, rules=DEFAULT_RULES, profiler=None):
+    """Run the requested rules over `values` in one go, sharing intermediate arrays between them. `rules` is anything
+    `rules.compile` takes: rule numbers, registered names, `Rule` objects, rule set names, or a compiled `RuleSet`.
+
+    Returns a dict of rule key to result array (holding the rule number where a numbered rule fired, 1 for others),
+    in the order requested, skipping rules that produced nothing. With a `profiling.Profiler`, each rule is recorded
+    as stage 'rule<key>'; an intermediate shared by several rules is charged to the first rule that needs it.
+    """
+    return {rule: _fire(len(values), rule, start, hits)
+            for rule, start, hits in compile_rules(rules).evaluate(values, mean, sigma, profiler)}
+
+
+def _set_bits(out, values, mean, sigma, ruleset, profiler, first=0):
+    """OR the bit of each rule into `out` (aligned with `values`, or an `Intermediates`) from position `first` on."""
+    for rule, start, hits in ruleset.evaluate(values, mean, sigma, profiler):
+        skip = max(first - start, 0)
+        fired = out[start + skip:start + len(hits)]
+        fired[hits[skip:]] |= bitmask.bit(rule, ruleset.bits)
+
+
+def detect_into(values, mean, sigma, rules=DEFAULT_RULES, out=None, profiler=None, chunksize: int = CHUNKSIZE,
+                bits: dict = None):
+    """`detect`, but writing the results as rule bits (see `bitmask.py`) into `out`, a uint8 array as long as
+    `values` that is allocated if not given and returned. Bits already set in it are kept. `bits` are mask bits
+    assigned to rules before (see `rules.compile`); a compiled `RuleSet` carries its own.
+
+    `values` is only read, never copied whole, so it can be an `np.memmap`. With scalar limits, series longer
+    than `chunksize` are evaluated a chunk at a time (see `detect_chunked`), so the bits match a single pass while
+    the intermediate arrays stay the size of a chunk. Per-point limits, and 2-D `values` (one series per column, with
+    `mean` and `sigma` scalars or one per column), are evaluated in one pass.
+
+    Per-point limits are NaN where there is too little data for them, at the first point of expanding or trailing
+    limits say. No rule judges those points: the series is evaluated from the first point with both limits known, and
+    points after it with a limit unknown get no bits.
+    """
+    ruleset = compile_rules(rules, bits)
+    if out is None:
+        out = np.zeros(np.shape(values), dtype=np.uint8)
+    if np.ndim(values) == 1 and (np.ndim(mean) or np.ndim(sigma)):
+        known = np.broadcast_to(~(np.isnan(mean) | np.isnan(sigma)), np.shape(values))
+        first = int(known.argmax()) if known.any() else len(values)
+        mean, sigma = (limit[first:] if np.ndim(limit) else limit for limit in (mean, sigma))
+        fired = np.zeros(len(values) - first, dtype=np.uint8)
+        _set_bits(fired, values[first:], mean, sigma, ruleset, profiler)
+        fired[~known[first:]] = 0
+        out[first:] |= fired
+        return out
+    if len(values) <= chunksize or np.ndim(values) > 1:
+        _set_bits(out, values, mean, sigma, ruleset, profiler)
+        return out
+    detect_chunked(values, mean, sigma, ruleset, out, profiler, chunksize)
+    return out
+
+
+def detect_chunked(values, mean, sigma, ruleset, out=None, profiler=None, chunksize: int = CHUNKSIZE,
+                   seed: dict = None):
+    """`detect_into` for a 1-D series under scalar limits, a chunk at a time, continuing from `seed`: the counters of
+    the runs in progress before `values[0]` (see `rules.Intermediates.state`), when `values` carries on a series
+    evaluated before from its `ruleset.tail_start`.
+
+    Each chunk is evaluated with the last `ruleset.lookback` points before it and the counters of the runs in progress
+    there, never the runs' points themselves, so the work and memory per chunk stay bounded on drifting or constant
+    data too. Returns (out, start, state): the mask, and `ruleset.tail_start` of `values` with the run counters there,
+    to carry on from once more points come.
+    """
+    n = len(values)
+    if out is None:
+        out = np.zeros(n, dtype=np.uint8)
+    start = 0  # position of the first point the next chunk starts from
+    for stop in range(chunksize, n + chunksize, chunksize):
+        stop = min(stop, n)
+        s = ruleset.intermediates(values[start:stop], mean, sigma, seed)
+        # the point before the chunk may only now be flagged by rules 5-7; earlier ones are final
+        first = max(stop - chunksize - 1, 0)
+        _set_bits(out[start:stop], s, mean, sigma, ruleset, profiler, first - start)
+        at = ruleset.tail_start(stop - start)
+        seed = s.state(at, ruleset.carries)
+        start += at
+    return out, start, seed or {}
@@ -0,0 +1,65 @@
+"""Time `capability_groupby` against one `SPCStats.capability()` per group in a loop.
+
+    python -m benchmarks.bench_capability --groups 5000 --points 200
+"""
+import argparse
+import time
+import warnings
+import numpy as np
+import pandas as pd
+from SPC import SPCStats
+from SPC.capability import capability_groupby
+
+
+def make_frame(groups, points, seed=0):
+    rng = np.random.default_rng(seed)
+    n = rng.integers(points // 2, points * 3 // 2, groups)
+    key = np.repeat(np.arange(groups), n)
+    nominal = rng.uniform(0, 100, groups)
+    tolerance = rng.uniform(0.2, 1.0, groups)
+    lsl = nominal - tolerance
+    usl = nominal + tolerance
+    usl[::7] = np.nan           # one-sided characteristics
+    lsl[::5] = 0.0              # zero-valued limits
+    return pd.DataFrame({
+        'part': key // 10,
+        'feature': key % 10,
+        'value': np.repeat(nominal, n) + rng.normal(0, 0.15, n.sum()),
+        'LSL': np.repeat(lsl, n),
+        'USL': np.repeat(usl, n),
+    })
+
+
+def naive(df, by):
+    out = {}
+    for key, group in df.groupby(by):
+        lsl, usl = group['LSL'].iloc[0], group['USL'].iloc[0]
+        spec_limits = {k: v for k, v in (('LSL', lsl), ('USL', usl)) if not np.isnan(v)}
+        out[key] = SPCStats(group, 'value', spec_limits=spec_limits).capability()
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--groups', type=int, default=5000)
+    parser.add_argument('--points', type=int, default=200)
+    parser.add_argument('--skip-naive', action='store_true')
+    args = parser.parse_args()
+
+    warnings.simplefilter('ignore')
+    df = make_frame(args.groups, args.points)
+    by = ['part', 'feature']
+    print(f'{args.groups} groups, {len(df)} rows')
+
+    if not args.skip_naive:
+        start = time.perf_counter()
+        naive(df, by)
+        print(f'naive loop:         {time.perf_counter() - start:8.3f} s')
+
+    start = time.perf_counter()
+    capability_groupby(df, 'value', by)
+    print(f'capability_groupby: {time.perf_counter() - start:8.3f} s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Peak memory of building hover data for the data and violation traces: the former np.stack / concatenate
+approach against `HoverData`, on a mixed-type frame.
+
+    python -m benchmarks.bench_customdata --rows 1000000
+"""
+import argparse
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from SPC.hover import HoverData
+
+
+def make_frame(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'value': rng.normal(10, 0.1, rows),
+        'temperature': rng.normal(21, 1, rows),
+        'batch': rng.integers(0, 1000, rows),
+        'operator': rng.choice(['NBELINSKI', 'DDEVITO', 'PSMITH'], rows),
+        'comment': rng.choice(['None', 'Humidity out of tolerance'], rows),
+    })
+
+
+def stacked(df, positions, violations):
+    # what draw_scatter / draw_violations used to do
+    customdata = np.stack([df[col] for col in df.columns], axis=-1)
+    cd = customdata[positions]
+    arr_v = np.empty((1, len(violations)), dtype=object)
+    arr_v[0, :] = violations
+    arr_v.resize(len(violations), 1)
+    return customdata, np.concatenate((cd, arr_v), axis=1)
+
+
+def columnar(df, positions, violations):
+    hover = HoverData(df, list(df.columns))
+    rules = [','.join(map(str, v)) for v in violations]
+    return hover.take(), hover.annotate(positions, 'Violated Rules', rules)
+
+
+def measure(func, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--violation-rate', type=float, default=0.01)
+    args = parser.parse_args()
+
+    df = make_frame(args.rows)
+    positions = np.flatnonzero(np.random.default_rng(1).random(args.rows) < args.violation_rate)
+    violations = [[1] for _ in positions]
+    print(f'{args.rows} rows, {len(positions)} violations')
+
+    for name, func in (('np.stack', stacked), ('HoverData', columnar)):
+        elapsed, peak = measure(func, df, positions, violations)
+        print(f'{name:>10}: {elapsed:7.3f} s, peak {peak / 2**20:8.1f} MiB')
+
+
+if __name__ == '__main__':
+    main()
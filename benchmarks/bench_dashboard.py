@@ -0,0 +1,57 @@
+"""Build time and JSON size of a page of SPC panels: one `SPCPlot` figure per series, against one `spc_dashboard`
+figure with a panel per series.
+
+    python -m benchmarks.bench_dashboard --panels 50 200 500 --points 400
+"""
+import argparse
+import time
+import warnings
+import numpy as np
+import pandas as pd
+from SPC import SPCPlot
+from SPC.dashboard import spc_dashboard
+
+
+def make_frame(panels, points, seed=0):
+    rng = np.random.default_rng(seed)
+    drift = rng.normal(0, 0.02, (points, panels)).cumsum(axis=0)
+    return pd.DataFrame(rng.normal(10, 1, (points, panels)) + drift, columns=[f'c{i}' for i in range(panels)])
+
+
+def separate(df):
+    size = 0
+    for column in df.columns:
+        chart = SPCPlot(df, column)
+        chart.draw_scatter()
+        chart.draw_spc_zones()
+        chart.draw_lines()
+        chart.draw_violations()
+        size += len(chart.fig.to_json())
+    return size
+
+
+def dashboard(df):
+    return len(spc_dashboard(df, cols=5).to_json())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--panels', type=int, nargs='+', default=[50, 200, 500])
+    parser.add_argument('--points', type=int, default=400)
+    parser.add_argument('--skip-separate', action='store_true')
+    args = parser.parse_args()
+
+    warnings.simplefilter('ignore')
+    for panels in args.panels:
+        df = make_frame(panels, args.points)
+        builds = [('separate', separate), ('dashboard', dashboard)]
+        for name, build in builds[args.skip_separate:]:
+            start = time.perf_counter()
+            size = build(df)
+            seconds = time.perf_counter() - start
+            print(f'{name:10s} {panels:4d} panels {seconds:8.2f} s  {seconds / panels * 1e3:7.1f} ms/panel  '
+                  f'{size / 2**10:9.1f} KiB  {size / panels / 2**10:6.1f} KiB/panel')
+
+
+if __name__ == '__main__':
+    main()
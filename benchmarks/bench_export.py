@@ -0,0 +1,64 @@
+"""Time and size of exporting drawn `SPCPlot` figures: `fig.write_html` one at a time (plotly.js embedded in every
+page) against `export_figures` (one shared plotly.js, orjson if installed).
+
+    python -m benchmarks.bench_export --figures 100 --points 5000 --processes 1 4
+"""
+import argparse
+import os
+import tempfile
+import time
+import warnings
+import numpy as np
+import pandas as pd
+from SPC import SPCPlot
+from SPC.export import export_figures, json_engine
+
+
+def make_figures(n, points, seed=0):
+    rng = np.random.default_rng(seed)
+    figures = {}
+    for i in range(n):
+        df = pd.DataFrame({'value': rng.normal(10, 1, points), 'operator': rng.choice(['A', 'B', 'C'], points)})
+        chart = SPCPlot(df, 'value')
+        chart.draw_scatter()
+        chart.draw_spc_zones()
+        chart.draw_lines()
+        chart.draw_violations()
+        figures[f'chart-{i}'] = chart.fig
+    return figures
+
+
+def directory_size(directory):
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--figures', type=int, default=100)
+    parser.add_argument('--points', type=int, default=5000)
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 4])
+    parser.add_argument('--formats', nargs='+', default=['html'])
+    args = parser.parse_args()
+
+    warnings.simplefilter('ignore')
+    figures = make_figures(args.figures, args.points)
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        for name, fig in figures.items():
+            fig.write_html(os.path.join(directory, name + '.html'))
+        seconds = time.perf_counter() - start
+        print(f'write_html loop       {seconds:8.3f} s  {args.figures / seconds:8.1f} fig/s  '
+              f'{directory_size(directory) / 2**20:8.1f} MiB')
+
+    for engine in dict.fromkeys((json_engine(), 'json')):
+        for processes in args.processes:
+            with tempfile.TemporaryDirectory() as directory:
+                report = export_figures(figures, directory, formats=args.formats, processes=processes, engine=engine)
+                m = report.metrics()
+                print(f'export {engine:6s} {processes:2d} proc {m["seconds"]:8.3f} s  {m["figures_per_second"]:8.1f} '
+                      f'fig/s  {directory_size(directory) / 2**20:8.1f} MiB')
+
+
+if __name__ == '__main__':
+    main()
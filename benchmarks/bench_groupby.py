@@ -0,0 +1,60 @@
+"""Time `spc_groupby` against building one `SPCPlot` per group in a loop.
+
+    python -m benchmarks.bench_groupby --groups 2000 --points 200 --processes 4
+"""
+import argparse
+import time
+import warnings
+import numpy as np
+import pandas as pd
+from SPC import SPCPlot
+from SPC.batch import spc_groupby
+
+
+def make_frame(groups, points, seed=0):
+    rng = np.random.default_rng(seed)
+    n = rng.integers(points // 2, points * 3 // 2, groups)
+    key = np.repeat(np.arange(groups), n)
+    return pd.DataFrame({
+        'machine': key % 10,
+        'part': key // 10,
+        'value': rng.normal(10, 0.1, n.sum()) + np.repeat(rng.normal(0, 0.05, groups), n),
+    })
+
+
+def naive(df, by, spec_limits):
+    out = {}
+    for key, group in df.groupby(by):
+        chart = SPCPlot(group, 'value', spec_limits=spec_limits)
+        out[key] = (chart.capability(), chart.violations)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--groups', type=int, default=2000)
+    parser.add_argument('--points', type=int, default=200)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--chunksize', type=int, default=256)
+    parser.add_argument('--skip-naive', action='store_true')
+    args = parser.parse_args()
+
+    warnings.simplefilter('ignore')
+    df = make_frame(args.groups, args.points)
+    by = ['machine', 'part']
+    spec_limits = {'LSL': 9.6, 'USL': 10.4}
+    print(f'{args.groups} groups, {len(df)} rows')
+
+    if not args.skip_naive:
+        start = time.perf_counter()
+        naive(df, by, spec_limits)
+        print(f'naive loop:        {time.perf_counter() - start:8.3f} s')
+
+    for processes in (1, args.processes):
+        start = time.perf_counter()
+        spc_groupby(df, 'value', by, spec_limits=spec_limits, processes=processes, chunksize=args.chunksize)
+        print(f'spc_groupby ({processes or "all"} proc): {time.perf_counter() - start:8.3f} s')
+
+
+if __name__ == '__main__':
+    main()
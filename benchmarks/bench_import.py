@@ -0,0 +1,55 @@
+"""Import time of the package, measured with `python -X importtime` in a fresh interpreter, and a guard against
+plotly or pandas being pulled in at import.
+
+    python -m benchmarks.bench_import --max-ms 150
+
+Exits with status 1 if a heavy module is imported or the cumulative import time exceeds --max-ms.
+"""
+import argparse
+import subprocess
+import sys
+
+HEAVY = ('plotly', 'pandas')
+
+
+def importtime(statement, runs):
+    """Best of `runs` cumulative import times (us) per top-level import, plus every module name imported."""
+    best, modules = {}, set()
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                                capture_output=True, text=True, check=True)
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, cumulative_us, name = line.split('|')
+            modules.add(name.strip())
+            if name.startswith('  '):
+                continue  # nested imports are already counted in their parent
+            name = name.strip()
+            best[name] = min(best.get(name, float('inf')), int(cumulative_us))
+    return best, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--statement', default='import SPC')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-ms', type=float, default=None)
+    args = parser.parse_args()
+
+    times, modules = importtime(args.statement, args.runs)
+    total = times.get(args.statement.split()[-1], 0) / 1000
+    print(f'{args.statement!r}: {total:.1f} ms (best of {args.runs})')
+    for name, us in sorted(times.items(), key=lambda item: -item[1])[:10]:
+        print(f'  {name:<30} {us / 1000:8.1f} ms')
+
+    heavy = [name for name in HEAVY if name in modules]
+    if heavy:
+        print(f'FAIL: imported {", ".join(heavy)}')
+    if args.max_ms is not None and total > args.max_ms:
+        print(f'FAIL: above {args.max_ms} ms')
+    sys.exit(1 if heavy or (args.max_ms is not None and total > args.max_ms) else 0)
+
+
+if __name__ == '__main__':
+    main()
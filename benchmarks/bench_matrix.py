@@ -0,0 +1,44 @@
+"""Time `spc_matrix` over a wide matrix against one `SPCStats` per column.
+
+    python -m benchmarks.bench_matrix --rows 200 --columns 300
+    python -m benchmarks.bench_matrix --rows 10000 --columns 300
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from SPC import SPCStats
+from SPC.matrix import spc_matrix
+
+
+def timed(label, f):
+    start = time.perf_counter()
+    result = f()
+    print(f'{label:<28}{time.perf_counter() - start:8.3f} s')
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200)
+    parser.add_argument('--columns', type=int, default=300)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    values = rng.normal(10, 1, (args.rows, args.columns))
+    values[args.rows // 2:, ::25] += 1.5  # a shift in every 25th characteristic
+    df = pd.DataFrame(values, columns=[f'char{i}' for i in range(args.columns)])
+    print(f'{args.rows} rows x {args.columns} columns')
+
+    counts = timed('SPCStats per column', lambda: {c: SPCStats(df, c).violation_counts() for c in df.columns})
+    wide = timed('spc_matrix', lambda: spc_matrix(df))
+    for c in df.columns:
+        assert counts[c] == {rule: int(wide.summary.loc[c, f'Rule{rule}']) for rule in counts[c]}
+    timed('spc_matrix, row-major array', lambda: spc_matrix(np.ascontiguousarray(values)))
+    flagged = wide.flagged(rule=2)
+    print(f'{len(wide.mask)} violating cells; {len(flagged)} columns with rule 2 violations')
+    timed('charts of the top 10', lambda: [chart.fig for _, chart in wide.charts(flagged[:10])])
+
+
+if __name__ == '__main__':
+    main()
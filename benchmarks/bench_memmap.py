@@ -0,0 +1,57 @@
+"""Time and peak traced memory of `SPCStats` over a memory-mapped `.npy` file, against the size of the violation mask.
+
+    python -m benchmarks.bench_memmap --points 1e8 --path /tmp/spc_bench.npy
+"""
+import argparse
+import os
+import time
+import tracemalloc
+import numpy as np
+from SPC.stats import SPCStats
+
+
+def make_file(path, n, seed=0, chunksize=1 << 22):
+    """Write `n` normal points to `path` without holding them all in memory."""
+    rng = np.random.default_rng(seed)
+    out = np.lib.format.open_memmap(path, mode='w+', dtype=np.float64, shape=(n,))
+    for start in range(0, n, chunksize):
+        stop = min(start + chunksize, n)
+        out[start:stop] = rng.normal(10, 1, stop - start)
+    out.flush()
+    del out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--points', type=float, default=1e7)
+    parser.add_argument('--path', default='spc_bench.npy')
+    parser.add_argument('--keep', action='store_true', help='keep the file afterwards, if this run wrote it')
+    args = parser.parse_args()
+
+    n = int(args.points)
+    # an existing file of the right shape is used as it is, and never removed
+    created = not os.path.exists(args.path) or np.load(args.path, mmap_mode='r').shape != (n,)
+    if created:
+        make_file(args.path, n)
+    values = np.load(args.path, mmap_mode='r')
+    print(f'{n} points, file {values.nbytes / 2**20:.1f} MiB, mask {n / 2**20:.1f} MiB')
+
+    stats = SPCStats(values)
+    tracemalloc.start()
+    for step in ('statistics', 'violation_mask', 'violation_counts'):
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        result = getattr(stats, step)
+        if callable(result):
+            result()
+        peak = tracemalloc.get_traced_memory()[1]
+        print(f'{step:17s} {time.perf_counter() - start:8.3f} s   peak {peak / 2**20:8.1f} MiB')
+    tracemalloc.stop()
+
+    if created and not args.keep:
+        del stats, values
+        os.remove(args.path)
+
+
+if __name__ == '__main__':
+    main()
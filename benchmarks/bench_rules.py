@@ -0,0 +1,42 @@
+"""Time rule sets evaluated together over shared intermediates against each rule evaluated on its own.
+
+    python -m benchmarks.bench_rules --size 10000000
+"""
+import argparse
+import time
+import numpy as np
+from SPC import rules, vectorized
+
+
+def timed(f, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        f()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=float, default=1e7)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--sets', nargs='+', default=list(rules.RULE_SETS))
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    values = rng.normal(0, 1, int(args.size))
+    values[len(values) // 2:] += 0.5
+    out = np.zeros(len(values), dtype=np.uint8)
+    print(f'{len(values)} points')
+    print(f'{"rule set":<20}{"rules":>6}{"separate s":>12}{"fused s":>10}{"speedup":>9}')
+    for name in args.sets:
+        ruleset = rules.compile(name)
+        alone = [rules.RuleSet([key], {key: ruleset.rules[key]}, ruleset.bits) for key in ruleset]
+        separate = timed(lambda: [vectorized.detect_into(values, 0.0, 1.0, r, out) for r in alone], args.repeat)
+        fused = timed(lambda: vectorized.detect_into(values, 0.0, 1.0, ruleset, out), args.repeat)
+        print(f'{name:<20}{len(ruleset):>6}{separate:>12.3f}{fused:>10.3f}{separate / fused:>8.2f}x')
+
+
+if __name__ == '__main__':
+    main()
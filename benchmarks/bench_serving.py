@@ -0,0 +1,70 @@
+"""Serve bursts of chart requests through the in-process HTTP stand-in and report latency and coalescing.
+
+    python -m benchmarks.bench_serving --points 20000 --clients 50 --distinct 5
+
+Each burst sends `clients` concurrent POST /figure requests spread over `distinct` different charts. The baseline
+builds the same charts one after another in the calling thread, as a handler without the service would.
+"""
+import argparse
+import asyncio
+import time
+import numpy as np
+import pandas as pd
+from SPC import SPCPlot
+from SPC.cache import render
+from SPC.serving import ChartService, call, serve_http
+
+
+async def burst(args, payloads):
+    async with ChartService(max_workers=args.workers) as service:
+        server = await serve_http(service)
+        ticks = 0
+
+        async def ticker():
+            # how often the event loop got to run while the charts were built
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.005)
+                ticks += 1
+
+        tick = asyncio.ensure_future(ticker())
+        start = time.perf_counter()
+        responses = await asyncio.gather(*[call(server, 'POST', '/figure', payloads[i % len(payloads)])
+                                           for i in range(args.clients)])
+        seconds = time.perf_counter() - start
+        tick.cancel()
+        server.close()
+        await server.wait_closed()
+        assert all(status == 200 for status, _ in responses)
+        return seconds, ticks, service.metrics()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--points', type=int, default=20_000)
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--distinct', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    payloads = [{'data': {'value': rng.normal(10, 1, args.points).tolist()}, 'y': 'value'}
+                for _ in range(args.distinct)]
+
+    start = time.perf_counter()
+    for i in range(args.clients):
+        render(SPCPlot(pd.DataFrame(payloads[i % len(payloads)]['data']), 'value'))
+    baseline = time.perf_counter() - start
+
+    seconds, ticks, metrics = asyncio.run(burst(args, payloads))
+    print(f'{args.clients} requests over {args.distinct} charts of {args.points} points')
+    print(f'{"sequential, blocking":<28}{baseline:8.3f} s')
+    print(f'{"service":<28}{seconds:8.3f} s   ({ticks} event loop ticks meanwhile)')
+    for name in ('requests', 'computed', 'coalesced', 'max_queued', 'latency.p50', 'latency.p95', 'latency.max',
+                 'queue_wait.p95', 'compute.p50'):
+        value = metrics[name]
+        print(f'  {name:<26}{value:.3f}' if isinstance(value, float) else f'  {name:<26}{value}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Build time and JSON size of a `make_subplots` page of SPC panels, shading and lines drawn with `add_hrect` /
+`add_hline` per panel against one batched assignment through `SPC.shapes`.
+
+    python -m benchmarks.bench_shapes --panels 200 --legacy-panels 20
+
+`add_hrect` / `add_hline` slow down quadratically with the number of shapes already on the figure, so the per-call
+version is only run on the first --legacy-panels panels (0 to skip it).
+"""
+import argparse
+import time
+import numpy as np
+import plotly.graph_objs as go
+from plotly.subplots import make_subplots
+from SPC import presets, shapes
+from SPC.stats import SPCStats
+
+LINES = {'Mean': 'mean', '-1S': 'line0', '+1S': 'line0', 'UCL': 'line1', 'LCL': 'line1'}
+
+
+def make_panels(n, points=200, seed=0):
+    rng = np.random.default_rng(seed)
+    return [SPCStats(rng.normal(10, 1, points)) for _ in range(n)]
+
+
+def _lines(stats):
+    return {label: getattr(stats, {'Mean': 'mean', '-1S': 'L1s', '+1S': 'U1s'}.get(label, label)) for label in LINES}
+
+
+def per_call(panels):
+    colors = presets['COLOR_SCHEME']['Classic']
+    shape_layout = presets['SHAPE_LAYOUT']['default']
+    fig = make_subplots(rows=len(panels), cols=1)
+    for row, stats in enumerate(panels, start=1):
+        fig.add_trace(go.Scatter(y=stats.y), row=row, col=1)
+        for zone, (y0, y1) in stats.zones.items():
+            fig.add_hrect(y0=y0, y1=y1, fillcolor=colors['zone' + zone[-1]], row=row, col=1, **shape_layout)
+        for label, y in _lines(stats).items():
+            fig.add_hline(y=y, annotation_text=f'{label} ({round(y, 2)})', line_color=colors[LINES[label]],
+                          line_dash='solid', row=row, col=1)
+    return fig
+
+
+def batched(panels):
+    colors = presets['COLOR_SCHEME']['Classic']
+    shape_layout = presets['SHAPE_LAYOUT']['default']
+    styles = {line: shapes.split_style({'line_color': colors[line], 'line_dash': 'solid'}) for line in colors}
+    fig = make_subplots(rows=len(panels), cols=1)
+    traces, all_shapes, annotations = [], [], []
+    for row, stats in enumerate(panels, start=1):
+        axis = '' if row == 1 else str(row)
+        traces.append(go.Scatter(y=stats.y, xaxis='x' + axis, yaxis='y' + axis))
+        all_shapes += shapes.zone_shapes(stats.zones, colors, shape_layout, 'x' + axis, 'y' + axis)
+        lines = [(y, f'{label} ({round(y, 2)})', styles[LINES[label]]) for label, y in _lines(stats).items()]
+        s, a = shapes.hline_shapes(lines, 'x' + axis, 'y' + axis)
+        all_shapes += s
+        annotations += a
+    fig.add_traces(traces)
+    shapes.add_to(fig, all_shapes, annotations)
+    return fig
+
+
+def run(name, build, panels):
+    start = time.perf_counter()
+    fig = build(panels)
+    seconds = time.perf_counter() - start
+    size = len(fig.to_json())
+    print(f'{name:10s} {len(panels):4d} panels {seconds:9.3f} s  {seconds / len(panels) * 1e3:8.2f} ms/panel  '
+          f'{size / 2**10:8.1f} KiB JSON')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--panels', type=int, default=200)
+    parser.add_argument('--legacy-panels', type=int, default=20)
+    args = parser.parse_args()
+
+    panels = make_panels(args.panels)
+    if args.legacy_panels:
+        run('per call', per_call, panels[:args.legacy_panels])
+        run('batched', batched, panels[:args.legacy_panels])
+    run('batched', batched, panels)
+
+
+if __name__ == '__main__':
+    main()
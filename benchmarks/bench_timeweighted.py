@@ -0,0 +1,63 @@
+"""Time the EWMA and tabular CUSUM kernels against the per-point Python recursion, and full EWMA/CUSUM charts.
+
+    python -m benchmarks.bench_timeweighted --size 10000000
+"""
+import argparse
+import time
+import numpy as np
+from SPC import SPCStats
+from SPC.timeweighted import cusum, ewma
+
+
+def ewma_loop(values, lam, start):
+    out = np.empty(len(values))
+    z = start
+    for i, x in enumerate(values):
+        z = lam * x + (1 - lam) * z
+        out[i] = z
+    return out
+
+
+def cusum_loop(values, target, K):
+    upper, lower = np.empty(len(values)), np.empty(len(values))
+    cp = cm = 0.0
+    for i, x in enumerate(values):
+        cp = max(0.0, cp + x - target - K)
+        cm = max(0.0, cm + target - K - x)
+        upper[i], lower[i] = cp, cm
+    return upper, lower
+
+
+def timed(label, f):
+    start = time.perf_counter()
+    result = f()
+    print(f'{label:<28}{time.perf_counter() - start:8.3f} s')
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', type=float, default=1e7)
+    parser.add_argument('--loop-size', type=float, default=1e6, help='points for the Python loops')
+    parser.add_argument('--lam', type=float, default=0.2)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    values = rng.normal(0, 1, int(args.size))
+    values[len(values) // 2:] += 0.5  # a half-sigma shift
+    small = values[:int(args.loop_size)]
+    print(f'{len(values)} points, loops over {len(small)}')
+
+    z = timed('ewma loop', lambda: ewma_loop(small, args.lam, 0.0))
+    assert np.allclose(z, ewma(small, args.lam, 0.0))
+    upper, lower = timed('cusum loop', lambda: cusum_loop(small, 0.0, 0.5))
+    assert np.allclose(upper, cusum(small, 0.0, 0.5)[0]) and np.allclose(lower, cusum(small, 0.0, 0.5)[1])
+
+    timed('ewma', lambda: ewma(values, args.lam, 0.0))
+    timed('cusum', lambda: cusum(values, 0.0, 0.5))
+    for chart_type in ('ewma', 'cusum'):
+        timed(f'SPCStats {chart_type} + rule 1', lambda: SPCStats(values, chart_type=chart_type).violation_counts())
+
+
+if __name__ == '__main__':
+    main()
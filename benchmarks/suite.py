@@ -0,0 +1,180 @@
+"""Benchmark suite: time and peak memory of each rule, the EWMA and CUSUM recursions, chart construction, each draw_*
+method and serialization, over synthetic in-control, shifted, trending and bimodal series.
+
+    python -m benchmarks.suite --sizes 1e2 1e4 1e6 --output results.json
+    python -m benchmarks.suite --sizes 1e2 1e4 1e6 --compare results.json --tolerance 0.25
+    python -m benchmarks.suite --sizes 1e7 --filter 'ewma|cusum'
+
+The EWMA and CUSUM recursions (cases `ewma` and `cusum`) should each take well under a second on 10 million points;
+`ewma_chart` and `cusum_chart` add the charts' limits and rule 1.
+
+Results are written as JSON (one record per case, dataset and size). With --compare, cases slower (or using more
+memory) than the stored baseline by more than the tolerance are listed and the exit status is 1.
+"""
+import argparse
+import json
+import platform
+import re
+import sys
+import time
+import tracemalloc
+import warnings
+import numpy as np
+import pandas as pd
+import plotly
+import SPC
+from SPC import SPCPlot, SPCStats, timeweighted
+from SPC.anomaly_detector import AnomalyDetector
+
+
+def in_control(n, rng):
+    return rng.normal(10, 1, n)
+
+
+def shifted(n, rng):
+    # 1.5 sigma shift in the mean half way through
+    return rng.normal(10, 1, n) + np.where(np.arange(n) < n // 2, 0, 1.5)
+
+
+def trending(n, rng):
+    return rng.normal(10, 1, n) + np.linspace(0, 3, n)
+
+
+def bimodal(n, rng):
+    return rng.normal(10, 1, n) + np.where(rng.random(n) < 0.5, -2, 2)
+
+
+DATASETS = {'in_control': in_control, 'shifted': shifted, 'trending': trending, 'bimodal': bimodal}
+
+
+def make_frame(dataset, n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'value': DATASETS[dataset](n, rng),
+        'batch': np.arange(n) // 100,
+        'operator': rng.choice(['NBELINSKI', 'DDEVITO', 'PSMITH'], n),
+    })
+
+
+def drawn(df, *steps):
+    """A chart with the given draw_* methods already called, in order."""
+    chart = SPCPlot(df, 'value')
+    chart.violations
+    for step in steps:
+        getattr(chart, step)()
+    return chart
+
+
+# name: (setup(df) -> state, timed(state)). Only `timed` is measured.
+CASES = {
+    **{f'rule{i}': (lambda df: df['value'],
+                    lambda y, i=i: AnomalyDetector(y, mean=y.mean(), sigma=y.std()).apply_rules([i]))
+       for i in range(1, 9)},
+    'ewma': (lambda df: df['value'].to_numpy(), lambda v: timeweighted.ewma(v, 0.2, 10.0)),
+    'cusum': (lambda df: df['value'].to_numpy(), lambda v: timeweighted.cusum(v, 10.0, 0.5)),
+    **{f'{chart_type}_chart': (lambda df: df['value'].to_numpy(),
+                               lambda v, chart_type=chart_type: SPCStats(v, chart_type=chart_type).violation_counts())
+       for chart_type in ('ewma', 'cusum')},
+    'construct': (lambda df: df, lambda df: SPCPlot(df, 'value').violations),
+    'draw_scatter': (lambda df: drawn(df), lambda chart: chart.draw_scatter()),
+    'draw_spc_zones': (lambda df: drawn(df, 'draw_scatter'), lambda chart: chart.draw_spc_zones()),
+    'draw_lines': (lambda df: drawn(df, 'draw_scatter'), lambda chart: chart.draw_lines()),
+    'draw_violations': (lambda df: drawn(df, 'draw_scatter'), lambda chart: chart.draw_violations()),
+    'to_html': (lambda df: drawn(df, 'draw_scatter', 'draw_spc_zones', 'draw_lines', 'draw_violations'),
+                lambda chart: chart.fig.to_html(include_plotlyjs=False)),
+}
+RENDER_CASES = ('draw_scatter', 'draw_spc_zones', 'draw_lines', 'draw_violations', 'to_html')
+
+
+def measure(setup, timed, df, repeat, memory):
+    """Best wall time over `repeat` runs, each on a fresh setup, and the peak traced allocation of one more run."""
+    best = float('inf')
+    for _ in range(repeat):
+        state = setup(df)
+        start = time.perf_counter()
+        timed(state)
+        best = min(best, time.perf_counter() - start)
+    peak = None
+    if memory:
+        state = setup(df)
+        tracemalloc.start()
+        timed(state)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return best, peak
+
+
+def run(args):
+    pattern = re.compile(args.filter)
+    results = []
+    for dataset in args.datasets:
+        for size in args.sizes:
+            df = make_frame(dataset, size)
+            for case, (setup, timed) in CASES.items():
+                if not pattern.search(case) or (case in RENDER_CASES and size > args.max_render_size):
+                    continue
+                repeat = args.repeat if size <= 100_000 else 1
+                seconds, peak = measure(setup, timed, df, repeat, not args.no_memory)
+                results.append(dict(case=case, dataset=dataset, size=size, seconds=seconds, peak_bytes=peak))
+                peak_text = '' if peak is None else f'  peak {peak / 2**20:9.2f} MiB'
+                print(f'{case:>16} {dataset:>10} {size:>9}: {seconds:9.4f} s{peak_text}', file=sys.stderr)
+    return results
+
+
+def compare(results, baseline, tolerance, min_seconds):
+    """Records of `results` slower, or with a higher peak, than the matching baseline record by more than
+    `tolerance` (a fraction). Timings under `min_seconds` in both runs are too noisy to judge and are skipped.
+    """
+    key = lambda r: (r['case'], r['dataset'], r['size'])
+    old = {key(r): r for r in baseline['results']}
+    regressions = []
+    for r in results:
+        b = old.get(key(r))
+        if b is None:
+            continue
+        if max(r['seconds'], b['seconds']) >= min_seconds and r['seconds'] > b['seconds'] * (1 + tolerance):
+            regressions.append(dict(**r, metric='seconds', baseline=b['seconds']))
+        if r['peak_bytes'] and b['peak_bytes'] and r['peak_bytes'] > b['peak_bytes'] * (1 + tolerance):
+            regressions.append(dict(**r, metric='peak_bytes', baseline=b['peak_bytes']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=float, nargs='+', default=[1e2, 1e3, 1e4, 1e5])
+    parser.add_argument('--datasets', nargs='+', choices=list(DATASETS), default=list(DATASETS))
+    parser.add_argument('--filter', default='', help='regular expression selecting case names')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per case for sizes up to 1e5; larger run once')
+    parser.add_argument('--max-render-size', type=float, default=1e6,
+                        help='skip draw_* and to_html above this many points')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc run')
+    parser.add_argument('--output', help='write the results as JSON to this file (default: stdout)')
+    parser.add_argument('--compare', help='baseline JSON from an earlier --output')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    parser.add_argument('--min-seconds', type=float, default=0.005)
+    args = parser.parse_args()
+    args.sizes = [int(s) for s in args.sizes]
+
+    warnings.simplefilter('ignore')
+    report = dict(
+        meta=dict(python=platform.python_version(), platform=platform.platform(), numpy=np.__version__,
+                  pandas=pd.__version__, plotly=plotly.__version__, spc=getattr(SPC, '__version__', None)),
+        results=run(args),
+    )
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=1)
+    else:
+        json.dump(report, sys.stdout, indent=1)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report['results'], json.load(f), args.tolerance, args.min_seconds)
+        for r in regressions:
+            print(f'REGRESSION {r["case"]} {r["dataset"]} {r["size"]} {r["metric"]}: '
+                  f'{r[r["metric"]]:.4g} vs {r["baseline"]:.4g}', file=sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -8,5 +8,5 @@ setup(
     author_email="tbasic@ucsd.edu",
     url="https://github.com/DryBasic/SPC-Plot",
     packages=['SPC'],
-    install_requires=['pandas', 'plotly'],
+    install_requires=['numpy', 'pandas', 'plotly'],
 )
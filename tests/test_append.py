@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+from SPC import SPCPlot
+
+
+def _state(fig):
+    """What the browser holds of a figure: each trace's points and hover data, and the x range."""
+    data = [{key: np.asarray(trace[key]) for key in ('x', 'y', 'customdata') if trace[key] is not None}
+            for trace in fig.data]
+    return dict(data=data, layout={'xaxis': {'range': list(fig.layout.xaxis.range)}})
+
+
+def _apply(state, calls):
+    """Apply Plotly.js calls from `SPCPlot.append(delta=True)` to a browser state, as Plotly.js would."""
+    for call in calls:
+        if call['method'] == 'relayout':
+            for key, value in call['args'][0].items():
+                outer, inner = key.split('.')
+                state['layout'][outer][inner] = list(value)
+            continue
+        update, (index,) = call['args']
+        trace = state['data'][index]
+        for key, (values,) in update.items():
+            if call['method'] == 'extendTraces' and key in trace:
+                values = np.concatenate((trace[key], values))
+            trace[key] = np.asarray(values)
+
+
+def _draw(chart):
+    chart.draw_scatter()
+    chart.draw_violations()
+    return chart
+
+
+def _traces(state):
+    return [{key: values.tolist() for key, values in trace.items()} for trace in state['data']]
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_append_delta_matches_a_fresh_chart(seed):
+    rng = np.random.default_rng(seed)
+    n = 120
+    values = np.concatenate((rng.normal(size=n), np.cumsum(rng.normal(0.3, 1, 200)) / 4))
+    df = pd.DataFrame({'v': values, 'batch': rng.integers(0, 5, len(values))})
+
+    chart = _draw(SPCPlot(df.iloc[:n], 'v'))
+    browser = _state(chart.fig)
+    stop = n
+    while stop < len(df):
+        step = int(rng.integers(1, 30))
+        _apply(browser, chart.append(df.iloc[stop:stop + step], delta=True))
+        stop += step
+
+    # limits stay those of the first n points
+    fresh = _draw(SPCPlot(df, 'v', limits='baseline', limits_window=(0, n)))
+    assert chart.mean == pytest.approx(fresh.mean) and chart.std == pytest.approx(fresh.std)
+    assert chart.violations.equals(fresh.violations)
+    assert np.array_equal(chart.violation_mask, fresh.violation_mask)
+
+    expected = _state(fresh.fig)
+    assert _traces(_state(chart.fig)) == _traces(expected)
+    assert _traces(browser) == _traces(expected)
+    assert browser['layout'] == _state(chart.fig)['layout'] == expected['layout']
+
+
+def test_append_rejects_per_point_limits():
+    chart = SPCPlot(pd.DataFrame({'v': np.arange(10.0)}), 'v', limits='expanding')
+    with pytest.raises(ValueError):
+        chart.append(pd.DataFrame({'v': [1.0]}))
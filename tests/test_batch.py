@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+from SPC.anomaly_detector import AnomalyDetector
+from SPC.batch import spc_groupby
+from SPC.rules import Beyond
+
+
+def _long(seed=0, groups=12):
+    rng = np.random.default_rng(seed)
+    sizes = rng.integers(1, 150, groups)
+    df = pd.DataFrame({
+        'line': np.repeat([f'L{i % 3}' for i in range(groups)], sizes),
+        'part': np.repeat(np.arange(groups), sizes),
+        'value': np.concatenate([np.cumsum(rng.normal(size=n)) if i % 2 else rng.normal(size=n)
+                                 for i, n in enumerate(sizes)]),
+    })
+    # groups interleaved, each still in time order
+    return df.iloc[np.argsort(df.groupby('part').cumcount().to_numpy(), kind='stable')]
+
+
+def test_processes_match_serial():
+    df = _long()
+    rules = [1, 2, 3, 4, 5, 6, 7, Beyond(3, 3, 1.5, name='3_1.5s')]
+    serial = spc_groupby(df, 'value', ['line', 'part'], violations=rules, processes=1,
+                         spec_limits={'LSL': -3, 'USL': 3})
+    parallel = spc_groupby(df, 'value', ['line', 'part'], violations=rules, processes=2, chunksize=3,
+                           spec_limits={'LSL': -3, 'USL': 3})
+    pd.testing.assert_frame_equal(serial.summary, parallel.summary)
+    assert serial.violations.keys() == parallel.violations.keys()
+    for key in serial.violations:
+        assert serial.violations[key].equals(parallel.violations[key])
+
+
+def test_groups_match_detector():
+    df = _long(1)
+    result = spc_groupby(df, 'value', 'part', processes=1)
+    for key, group in df.groupby('part'):
+        detector = AnomalyDetector(group['value'])
+        detector.apply_rules([1, 2, 3, 4, 5, 6, 7, 8])
+        assert result.summary.loc[key, 'n'] == len(group)
+        assert result.violations[key].equals(detector.violations().index)
+        assert result.summary.loc[key, 'violations'] == np.count_nonzero(detector.mask)
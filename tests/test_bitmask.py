@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+from SPC import bitmask, rules
+from SPC.anomaly_detector import AnomalyDetector
+
+
+def test_encode_decode_round_trip():
+    rng = np.random.default_rng(0)
+    results = {rule: rng.random(500) < 0.2 for rule in bitmask.RULES}
+    mask = bitmask.encode({rule: np.where(fired, rule, 0) for rule, fired in results.items()}, 500)
+
+    lists = bitmask.decode(mask)
+    assert [list(r) for r in lists] == [[rule for rule in bitmask.RULES if results[rule][i]] for i in range(500)]
+    assert list(bitmask.labels(mask)) == [','.join(map(str, r)) for r in lists]
+    assert bitmask.counts(mask, chunksize=64) == {rule: int(fired.sum()) for rule, fired in results.items()}
+    for rule, fired in results.items():
+        assert np.array_equal(bitmask.positions(mask, rule), np.flatnonzero(fired))
+    assert np.array_equal(bitmask.positions(mask), np.flatnonzero(np.any(list(results.values()), axis=0)))
+    # in the order asked for
+    assert list(bitmask.decode(np.array([0b101], dtype=np.uint8), order=(3, 1))[0]) == [3, 1]
+
+
+def test_named_rules_take_free_bits():
+    ruleset = rules.compile([1, 2, 'N8', 'R_4s'])
+    assert ruleset.bits[1] == 0 and ruleset.bits[2] == 1
+    assert sorted(ruleset.bits[key] for key in ('N8', 'R_4s')) == [6, 7]
+    mask = bitmask.encode({'N8': [1, 0, 1], 2: [0, 2, 2]}, 3, ruleset.bits)
+    assert [list(r) for r in bitmask.decode(mask, ruleset.keys, ruleset.bits)] == [['N8'], [2], [2, 'N8']]
+    assert bitmask.counts(mask, ruleset.keys, bits=ruleset.bits) == {1: 0, 2: 2, 'N8': 2, 'R_4s': 0}
+
+
+def test_violations_match_the_loop_engine_columns():
+    rng = np.random.default_rng(1)
+    series = pd.Series(np.cumsum(rng.normal(size=400)), index=pd.RangeIndex(100, 500))
+    loop = AnomalyDetector(series, engine='loop')
+    loop.apply_rules([1, 2, 3, 4, 5, 6, 7, 8])
+    # the lists the rule columns used to give, one per point with any rule fired
+    columns = loop.data[[f'Rule{i}' for i in range(1, 9) if f'Rule{i}' in loop.data]]
+    expected = {label: [rule for rule in row if rule] for label, row in zip(columns.index, columns.to_numpy())}
+    expected = {label: rules for label, rules in expected.items() if rules}
+
+    vectorized = AnomalyDetector(series)
+    vectorized.apply_rules([1, 2, 3, 4, 5, 6, 7, 8])
+    assert vectorized.violations().to_dict() == expected
+    assert vectorized.counts() == {i: len(vectorized.positions(i)) for i in range(1, 9)}
@@ -0,0 +1,17 @@
+import numpy as np
+import pandas as pd
+from SPC.cache import ChartCache
+
+
+def test_cached_mask_unaffected_by_later_rule_passes():
+    cache = ChartCache()
+    df = pd.DataFrame({'v': np.random.default_rng(0).normal(size=200)})
+    first = cache.chart(df, 'v', violations=[1])
+    stored = first.detector.mask.copy()
+    first.detector.apply_rules([2, 3, 5, 6])
+
+    second = cache.chart(df, 'v', violations=[1])
+    assert cache.hits == 1
+    assert np.array_equal(second.detector.mask, stored)
+    second.detector.mask |= 0xFF
+    assert np.array_equal(cache.chart(df, 'v', violations=[1]).detector.mask, stored)
@@ -0,0 +1,64 @@
+import math
+import numpy as np
+import pandas as pd
+import pytest
+from SPC.capability import capability_groupby
+
+LIMITS = {'zero': (0.0, 10.0), 'upper': (np.nan, 9.0), 'lower': (1.0, np.nan), 'none': (np.nan, np.nan)}
+
+
+def _frame(seed=0, n=200):
+    rng = np.random.default_rng(seed)
+    parts = []
+    for key, (lsl, usl) in LIMITS.items():
+        part = pd.DataFrame({'key': key, 'value': rng.normal(5, 1.5, n), 'LSL': lsl, 'USL': usl})
+        part.loc[rng.random(n) < 0.05, 'value'] = np.nan
+        parts.append(part)
+    df = pd.concat(parts, ignore_index=True)
+    df = df.iloc[np.argsort(np.tile(np.arange(n), len(LIMITS)), kind='stable')]  # groups interleaved
+    df.loc[df.index[0], 'LSL'] = np.nan  # a group's limit is its first non-missing one
+    return df
+
+
+def test_capability_matches_per_group_formulas():
+    df = _frame()
+    result = capability_groupby(df, 'value', 'key')
+    for key, (lsl, usl) in LIMITS.items():
+        group = df.loc[df['key'] == key, 'value']
+        mean, overall = group.mean(), group.std()
+        within = group.diff().abs().mean() / 1.128
+        row = result.loc[key]
+        assert row['n'] == group.count()
+        assert row['mean'] == pytest.approx(mean)
+        assert row['sigma_overall'] == pytest.approx(overall)
+        assert row['sigma_within'] == pytest.approx(within)
+        assert row['LSL'] == pytest.approx(lsl, nan_ok=True)
+        assert row['USL'] == pytest.approx(usl, nan_ok=True)
+
+        upper, lower = (usl - mean) / (3 * within), (mean - lsl) / (3 * within)
+        assert row['Cp'] == pytest.approx((usl - lsl) / (6 * within), nan_ok=True)
+        assert row['Cpk'] == pytest.approx(np.nanmin([upper, lower]) if not np.isnan([upper, lower]).all()
+                                           else np.nan, nan_ok=True)
+        assert row['Pp'] == pytest.approx((usl - lsl) / (6 * overall), nan_ok=True)
+
+        outside = ((group < lsl) | (group > usl)).sum() / group.count() * 1e6
+        assert row['ppm_observed'] == pytest.approx(outside)
+        tails = [0.5 * math.erfc((mean - lsl) / overall / math.sqrt(2)) if not np.isnan(lsl) else 0.0,
+                 0.5 * math.erfc((usl - mean) / overall / math.sqrt(2)) if not np.isnan(usl) else 0.0]
+        expected = np.nan if np.isnan([lsl, usl]).all() else sum(tails) * 1e6
+        assert row['ppm_expected'] == pytest.approx(expected, nan_ok=True)
+
+    # one-sided: Cp needs both limits, Cpk falls back to the side given
+    assert np.isnan(result.loc['upper', 'Cp']) and np.isnan(result.loc['lower', 'Pp'])
+    assert not np.isnan(result.loc['upper', 'Cpk']) and not np.isnan(result.loc['lower', 'Ppk'])
+    # a limit of 0 is a limit
+    assert not np.isnan(result.loc['zero', 'Cp'])
+
+
+def test_shared_limits_and_overall_sigma():
+    df = _frame(1)
+    result = capability_groupby(df, 'value', 'key', LSL=0, USL=None, within='overall')
+    assert (result['LSL'] == 0).all() and result['USL'].isna().all()
+    assert np.array_equal(result['sigma_within'], result['sigma_overall'])
+    assert result['Cp'].isna().all()
+    np.testing.assert_allclose(result['Cpk'], result['mean'] / (3 * result['sigma_overall']))
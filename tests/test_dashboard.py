@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+from SPC.anomaly_detector import AnomalyDetector
+from SPC.dashboard import spc_dashboard
+
+
+def _wide(seed=0, n=300):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({'a': rng.normal(size=n), 'b': np.cumsum(rng.normal(size=n)), 'c': np.round(rng.normal(size=n))},
+                      index=pd.RangeIndex(1000, 1000 + n))
+    df.loc[df.index[rng.random(n) < 0.05], 'a'] = np.nan
+    return df
+
+
+def _check(dashboard, key, series):
+    detector = AnomalyDetector(series)
+    detector.apply_rules([1, 2, 3, 4, 5, 6, 7, 8])
+    assert dashboard.summary.loc[key, 'mean'] == pytest.approx(detector.mean, rel=1e-12)
+    assert dashboard.summary.loc[key, 'std'] == pytest.approx(detector.sigma, rel=1e-9)
+    assert dashboard.violations(key).equals(detector.violations())
+    assert dashboard.summary.loc[key, 'violations'] == np.count_nonzero(detector.mask)
+    for rule in range(1, 9):
+        assert dashboard.summary.loc[key, f'Rule{rule}'] == len(detector.positions(rule))
+
+
+def test_wide_dashboard_matches_detector():
+    df = _wide()
+    dashboard = spc_dashboard(df)
+    for column in df:
+        _check(dashboard, column, df[column])
+
+
+def test_long_dashboard_matches_detector():
+    wide = _wide(1)
+    long = wide.melt(var_name='series', value_name='value', ignore_index=False).sample(frac=1, random_state=0)
+    long = long.sort_index(kind='stable')  # interleave the series, each still in time order
+    dashboard = spc_dashboard(long, y='value', by='series')
+    assert list(dashboard.keys) == ['a', 'b', 'c']
+    for key, group in long.groupby('series', sort=False):
+        _check(dashboard, key, group['value'])
+
+
+def test_dashboard_figure_has_a_panel_per_series():
+    dashboard = spc_dashboard(_wide(2), cols=2)
+    figure = dashboard.figure
+    lines = [t for t in figure['data'] if t.get('mode') != 'markers']
+    markers = [t for t in figure['data'] if t.get('mode') == 'markers']
+    assert [t['name'] for t in lines] == ['a', 'b', 'c']
+    assert sum(len(t['x']) for t in markers) == dashboard.summary['violations'].sum()
+    # five zones and five lines per panel
+    assert len(figure['layout']['shapes']) == 3 * 10
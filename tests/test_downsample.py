@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+from SPC import SPCPlot, downsample
+
+
+@pytest.mark.parametrize('algorithm', sorted(downsample.ALGORITHMS))
+def test_selection(algorithm):
+    rng = np.random.default_rng(0)
+    y = rng.normal(size=20_000)
+    y[rng.random(len(y)) < 0.01] = np.nan
+    y[[0, -1]] = 1.0
+    keep = downsample.ALGORITHMS[algorithm](np.arange(len(y)), y, 500)
+    assert 250 <= len(keep) <= 502
+    assert keep[0] == 0 and keep[-1] == len(y) - 1
+    assert (np.diff(keep) > 0).all()
+    assert not np.isnan(y[keep]).any()
+    # short series are kept whole, NaNs aside
+    assert np.array_equal(downsample.ALGORITHMS[algorithm](np.arange(5), y[:5], 500),
+                          np.flatnonzero(~np.isnan(y[:5])))
+
+
+@pytest.mark.parametrize('algorithm', sorted(downsample.ALGORITHMS))
+def test_large_chart_keeps_every_violation(algorithm):
+    rng = np.random.default_rng(1)
+    y = np.concatenate((rng.normal(size=15_000), rng.normal(0.5, 1, 5_000)))
+    chart = SPCPlot(pd.DataFrame({'v': y}), 'v')
+    chart.draw_scatter(large_data={'threshold': 1_000, 'algorithm': algorithm, 'n_out': 300})
+    chart.draw_violations()
+    scatter, violations = chart.fig.data
+    assert scatter.type == 'scattergl'
+    assert len(scatter.x) < 300 + len(violations.x) + 1
+
+    positions = np.flatnonzero(chart.violation_mask)
+    assert len(positions) > 100
+    assert np.isin(positions, scatter.x).all()
+    assert np.array_equal(violations.x, positions)
+    assert np.array_equal(scatter.y, y[scatter.x])
+    # hover data follows the points kept
+    assert np.array_equal(np.asarray(scatter.customdata)[:, 0].astype(float), y[scatter.x])
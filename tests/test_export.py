@@ -0,0 +1,14 @@
+import os
+from SPC.export import export_figures
+
+
+def test_names_that_sanitize_alike_do_not_overwrite(tmp_path):
+    figures = {'a/b': {'data': [], 'layout': {'title': 'first'}},
+               'a_b': {'data': [], 'layout': {'title': 'second'}},
+               'A_B': {'data': [], 'layout': {'title': 'third'}}}
+    report = export_figures(figures, str(tmp_path), formats=('json',), processes=1)
+
+    assert [os.path.basename(r['path']) for r in report.records] == ['a_b.json', 'a_b-2.json', 'A_B-3.json']
+    for record, title in zip(report.records, ('first', 'second', 'third')):
+        with open(record['path']) as f:
+            assert title in f.read()
@@ -0,0 +1,81 @@
+import re
+import numpy as np
+import pandas as pd
+import pytest
+from SPC import SPCPlot
+from SPC.hover import HoverData
+
+
+def _render(template, point):
+    """The hover text of one point, as Plotly.js fills `template` from the point's attributes."""
+    def value(match):
+        name, i = match.group(1), match.group(2)
+        v = point[name] if i is None else point[name][int(i)]
+        if isinstance(v, (float, np.floating)) and float(v).is_integer():
+            v = int(v)
+        return str(v)
+    return re.sub(r'%\{(\w+)(?:\[(\d+)\])?\}', value, template)
+
+
+def _points(trace, n):
+    get = {attr: trace[attr] if attr in trace else None for attr in ('x', 'customdata', 'text', 'hovertext')}
+    for i in range(n):
+        yield {'x': get['x'][i],
+               'customdata': None if get['customdata'] is None else list(get['customdata'][i]),
+               **{attr: get[attr][i] for attr in ('text', 'hovertext') if get[attr] is not None}}
+
+
+def _old_hover(df, columns):
+    """Hover data as draw_scatter built it before HoverData: every column stacked into one customdata array."""
+    customdata = np.stack([df[col] for col in columns], axis=-1)
+    template = '<br>'.join(['Index: %{x}'] + [f'{col}: %{{customdata[{i}]}}' for i, col in enumerate(columns)])
+    return customdata, template
+
+
+def _frame(n=50):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'value': rng.normal(size=n),
+        'count': rng.integers(0, 100, n),
+        'operator': rng.choice(['ann', 'bo', 'cy'], n),
+        'ok': rng.random(n) < 0.5,
+        'line': rng.choice(['L1', 'L2'], n),
+        'shift': rng.integers(1, 4, n).astype(float),
+    }, index=pd.RangeIndex(10, 10 + n))
+
+
+@pytest.mark.parametrize('columns', [
+    ['value', 'count', 'shift'],                 # all numeric: one float64 block
+    ['value', 'operator', 'count', 'ok'],        # two others through text and hovertext
+    ['value', 'operator', 'ok', 'line', 'count'],  # three others: one object block
+])
+def test_hover_text_matches_the_stacked_customdata(columns):
+    df = _frame()
+    hover = HoverData(df, columns)
+    new = dict(x=df.index.to_numpy(), **hover.take())
+    customdata, template = _old_hover(df, columns)
+    old = dict(x=df.index.to_numpy(), customdata=customdata)
+    assert ([_render(hover.hovertemplate, p) for p in _points(new, len(df))]
+            == [_render(template, p) for p in _points(old, len(df))])
+    if all(pd.api.types.is_numeric_dtype(df[col]) for col in columns):
+        assert hover.customdata.dtype == np.float64
+
+
+def test_chart_traces_share_the_hover_data():
+    df = _frame(400)
+    df.loc[df.index[[5, 300]], 'value'] = 9.0
+    chart = SPCPlot(df, 'value')
+    chart.draw_scatter()
+    chart.draw_violations()
+    scatter, violations = chart.fig.data
+    columns = list(df.columns)[:6]
+    customdata, template = _old_hover(df, columns)
+
+    old = dict(x=np.asarray(chart.x), customdata=customdata)
+    expected = [_render(template, p) for p in _points(old, len(df))]
+    assert [_render(scatter.hovertemplate, p) for p in _points(scatter, len(df))] == expected
+
+    positions = np.flatnonzero(chart.violation_mask)
+    rules = [','.join(map(str, r)) for r in chart.violations]
+    got = [_render(violations.hovertemplate, p) for p in _points(violations, len(positions))]
+    assert got == [f'Violated Rules: {r}<br>' + expected[i] for r, i in zip(rules, positions)]
@@ -0,0 +1,14 @@
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+
+
+@pytest.mark.parametrize('statement', ['import SPC', 'from SPC import SPCPlot, SPCStats, AnomalyDetector, SPCMonitor',
+                                       'import SPC.rules, SPC.vectorized, SPC.limits, SPC.bitmask'])
+def test_import_loads_neither_plotly_nor_pandas(statement):
+    check = (f'{statement}; import sys; '
+             'print(",".join(sorted({m.split(".")[0] for m in sys.modules} & {"plotly", "pandas"})))')
+    result = subprocess.run([sys.executable, '-c', check], capture_output=True, text=True, check=True,
+                            cwd=Path(__file__).resolve().parents[1])
+    assert result.stdout.strip() == ''
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+from SPC import SPCPlot
+from SPC.profiling import Profiler
+
+
+def _frame(seed=0):
+    return pd.DataFrame({'v': np.random.default_rng(seed).normal(10, 1, 200)})
+
+
+def test_nothing_is_computed_until_asked_for():
+    profiler = Profiler()
+    chart = SPCPlot(_frame(), 'v', profiler=profiler)
+    assert profiler.records == []
+    assert not {'statistics', 'detector', 'violations', 'fig'} & set(chart.__dict__)
+
+    chart.UCL
+    assert [r['stage'] for r in profiler.records] == ['statistics']
+    assert 'detector' not in chart.__dict__ and 'fig' not in chart.__dict__
+
+    chart.violation_counts()
+    assert 'detector' in chart.__dict__ and 'fig' not in chart.__dict__
+    chart.violations
+    calls = len(profiler.records)
+    chart.violations, chart.violation_mask, chart.violation_counts(), chart.UCL
+    assert [r['stage'] for r in profiler.records[calls:]] == []  # cached
+
+
+def test_changing_an_input_starts_over():
+    chart = SPCPlot(_frame(), 'v')
+    chart.draw_scatter()
+    ucl, fig = chart.UCL, chart.fig
+    chart.df = _frame(1) + 5
+    assert 'statistics' not in chart.__dict__ and 'fig' not in chart.__dict__
+    assert chart.UCL > ucl + 3
+    assert chart.fig is not fig and len(chart.fig.data) == 0
+
+    chart.rules = [1]
+    assert chart.violation_counts() == {1: len(chart.detector.positions(1))}
+    assert chart.detector.rules == [1]
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+from numpy.lib.stride_tricks import sliding_window_view
+from SPC.anomaly_detector import AnomalyDetector
+from SPC.limits import control_limits
+from SPC.stats import SPCStats
+
+
+@pytest.mark.parametrize('window', [2, 30, 1500])
+def test_trailing_limits_on_drifting_data(window):
+    rng = np.random.default_rng(0)
+    n = 200_000
+    values = 1e6 + 0.5 * np.arange(n) + np.cumsum(rng.normal(size=n))
+    values[rng.random(n) < 0.001] = np.nan
+    mean, sigma = control_limits(values, 'trailing', window)
+
+    positions = rng.integers(window - 1, n, 500)
+    windows = sliding_window_view(values, window)[positions - window + 1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        expected_mean = np.nanmean(windows, axis=1)
+        expected_sigma = np.nanstd(windows, axis=1, ddof=1)
+    np.testing.assert_allclose(mean[positions], expected_mean, rtol=1e-12)
+    np.testing.assert_allclose(sigma[positions], expected_sigma, rtol=1e-7)
+
+    head = values[:window - 1]
+    for i in range(min(window - 1, 5)):
+        assert mean[i] == pytest.approx(np.nanmean(head[:i + 1]))
+
+
+@pytest.mark.parametrize('limits, window', [('expanding', None), ('trailing', 5)])
+def test_points_without_limits_are_not_judged(limits, window):
+    rng = np.random.default_rng(1)
+    values = rng.normal(size=60)
+    values[30:33] = np.nan  # leaves the trailing windows ending at 32-34 with under 2 points
+    stats = SPCStats(pd.DataFrame({'v': values}), y='v', limits=limits, limits_window=window)
+    unknown = np.isnan(stats.std)
+    assert unknown[0]
+    assert not stats.detector.mask[unknown].any()
+    assert 0 not in stats.violations.index
+
+    # judged from the first point with limits, as if the series started there
+    first = int(np.argmin(unknown))
+    detector = AnomalyDetector(values[first:], mean=stats.mean[first:], sigma=stats.std[first:])
+    detector.apply_rules([1, 2, 3, 4, 5, 6, 7, 8])
+    expected = detector.mask.copy()
+    expected[unknown[first:]] = 0
+    assert np.array_equal(stats.detector.mask[first:], expected)
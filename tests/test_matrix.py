@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+from SPC.anomaly_detector import AnomalyDetector
+from SPC.matrix import spc_matrix
+
+
+def _frame(seed=0, n=400):
+    rng = np.random.default_rng(seed)
+    columns = {
+        'normal': rng.normal(10, 1, n),
+        'drift': 10 + np.cumsum(rng.normal(0, 0.3, n)),
+        'rounded': np.round(rng.normal(0, 1, n)),
+        'gaps': rng.normal(0, 1, n),
+        'constant': np.full(n, 0.1),
+        'zero': np.zeros(n),
+    }
+    columns['gaps'][rng.random(n) < 0.1] = np.nan
+    return pd.DataFrame(columns)
+
+
+@pytest.mark.parametrize('chunksize', [1 << 18, 500])
+def test_matrix_matches_detector_per_column(chunksize):
+    df = _frame()
+    result = spc_matrix(df, chunksize=chunksize)
+    for column in df:
+        detector = AnomalyDetector(df[column])
+        detector.apply_rules([1, 2, 3, 4, 5, 6, 7, 8])
+        assert result.summary.loc[column, 'mean'] == pytest.approx(detector.mean, rel=1e-12, abs=1e-15)
+        assert result.summary.loc[column, 'std'] == pytest.approx(detector.sigma, rel=1e-9, abs=1e-15)
+        assert np.array_equal(result.column_mask(column), detector.mask), column
+        assert result.violations(column).equals(detector.violations())
+        assert result.summary.loc[column, 'violations'] == np.count_nonzero(detector.mask)
+
+
+def test_matrix_under_fixed_limits():
+    df = _frame(1)
+    mean, sigma = np.arange(6.0), np.full(6, 2.0)
+    result = spc_matrix(df.to_numpy(), mean=mean, sigma=sigma)
+    for j, column in enumerate(df):
+        detector = AnomalyDetector(df[column], mean=mean[j], sigma=sigma[j])
+        detector.apply_rules([1, 2, 3, 4, 5, 6, 7, 8])
+        assert np.array_equal(result.column_mask(j), detector.mask)
+    counts = result.summary['violations']
+    flagged = result.flagged()
+    assert set(flagged) == set(counts.index[counts > 0])
+    assert list(counts[flagged]) == sorted(counts[flagged], reverse=True)
+
+
+def test_column_chart_reuses_results():
+    from SPC import SPCPlot
+    df = _frame(2)
+    chart = spc_matrix(df).chart('drift', draw=False)
+    reference = SPCPlot(df, 'drift')
+    assert chart.violations.equals(reference.violations)
+    assert chart.UCL == pytest.approx(reference.UCL)
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+from SPC.anomaly_detector import AnomalyDetector
+from SPC.stats import SPCStats
+
+
+def _values(n=600_000):
+    # longer than one detection chunk, with a drift and a few outliers to fire every kind of rule
+    rng = np.random.default_rng(0)
+    values = rng.normal(10, 1, n)
+    values[n // 6:n // 6 + 400] += np.linspace(0, 3, 400)
+    values[rng.integers(0, n, 50)] += 5
+    values[rng.integers(0, n, 50)] = np.nan
+    return values
+
+
+def test_memmap_input_is_read_in_place(tmp_path):
+    path = tmp_path / 'values.npy'
+    np.save(path, _values())
+    values = np.load(path, mmap_mode='r')
+
+    detector = AnomalyDetector(values)
+    detector.apply_rules([1, 2, 3, 4, 5, 6, 7, 8])
+    assert detector.values is values
+    assert np.shares_memory(SPCStats(values).detector.values, values)
+
+    reference = AnomalyDetector(pd.Series(np.array(values)))
+    reference.apply_rules([1, 2, 3, 4, 5, 6, 7, 8])
+    assert detector.mean == reference.mean and detector.sigma == reference.sigma
+    assert np.array_equal(detector.mask, reference.mask)
+    assert detector.violations().equals(reference.violations())
+
+
+def test_array_and_series_charts_agree():
+    values = _values(50_000)
+    from_array = SPCStats(values)
+    from_frame = SPCStats(pd.DataFrame({'v': values}), y='v')
+    assert from_array.statistics == from_frame.statistics
+    assert np.array_equal(from_array.violation_mask, from_frame.violation_mask)
+    assert from_array.violation_counts() == from_frame.violation_counts()
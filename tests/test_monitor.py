@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+from SPC.anomaly_detector import AnomalyDetector
+from SPC.monitor import SPCMonitor
+from SPC.stats import SPCStats
+
+
+def _as_sets(violations):
+    return {int(i): sorted(rules) for i, rules in violations.items()}
+
+
+@pytest.mark.parametrize('seed', range(8))
+def test_monitor_matches_batch_rules_with_frozen_limits(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(20, 300))
+    kind = seed % 4
+    if kind == 0:
+        values = rng.normal(size=n)
+    elif kind == 1:
+        values = np.round(rng.normal(size=n))
+    elif kind == 2:
+        values = np.cumsum(rng.normal(size=n))
+    else:
+        values = np.where(rng.random(n) < 0.5, -1.5, 1.5)
+    mean, sigma = float(values.mean()), float(values.std(ddof=1))
+
+    monitor = SPCMonitor(mean=mean, sigma=sigma)
+    i = 0
+    while i < n:
+        size = int(rng.integers(1, 6))
+        monitor.push(values[i:i + size])
+        i += size
+
+    detector = AnomalyDetector(pd.Series(values), mean=mean, sigma=sigma)
+    detector.apply_rules([1, 2, 3, 4, 5, 6, 7, 8])
+    assert _as_sets(monitor.violations()) == _as_sets(detector.violations())
+
+
+def test_monitor_with_baseline_matches_spcstats():
+    values = np.random.default_rng(42).normal(10, 2, 500)
+    values[200:230] += 3
+    stats = SPCStats(pd.DataFrame({'v': values}), 'v')
+
+    monitor = SPCMonitor(baseline=values)
+    for value in values:
+        monitor.push(value)
+    assert _as_sets(monitor.violations()) == _as_sets(stats.violations)
+
+
+def test_monitor_keeps_only_the_most_recent_events():
+    values = np.where(np.arange(200) % 2, 5.0, -5.0)  # every reading beyond the limits
+    kept = SPCMonitor(mean=0, sigma=1, rules=[1], max_events=10)
+    every = SPCMonitor(mean=0, sigma=1, rules=[1])
+    for value in values:
+        assert kept.push(value) == every.push(value)
+    assert len(every.events) == 200
+    assert list(kept.events) == list(every.events)[-10:]
+    assert list(kept.violations().index) == list(range(190, 200))
+
+    with pytest.raises(ValueError):
+        SPCMonitor(mean=0, sigma=1, max_events=-1)
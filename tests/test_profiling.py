@@ -0,0 +1,42 @@
+import tracemalloc
+import numpy as np
+import pandas as pd
+from SPC.profiling import Profiler
+from SPC.stats import SPCStats
+
+
+def test_stages_are_recorded():
+    profiler = Profiler()
+    stats = SPCStats(pd.DataFrame({'v': np.random.default_rng(0).normal(size=1000)}), y='v', violations=[1, 2],
+                     profiler=profiler)
+    stats.violations
+    stages = [r['stage'] for r in profiler.records]
+    assert {'statistics', 'detector', 'rule1', 'rule2'} <= set(stages)
+    # nested stages complete before the stage containing them
+    assert stages.index('rule1') < stages.index('detector')
+    assert all(r['peak_bytes'] is None for r in profiler.records)
+    summary = profiler.as_dict()
+    assert summary['detector.calls'] == 1 and summary['detector.rows'] == 1000
+
+
+def test_memory_tracing_stops_after_the_outermost_stage():
+    assert not tracemalloc.is_tracing()
+    profiler = Profiler(memory=True)
+    with profiler.stage('outer'):
+        with profiler.stage('inner'):
+            block = np.ones(1 << 20)
+        assert tracemalloc.is_tracing()
+        del block
+    assert not tracemalloc.is_tracing()
+    inner, outer = profiler.records
+    assert inner['stage'] == 'inner' and inner['peak_bytes'] >= 8 << 20
+    assert outer['peak_bytes'] >= inner['peak_bytes']
+
+    # tracing started by the caller is left running
+    tracemalloc.start()
+    try:
+        with profiler.stage('again'):
+            pass
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from SPC import rules
+from SPC.anomaly_detector import AnomalyDetector
+
+# rule: (a series where it fires on the last point only, a series where it does not fire), against mean 0, sigma 1
+CASES = {
+    'N1': ([0, 0, 3.5], [0, 2.9, -2.9, 3.0, -3.0]),
+    'N2': ([0.5] * 9, [0.5] * 8 + [-0.5]),
+    'N3': ([0.1 * i for i in range(6)], [0.1 * i for i in range(5)] + [0.3]),
+    'N4': ([0.1, -0.1] * 7, [0.1, -0.1] * 6 + [0.1, 0.2]),
+    'N5': ([2.5, 0, 2.5], [2.5, 0, -2.5]),
+    'N6': ([1.5, 1.5, 0, 1.5, 1.5], [1.5, 1.5, 0, 1.5, -1.5]),
+    'N7': ([0.5, -0.5] * 7 + [0.5], [0.5, -0.5] * 7 + [1.5]),
+    'N8': ([1.5, -1.5] * 4, [1.5] * 8),
+    'WE1': ([0, 0, -3.5], [0, 2.9, -2.9, 3.0]),
+    'WE2': ([-2.5, 0, -2.5], [2.5, 0, -2.5]),
+    'WE3': ([-1.5, -1.5, 0, -1.5, -1.5], [-1.5, -1.5, 0, -1.5, 1.5]),
+    'WE4': ([0.5] * 8, [0.5] * 7 + [-0.5]),
+    '1_2s': ([0, 2.5], [1.9, -1.9, 2.0]),
+    '1_3s': ([0, -3.5], [2.9, -3.0]),
+    '2_2s': ([2.5, 2.5], [2.5, -2.5]),
+    'R_4s': ([2.5, -2.5], [2.5, 2.5]),
+    '4_1s': ([1.5] * 4, [1.5] * 3 + [-1.5]),
+    '10_x': ([-0.5] * 10, [-0.5] * 9 + [0.5]),
+    '2of3_2s': ([2.5, 0, 2.5], [2.5, 0, -2.5]),
+    '3_1s': ([1.5] * 3, [1.5, 1.5, -1.5]),
+    '6_x': ([0.5] * 6, [0.5] * 5 + [-0.5]),
+    '8_x': ([0.5] * 8, [0.5] * 7 + [-0.5]),
+    '9_x': ([0.5] * 9, [0.5] * 8 + [-0.5]),
+    '12_x': ([0.5] * 12, [0.5] * 11 + [-0.5]),
+    '7_T': ([0.1 * i for i in range(7)], [0.1 * i for i in range(6)] + [0.4]),
+}
+
+
+def _flagged(values, rule):
+    detector = AnomalyDetector(np.array(values, dtype=np.float64), mean=0, sigma=1)
+    detector.apply_rules([rule])
+    return list(np.flatnonzero(detector.mask))
+
+
+def test_every_named_rule_has_a_case():
+    assert set(CASES) == {key for key in rules.REGISTRY if not isinstance(key, int)}
+
+
+@pytest.mark.parametrize('rule', sorted(CASES))
+def test_named_rule(rule):
+    fires, quiet = CASES[rule]
+    assert _flagged(fires, rule) == [len(fires) - 1]
+    assert _flagged(quiet, rule) == []
+
+
+def test_nelson_rule_8_needs_both_sides():
+    # eight points beyond 1 sigma, all above the mean, embedded in a longer series
+    values = [0.0] * 10 + [1.5] * 8 + [0.0] * 3
+    assert _flagged(values, 'N8') == []
+    values[12] = -1.5
+    assert _flagged(values, 'N8') == [17]
+
+
+def test_rule_sets():
+    assert _flagged([0.5] * 9, 'nelson') == [8]
+    assert _flagged([2.5, -2.5], 'westgard') == [1]
+    assert _flagged([0, 0, 3.5], 'western_electric') == [2]
@@ -0,0 +1,98 @@
+import asyncio
+import json
+import threading
+import numpy as np
+from SPC import serving
+from SPC.serving import Busy, ChartService, call, serve_http
+
+PAYLOAD = {'data': {'v': list(np.random.default_rng(0).normal(size=50))}, 'y': 'v'}
+
+
+async def _wait_for(condition):
+    while not condition():
+        await asyncio.sleep(0.005)
+
+
+def test_concurrent_identical_requests_are_coalesced(monkeypatch):
+    release = threading.Event()
+    figure = serving._figure
+
+    def slow_figure(*args):
+        release.wait(10)
+        return figure(*args)
+
+    monkeypatch.setattr(serving, '_figure', slow_figure)
+
+    async def main():
+        async with ChartService(max_workers=4) as service:
+            server = await serve_http(service)
+            requests = [asyncio.ensure_future(call(server, 'POST', '/figure', PAYLOAD)) for _ in range(5)]
+            # hold the computation until every request has joined it
+            await _wait_for(lambda: service.requests == 5)
+            release.set()
+            responses = await asyncio.gather(*requests)
+            status, body = await call(server, 'GET', '/metrics')
+            server.close()
+            return responses, status, json.loads(body)
+
+    responses, status, metrics = asyncio.run(main())
+    assert {status for status, _ in responses} == {200}
+    assert len({body for _, body in responses}) == 1
+    assert 'data' in json.loads(responses[0][1])
+    assert status == 200
+    assert metrics['requests'] == 5
+    assert metrics['computed'] == 1
+    assert metrics['coalesced'] == 4
+    assert metrics['errors'] == metrics['rejected'] == 0
+    assert metrics['queued'] == metrics['running'] == metrics['inflight'] == 0
+
+
+def test_full_queue_is_turned_away():
+    release = threading.Event()
+
+    async def main():
+        async with ChartService(max_workers=1, max_queue=0) as service:
+            server = await serve_http(service)
+            blocking = asyncio.ensure_future(service.run('block', release.wait, 10))
+            await _wait_for(lambda: service.running == 1)
+            status, body = await call(server, 'POST', '/figure', PAYLOAD)
+            busy = False
+            try:
+                await service.run('other', len, 'abc')
+            except Busy:
+                busy = True
+            release.set()
+            await blocking
+            server.close()
+            return status, json.loads(body), busy, service.metrics()
+
+    status, body, busy, metrics = asyncio.run(main())
+    assert status == 503 and 'error' in body
+    assert busy
+    assert metrics['rejected'] == 2
+    assert metrics['computed'] == 1
+
+
+def test_bad_requests_get_400():
+    async def main():
+        async with ChartService() as service:
+            server = await serve_http(service)
+            out = [await call(server, 'POST', '/figure', {**PAYLOAD, 'options': {'no_such_option': 1}}),
+                   await call(server, 'POST', '/figure', {**PAYLOAD, 'y': 'missing'}),
+                   await call(server, 'POST', '/figure', {**PAYLOAD, 'options': {'limits': 'nope'}}),
+                   await call(server, 'GET', '/nowhere')]
+            server.close()
+            before = service.metrics()
+            failed = [asyncio.ensure_future(service.run('fails', int, 'x')) for _ in range(3)]
+            errors = await asyncio.gather(*failed, return_exceptions=True)
+            after = service.metrics()
+            return out, errors, {k: after[k] - before[k] for k in ('computed', 'errors', 'coalesced', 'rejected')}
+
+    responses, errors, metrics = asyncio.run(main())
+    assert [status for status, _ in responses] == [400, 400, 400, 404]
+    assert all('error' in json.loads(body) for _, body in responses)
+    # every request waiting on a failed computation gets its exception; it counts as one error
+    assert all(isinstance(e, ValueError) for e in errors)
+    assert metrics['computed'] == metrics['errors'] == 1
+    assert metrics['coalesced'] == 2
+    assert metrics['rejected'] == 0
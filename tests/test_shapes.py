@@ -0,0 +1,48 @@
+import copy
+import numpy as np
+import pandas as pd
+import plotly.graph_objs as go
+import pytest
+from SPC import SPCPlot, presets
+
+STAT_2_LINE = {'Mean': 'mean', '-1S': 'line0', '+1S': 'line0', 'UCL': 'line1', 'LCL': 'line1'}
+
+
+def _legacy(chart, spec_limits=None):
+    """Zones, lines and spec lines drawn one add_hrect / add_hline at a time, as draw_spc_zones and draw_lines did
+    before batching.
+    """
+    fig = go.Figure(layout=chart.fig_layout)
+    for label, y in (spec_limits or {}).items():
+        fig.add_hline(y=y, annotation_text=f'{label} ({round(y, 2)})', **presets['ANNOTATED_LINE_STYLE']['spec'])
+    for zone, (y0, y1) in chart.zones.items():
+        fig.add_hrect(fillcolor=chart.color_scheme['zone' + zone[-1]], y0=y0, y1=y1,
+                      **presets['SHAPE_LAYOUT']['default'])
+    stats = {'Mean': chart.mean, '-1S': chart.L1s, '+1S': chart.U1s, 'UCL': chart.UCL, 'LCL': chart.LCL}
+    if chart.sides == 'one_upper':
+        del stats['-1S'], stats['LCL']
+    elif chart.sides == 'one_lower':
+        del stats['+1S'], stats['UCL']
+    line_style = dict(presets['ANNOTATED_LINE_STYLE']['default'])
+    for y, label in {v: k for k, v in stats.items()}.items():
+        line_style.update(line_color=chart.color_scheme[STAT_2_LINE[label]], line_dash='solid')
+        fig.add_hline(y=y, annotation_text=f'{label} ({round(y, 2)})', **line_style)
+    return fig
+
+
+@pytest.mark.parametrize('sides', ['two', 'one_upper', 'one_lower'])
+def test_batched_shapes_match_add_hline_and_add_hrect(sides):
+    before = copy.deepcopy(presets['ANNOTATED_LINE_STYLE'])
+    df = pd.DataFrame({'v': np.random.default_rng(0).normal(10, 1, 100)})
+    spec = {'LSL': 6.5, 'USL': 13.25}
+    chart = SPCPlot(df, 'v', control_sidedness=sides, spec_limits=spec)
+    chart.draw_spc_zones()
+    chart.draw_lines()
+
+    expected = _legacy(chart, spec)
+    assert [s.to_plotly_json() for s in chart.fig.layout.shapes] == [s.to_plotly_json()
+                                                                     for s in expected.layout.shapes]
+    assert [a.to_plotly_json() for a in chart.fig.layout.annotations] == [a.to_plotly_json()
+                                                                          for a in expected.layout.annotations]
+    # drawing no longer writes the line colors into the shared preset
+    assert presets['ANNOTATED_LINE_STYLE'] == before
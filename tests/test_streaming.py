@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+from SPC.anomaly_detector import AnomalyDetector
+from SPC.streaming import ChunkedDetector, stream_spc
+
+
+def test_shifted_stream_keeps_carry_bounded():
+    # a process shifted 5 sigma above the fixed mean: every point extends the same run
+    rng = np.random.default_rng(0)
+    values = rng.normal(5, 1, 200_000)
+    detector = ChunkedDetector(mean=0, sigma=1)
+    positions, masks = [], []
+    for chunk in np.array_split(values, 40):
+        found, bits = detector.feed(chunk)
+        positions.append(found)
+        masks.append(bits)
+        assert len(detector._carry) <= detector.ruleset.lookback
+    found, bits = detector.finish()
+    positions.append(found)
+    masks.append(bits)
+
+    mask = np.zeros(len(values), dtype=np.uint8)
+    mask[np.concatenate(positions)] = np.concatenate(masks)
+    reference = AnomalyDetector(values, mean=0, sigma=1)
+    reference.apply_rules([1, 2, 3, 4, 5, 6, 7, 8])
+    assert np.array_equal(mask, reference.mask)
+
+
+def test_sample_size_fixed_with_given_limits(tmp_path):
+    rng = np.random.default_rng(1)
+    path = tmp_path / 'column.csv'
+    pd.DataFrame({'v': rng.normal(0, 1, 60_000)}).to_csv(path, index=False)
+
+    result = stream_spc(path, 'v', chunksize=2_000, mean=0, sigma=1, n_out=500)
+    violating = np.isin(result.sample.index, result.positions).sum()
+    assert len(result.sample) - violating <= 2 * 500
+    assert result.n == 60_000
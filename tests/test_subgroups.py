@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+from SPC import SPCPlot
+from SPC.anomaly_detector import AnomalyDetector
+from SPC.stats import SPCStats
+from SPC.subgroups import constants, moving_range_limits, subgroup_limits, subgroup_stats
+
+
+@pytest.mark.parametrize('chart_type', ['xbar_r', 'xbar_s'])
+def test_ragged_tail_is_left_out_of_the_estimate(chart_type):
+    values = np.random.default_rng(0).normal(10, 1, 301)
+    ragged = subgroup_limits(subgroup_stats(values, size=5), chart_type)
+    full = subgroup_limits(subgroup_stats(values[:300], size=5), chart_type)
+
+    assert ragged['sigma'] == pytest.approx(full['sigma'])
+    assert np.isnan(ragged['dispersion_center'][-1])
+    assert np.isnan(ragged['dispersion_UCL'][-1])
+    assert ragged['dispersion_center'][:-1] == pytest.approx(np.full(60, full['dispersion_center']))
+
+
+def test_chart_with_a_one_point_group():
+    df = pd.DataFrame({'v': np.random.default_rng(1).normal(size=21), 'lot': np.repeat(np.arange(5), [5, 5, 5, 5, 1])})
+    chart = SPCPlot(df, 'v', chart_type='xbar_r', subgroup='lot')
+    assert len(chart.subgroups) == 5
+    assert np.isfinite(chart.std[:-1]).all()
+
+
+def test_only_single_points_raises():
+    with pytest.raises(ValueError):
+        subgroup_limits(subgroup_stats(np.arange(4.0), labels=[0, 1, 2, 3]), 'xbar_r')
+
+
+@pytest.mark.parametrize('n, expected', [
+    (2, dict(d2=1.128, D3=0.0, D4=3.267, A2=1.880, c4=0.7979, B4=3.267)),
+    (5, dict(d2=2.326, D3=0.0, D4=2.114, A2=0.577, A3=1.427, c4=0.9400, B3=0.0, B4=2.089)),
+    (10, dict(d2=3.078, D3=0.223, D4=1.777, A2=0.308, A3=0.975, c4=0.9727, B3=0.284, B4=1.716)),
+])
+def test_constants_match_the_published_tables(n, expected):
+    got = constants(n)
+    for name, value in expected.items():
+        assert got[name] == pytest.approx(value, rel=1e-3, abs=1e-3), name
+
+
+def test_i_mr_limits_from_the_mean_moving_range():
+    rng = np.random.default_rng(3)
+    values = np.cumsum(rng.normal(size=500)) / 10 + rng.normal(size=500)
+    values[[10, 11, 200]] = np.nan
+    series = pd.Series(values)
+    mr_bar = series.diff().abs().mean()  # moving ranges next to a NaN are left out
+
+    limits = moving_range_limits(values)
+    assert limits['dispersion_center'] == pytest.approx(mr_bar)
+    assert limits['sigma'] == pytest.approx(mr_bar / 1.128)
+    assert limits['dispersion_UCL'] == pytest.approx(3.267 * mr_bar, rel=1e-3)
+    assert limits['dispersion_LCL'] == 0
+    assert np.isnan(limits['moving_range'][[0, 10, 11, 12, 200, 201]]).all()
+
+    chart = SPCStats(pd.DataFrame({'v': values}), y='v', chart_type='i_mr')
+    assert chart.mean == pytest.approx(series.mean())
+    assert chart.UCL == pytest.approx(series.mean() + 2.66 * mr_bar, rel=1e-3)
+    assert chart.dispersion['UCL'] == pytest.approx(limits['dispersion_UCL'])
+    # the rules judge the values against the I-MR limits
+    reference = AnomalyDetector(series, mean=series.mean(), sigma=limits['sigma'])
+    reference.apply_rules([1, 2, 3, 4, 5, 6, 7, 8])
+    assert np.array_equal(chart.violation_mask, reference.mask)
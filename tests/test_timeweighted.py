@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+from SPC.stats import SPCStats
+from SPC.timeweighted import cusum
+
+
+def test_cusum_signals_above_h_only():
+    # target 0, sigma 1, K = 0.5, H = 3: C+ reaches exactly H at 1, stays there at 2, exceeds it at 3
+    values = [0.0, 3.5, 0.5, 0.6, -0.5]
+    upper, lower = cusum(values, 0.0, 0.5)
+    assert np.array_equal(upper[:3], [0.0, 3.0, 3.0]) and upper[3] > 3.0 > upper[4]
+
+    df = pd.DataFrame({'v': values})
+    stats = SPCStats(df, y='v', chart_type='cusum', chart_options={'k': 0.5, 'h': 3, 'target': 0.0, 'sigma': 1.0})
+    assert stats.UCL == 3.0
+    assert list(stats.detector.violations().index) == [3]
+    assert stats.detector.violations()[3] == [1]
+
+
+def test_missing_measurements_do_not_signal():
+    values = [0.0, np.nan, 0.1, 4.0, np.nan, -0.2]
+    for chart_type, options in (('ewma', {'lambda': 0.5, 'L': 3.0}), ('cusum', {'k': 0.5, 'h': 3.0})):
+        df = pd.DataFrame({'v': values})
+        stats = SPCStats(df, y='v', chart_type=chart_type, chart_options=dict(options, target=0.0, sigma=1.0))
+        assert list(stats.detector.violations().index) == [3], chart_type
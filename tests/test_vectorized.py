@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+from SPC.anomaly_detector import AnomalyDetector
+
+
+def _series(kind, seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(1, 120))
+    if kind == 'normal':
+        values = rng.normal(size=n)
+    elif kind == 'rounded':
+        values = np.round(rng.normal(size=n))
+    elif kind == 'walk':
+        values = np.cumsum(rng.normal(size=n))
+    elif kind == 'bimodal':
+        values = np.where(rng.random(n) < 0.5, -2.0, 2.0) + rng.normal(scale=0.1, size=n)
+    elif kind == 'constant':
+        values = np.full(n, 3.0)
+    if kind != 'constant':
+        values[rng.random(n) < 0.05] = np.nan
+    return pd.Series(values)
+
+
+@pytest.mark.parametrize('seed', range(4))
+@pytest.mark.parametrize('kind', ['normal', 'rounded', 'walk', 'bimodal', 'constant'])
+def test_vectorized_engine_matches_loop(kind, seed):
+    series = _series(kind, seed)
+    loop = AnomalyDetector(series, engine='loop')
+    loop.apply_rules([1, 2, 3, 4, 5, 6, 7, 8])
+    vectorized = AnomalyDetector(series, engine='vectorized')
+    vectorized.apply_rules([1, 2, 3, 4, 5, 6, 7, 8])
+
+    assert np.array_equal(vectorized.mask, loop.mask)
+    assert loop.violations().equals(vectorized.violations())
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_engines_match_under_fixed_limits(seed):
+    series = _series('walk', seed)
+    loop = AnomalyDetector(series, engine='loop', mean=0.5, sigma=1.5)
+    loop.apply_rules([1, 2, 3, 4, 5, 6, 7, 8])
+    vectorized = AnomalyDetector(series, mean=0.5, sigma=1.5)
+    vectorized.apply_rules([1, 2, 3, 4, 5, 6, 7, 8])
+    assert np.array_equal(vectorized.mask, loop.mask)